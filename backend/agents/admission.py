@@ -0,0 +1,173 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Deque
+
+from observability.metrics import (
+    admission_concurrency_limit,
+    admission_inflight,
+    admission_queue_depth,
+    admission_queue_wait_seconds,
+    admission_shed_total,
+)
+
+
+@dataclass(frozen=True)
+class AdmissionConfig:
+    """
+    Admission control settings, read from the environment by `from_env`.
+
+    min_inflight        ADMISSION_MIN_INFLIGHT      floor for the adaptive limit
+    max_inflight        ADMISSION_MAX_INFLIGHT      ceiling for the adaptive limit
+    initial_inflight    ADMISSION_INITIAL_INFLIGHT  limit at startup
+    max_queue           ADMISSION_MAX_QUEUE         waiting turns beyond this are rejected (429)
+    max_wait_s          ADMISSION_MAX_WAIT_S        turns waiting longer are rejected (503)
+    target_latency_s    ADMISSION_TARGET_LATENCY_S  turns slower than this shrink the limit
+    """
+
+    min_inflight: int = 2
+    max_inflight: int = 64
+    initial_inflight: int = 16
+    max_queue: int = 100
+    max_wait_s: float = 2.0
+    target_latency_s: float = 8.0
+
+    @classmethod
+    def from_env(cls) -> "AdmissionConfig":
+        return cls(
+            min_inflight=int(os.getenv("ADMISSION_MIN_INFLIGHT", cls.min_inflight)),
+            max_inflight=int(os.getenv("ADMISSION_MAX_INFLIGHT", cls.max_inflight)),
+            initial_inflight=int(os.getenv("ADMISSION_INITIAL_INFLIGHT", cls.initial_inflight)),
+            max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", cls.max_queue)),
+            max_wait_s=float(os.getenv("ADMISSION_MAX_WAIT_S", cls.max_wait_s)),
+            target_latency_s=float(os.getenv("ADMISSION_TARGET_LATENCY_S", cls.target_latency_s)),
+        )
+
+
+class Overloaded(Exception):
+    """A turn was shed; `status_code` and `retry_after` go into the HTTP response."""
+
+    def __init__(self, reason: str, status_code: int, retry_after: int):
+        super().__init__(f"overloaded: {reason}")
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounded in-flight limit with a FIFO wait queue and AIMD limit tuning.
+
+    Turns over the limit wait in the queue for at most `max_wait_s`; when the
+    queue is full they are rejected at once. Each finished turn adjusts the
+    limit: latency under the target grows it by 1/limit (about +1 per limit's
+    worth of turns), latency over the target cuts it by a quarter, at most
+    once per target interval so a burst of slow turns counts as one signal.
+    Slow turns are almost always slow LLM calls, so the limit follows DeepSeek.
+    """
+
+    def __init__(self, config: AdmissionConfig):
+        self.config = config
+        self._limit = float(max(config.min_inflight, min(config.max_inflight, config.initial_inflight)))
+        self._inflight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        self._avg_latency = config.target_latency_s / 4
+        admission_concurrency_limit.set(self.limit)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def inflight(self) -> int:
+        return self._inflight
+
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    @asynccontextmanager
+    async def admit(self):
+        await self._acquire()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._on_complete(time.monotonic() - start)
+            self._release()
+
+    # -- slots --
+
+    async def _acquire(self):
+        if self._inflight < self.limit and not self._waiters:
+            self._take_slot()
+            admission_queue_wait_seconds.observe(0.0)
+            return
+
+        if len(self._waiters) >= self.config.max_queue:
+            raise self._shed("queue_full", 429)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        admission_queue_depth.set(len(self._waiters))
+        start = time.monotonic()
+
+        try:
+            # The slot is handed over by _release, which resolves the future.
+            await asyncio.wait_for(asyncio.shield(waiter), self.config.max_wait_s)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # Give back a slot that was handed over just as we gave up.
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._shed("queue_timeout", 503)
+            raise
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            admission_queue_depth.set(len(self._waiters))
+            admission_queue_wait_seconds.observe(time.monotonic() - start)
+
+    def _take_slot(self):
+        self._inflight += 1
+        admission_inflight.set(self._inflight)
+
+    def _release(self):
+        self._inflight -= 1
+        while self._waiters and self._inflight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._take_slot()
+                waiter.set_result(None)
+        admission_queue_depth.set(len(self._waiters))
+        admission_inflight.set(self._inflight)
+
+    def _shed(self, reason: str, status_code: int) -> Overloaded:
+        admission_shed_total.labels(reason).inc()
+        return Overloaded(reason, status_code, self._retry_after())
+
+    def _retry_after(self) -> int:
+        # Time for the current queue to drain at the current limit.
+        drain = (len(self._waiters) + 1) * self._avg_latency / max(1, self.limit)
+        return max(1, min(30, math.ceil(drain)))
+
+    # -- AIMD --
+
+    def _on_complete(self, latency_s: float):
+        cfg = self.config
+        self._avg_latency += 0.2 * (latency_s - self._avg_latency)
+
+        if latency_s > cfg.target_latency_s:
+            now = time.monotonic()
+            if now - self._last_decrease >= cfg.target_latency_s:
+                self._limit = max(cfg.min_inflight, self._limit * 0.75)
+                self._last_decrease = now
+        else:
+            self._limit = min(cfg.max_inflight, self._limit + 1.0 / self._limit)
+
+        admission_concurrency_limit.set(self.limit)
@@ -1,17 +1,30 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Mapping, Optional, Tuple
+import functools
+import os
 import re
+import time
 import uuid
 
 from vectorstore.search import semantic_search
-from models.llm import deepseek_chat
-from memory.session_store import get_session, update_session
-from utils.response_formatter import clean_llm_text
+from models.llm import LLMUnavailable, deepseek_chat
+from models.llm_scheduler import request_deadline, request_session
+from memory.session_store import LastRetrieval, get_session, update_session
+from utils.response_formatter import FormattedAnswer, clean_llm_text, format_llm_answer
+from utils.installation_renderer import render_installation
+from utils.retrieval_answer import render_retrieval_answer
+from utils.payload import CARDS_KEY
+from agents.pipeline import Stage, StageGraph, run_blocking
+from agents.singleflight import SingleFlight
 
 #Observability 
 from observability.metrics import (
     request_latency_seconds,
     errors_total,
     agent_tool_invocations_total,
+    fuzzy_entity_matches_total,
+    installation_answers_total,
+    degraded_answers_total,
+    retrieval_reuse_total,
 )
 
 from opentelemetry import trace
@@ -19,12 +32,10 @@ from opentelemetry import trace
 tracer = trace.get_tracer(__name__)
 
 
-from data.catalog_registry import (
-    KNOWN_BRANDS,
-    KNOWN_PART_NUMBERS,
-    KNOWN_MODELS,
-    KNOWN_SYMPTOMS,
-)
+from data.catalog_registry import CatalogRegistry
+from data.fuzzy_index import FuzzyIndex
+from data.catalog_snapshot import CatalogSnapshot, get_snapshot
+from data.answer_store import get_answer_store
 
 # SUPPORTED & BLOCKED APPLIANCES 
 SUPPORTED_APPLIANCE_KEYWORDS = [
@@ -41,9 +52,49 @@ OUT_OF_SCOPE_APPLIANCES = [
 
 #ENTITY EXTRACTION UTILS 
 
-def _extract_brand(q: str) -> Optional[str]:
+# Model / part-number-like tokens: 5+ alphanumerics including a digit.
+_CODE_TOKEN = re.compile(r"\b(?=[a-z0-9]*\d)[a-z0-9]{5,}\b", re.IGNORECASE)
+FUZZY_MIN_CONFIDENCE = 0.75
+
+# A bare pronoun standing for one part from the previous answer ("install
+# it", "is this compatible"). A demonstrative before a noun ("this
+# dishwasher", "that city") is not one.
+_PRONOUN_PART = re.compile(
+    r"\b(?:install|replace|order|buy|fit|use)\s+(?:it|this one|that one)\b"
+    r"|\b(?:is|does|will|would|can)\s+(?:it|this|that|this one|that one)\s+(?:be\s+)?(?:compatible|fit|work)"
+)
+# ...or for the previous answer's parts as a whole ("which of these").
+_REFERS_BACK = re.compile(
+    _PRONOUN_PART.pattern
+    + r"|\b(?:of|from|between|among)\s+(?:these|those|them)\b"
+    + r"|\b(?:these|those)\s+(?:parts|ones)\b"
+)
+
+# Kinds of part a message can name; one that none of the previous answer's
+# parts is ("I also need a door gasket") is a new question, not a follow-up.
+PART_NOUNS = [
+    "gasket", "seal", "pump", "latch", "valve", "filter", "spray arm",
+    "rack", "shelf", "shelves", "bin", "drawer", "crisper", "motor", "hose",
+    "thermostat", "hinge", "handle", "dispenser", "basket", "wheel",
+    "switch", "sensor", "fan", "heater", "element", "board", "light",
+    "gear", "cover", "tray",
+]
+
+# "template" renders installation answers from the catalog record and only
+# calls the LLM when the record has no steps; "llm" always calls the LLM.
+INSTALLATION_ANSWER_MODE = os.getenv("INSTALLATION_ANSWER_MODE", "template").lower()
+
+# Seconds a chat turn may take. LLM calls get whatever is left of it; when
+# that is not enough the turn is answered from retrieval alone (degraded).
+CHAT_LATENCY_BUDGET_S = float(os.getenv("CHAT_LATENCY_BUDGET_S", "20"))
+
+# How long the speculative RAG search may take before the turn moves on
+# without it (the RAG flow then searches itself).
+SPECULATIVE_RETRIEVAL_TIMEOUT_S = float(os.getenv("SPECULATIVE_RETRIEVAL_TIMEOUT_S", "2"))
+
+def _extract_brand(q: str, registry: CatalogRegistry) -> Optional[str]:
     q_lower = q.lower()
-    for brand in KNOWN_BRANDS:
+    for brand in registry.brands:
         if brand in q_lower:
             return brand.title()
     return None
@@ -57,24 +108,60 @@ def _extract_appliance(q: str) -> Optional[str]:
     return None
 
 
-def _extract_model(q: str) -> Optional[str]:
+def _fuzzy_extract(q: str, index: FuzzyIndex, entity: str) -> Optional[str]:
+    """Resolve a mistyped code (e.g. WDT780SAEM → WDT780SAEM1) from the query tokens."""
+    for token in _CODE_TOKEN.findall(q):
+        matches = index.lookup(token, limit=1)
+        if matches and matches[0].confidence >= FUZZY_MIN_CONFIDENCE:
+            fuzzy_entity_matches_total.labels(entity).inc()
+            return matches[0].term
+    return None
+
+
+def _family_extract(q: str, registry: CatalogRegistry) -> Optional[str]:
+    """
+    A partial model number (WDT780SAEM) or a catalog model with an unlisted
+    suffix (WDT780SAEM1B), naming a catalog model family. Returned as given:
+    the revision is unknown. A code that leaves the catalog's models part way
+    through is only a family when no model is one edit away; ADB1500AXW is a
+    typo of ADB1500AWW, not a new member of the ADB1500A family.
+    """
+    for token in _CODE_TOKEN.findall(q):
+        family = registry.model_trie.family(token)
+        if family is None or family.exact:
+            continue
+        code = token.upper()
+        if family.prefix != code and family.prefix not in registry.models:
+            typo = registry.model_index.lookup(code, limit=1)
+            if typo and typo[0].distance <= 1:
+                continue
+        fuzzy_entity_matches_total.labels("model_family").inc()
+        return code
+    return None
+
+
+def _extract_model(q: str, registry: CatalogRegistry) -> Optional[str]:
     q_upper = q.upper()
-    for model in KNOWN_MODELS:
+    for model in registry.models:
         if model in q_upper:
             return model
-    return None
+    # Family before typo matching: WDT780SAEM is one edit from WDT780SAEM1,
+    # but may just as well be a revision the catalog does not list.
+    # _family_extract leaves one-edit typos inside a model number to the
+    # fuzzy match.
+    return _family_extract(q, registry) or _fuzzy_extract(q, registry.model_index, "model")
 
 
-def _extract_part_number(q: str) -> Optional[str]:
-    for part in KNOWN_PART_NUMBERS:
+def _extract_part_number(q: str, registry: CatalogRegistry) -> Optional[str]:
+    for part in registry.part_numbers:
         if part.lower() in q.lower():
             return part
-    return None
+    return _fuzzy_extract(q, registry.part_index, "part_number")
 
 
-def _extract_symptom(q: str) -> Optional[str]:
+def _extract_symptom(q: str, registry: CatalogRegistry) -> Optional[str]:
     q_lower = q.lower()
-    for symptom in KNOWN_SYMPTOMS:
+    for symptom in registry.symptoms:
         if symptom in q_lower:
             return symptom
     return None
@@ -92,50 +179,295 @@ def _user_doesnt_know_model(q: str) -> bool:
     return any(x in q for x in ["i don't know", "dont know", "not sure", "no idea"])
 
 
+# SHARED ANSWER GENERATORS (also used offline by vectorstore/materialize_answers.py)
+
+def generate_installation_answer(part: Dict[str, Any]) -> FormattedAnswer:
+    """LLM-written installation answer for one part record."""
+    system_prompt = """
+You are a PartSelect installation expert.
+Use ONLY the provided data.
+Do NOT use markdown.
+Give clean numbered steps.
+Include a short safety warning at the top.
+"""
+    user_prompt = f"Install using only this data:\n{part}"
+
+    raw_answer = deepseek_chat(system_prompt, user_prompt, flow="installation")
+    return format_llm_answer(raw_answer)
+
+
+def _prefer_family_parts(
+    results: List[Dict[str, Any]], registry: CatalogRegistry, model_number: Optional[str]
+) -> List[Dict[str, Any]]:
+    """
+    For a partial or unlisted-revision model number, `results` with the parts
+    listed for any member of its family first.
+    """
+    if not model_number or model_number in registry.models:
+        return results
+    listed = set(registry.model_trie.family_parts(model_number))
+    if not listed:
+        return results
+    return sorted(results, key=lambda p: (p.get("id") or "").upper() not in listed)
+
+
+def _find_part(snapshot: CatalogSnapshot, part_number: str) -> Optional[Dict[str, Any]]:
+    """
+    The catalog part for `part_number`: the nearest hit, or the near-duplicate
+    collapsed into it at index build (vectorstore/dedup.py) that has this id.
+    """
+    results = semantic_search(part_number, top_k=1, snapshot=snapshot, adaptive=False, expand=True)
+    exact = (p for p in results if (p.get("id") or "").upper() == part_number)
+    return next(exact, results[0] if results else None)
+
+
+# SESSION RETRIEVAL REUSE
+
+def _last_retrieval(session: Dict[str, Any], snapshot: CatalogSnapshot) -> Optional[LastRetrieval]:
+    # Parts retrieved from another catalog version may no longer exist.
+    last = session.get("retrieval")
+    return last if last is not None and last.version == snapshot.version else None
+
+
+def _names_other_part(q: str, parts) -> bool:
+    names = [(p.get("name") or "").lower() for p in parts]
+    return any(noun in q and not any(noun in name for name in names) for noun in PART_NOUNS)
+
+
+def _reusable_parts(
+    last: Optional[LastRetrieval],
+    q: str,
+    stated: Tuple[Optional[str], ...],
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    The last turn's parts when this turn is a follow-up about them: it points
+    back at them, names no part or model code and no other kind of part, and
+    states no appliance, brand or symptom (`stated`, from this message only)
+    other than the ones they were found for. None when the turn needs its own
+    search.
+    """
+    if (
+        last is None
+        or not _REFERS_BACK.search(q)
+        or _CODE_TOKEN.search(q)
+        or _names_other_part(q, last.parts)
+        or any(s is not None and s != e for s, e in zip(stated, last.entities))
+    ):
+        return None
+    return list(last.parts)
+
+
+def _pronoun_part(last: Optional[LastRetrieval], q: str) -> Optional[str]:
+    """
+    The part number an installation or compatibility question means by "it":
+    the best part from the last answer, unless the message names another
+    kind of part.
+    """
+    if (
+        last is None
+        or not _PRONOUN_PART.search(q)
+        or not (_wants_installation(q) or _wants_compatibility(q))
+        or _names_other_part(q, last.parts[:1])
+    ):
+        return None
+    return (last.parts[0].get("id") or "").upper() or None
+
+
+# TURN STAGES (run by AgentController's StageGraph)
+
+def _rag_search(snapshot: CatalogSnapshot, prompt: str, appliance: Optional[str], brand: Optional[str]):
+    # A known appliance / brand narrows a sharded index to its shards.
+    return semantic_search(prompt, top_k=4, snapshot=snapshot, appliance=appliance, brand=brand)
+
+
+async def _scope_stage(r: Mapping[str, Any]) -> Dict[str, Any]:
+    # Cheap lookups only: this runs on the event loop.
+    session = r["session"] if r["session"] is not None else get_session(r["session_id"])
+    brand = _extract_brand(r["q"], r["registry"])
+    appliance = _extract_appliance(r["q"])
+    return {
+        "session": session,
+        "brand": brand or session.get("brand"),
+        "appliance": appliance or session.get("appliance"),
+        # As stated in this message, without the session's.
+        "stated": {"brand": brand, "appliance": appliance},
+    }
+
+
+def _entities_stage(r: Mapping[str, Any]) -> Dict[str, Any]:
+    q, registry = r["q"], r["registry"]
+    part_number = _extract_part_number(q, registry)
+    return {
+        "part_number": part_number,
+        # Not in the message as typed: the nearest catalog id to a typo.
+        "part_number_corrected": part_number is not None and part_number.lower() not in q,
+        "model_number": _extract_model(q, registry),
+        "symptom": _extract_symptom(q, registry),
+        "mentions_model": any(m.lower() in q for m in registry.models),
+        "mentions_symptom": any(s.lower() in q for s in registry.symptoms),
+    }
+
+
+def _speculative_retrieval_stage(r: Mapping[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """
+    The RAG flow's search, started before the flow is known. Skipped when the
+    turn names a part or model code (then a part-number flow is likely) or
+    will take the brand + symptom route, which searches differently.
+    """
+    q, scope = r["q"], r["scope"]
+    if _CODE_TOKEN.search(q) or _user_doesnt_know_model(q):
+        return None
+    # A follow-up about the last turn's parts reuses them (see handle_chat).
+    stated = (scope["stated"]["appliance"], scope["stated"]["brand"], _extract_symptom(q, r["registry"]))
+    if _reusable_parts(_last_retrieval(scope["session"], r["snapshot"]), q, stated) is not None:
+        return None
+    return _rag_search(r["snapshot"], r["query"], scope["appliance"], scope["brand"])
+
+
 # CORE AGENT CONTROLLER
 
 class AgentController:
 
+    def __init__(self):
+        # Identical concurrent turns (same flow, entities and prompt) share one
+        # search + LLM computation instead of each running their own.
+        self._inflight = SingleFlight("agent")
+        self._turn_graph = StageGraph("chat_turn", [
+            Stage("scope", _scope_stage),
+            Stage("entities", _entities_stage, deps=("scope",)),
+            Stage(
+                "retrieval",
+                _speculative_retrieval_stage,
+                deps=("scope",),
+                timeout_s=SPECULATIVE_RETRIEVAL_TIMEOUT_S,
+                optional=True,
+            ),
+        ])
+
+    async def _run_flow(
+        self,
+        session_id: str,
+        flow: str,
+        snapshot: CatalogSnapshot,
+        prompt: str,
+        entities: Dict[str, Any],
+        retrieval: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        key = (
+            flow,
+            snapshot.version,
+            tuple(sorted(entities.items())),
+            " ".join(prompt.lower().split()),
+        )
+        handler = getattr(self, f"_{flow}_flow")
+        if retrieval is not None:
+            # Search results already fetched for this prompt and entities, or
+            # reused from the session; the same prompt in another session may
+            # have other parts, so they are part of the key.
+            key += (tuple(p.get("id") for p in retrieval),)
+            handler = functools.partial(handler, results=retrieval)
+
+        # Flows block on FAISS and DeepSeek, so they run on a worker thread to
+        # keep the event loop free for other requests.
+        result = await self._inflight.do(
+            key,
+            lambda: run_blocking(handler, snapshot, prompt, entities),
+            label=flow,
+        )
+
+        # Coalesced callers share `result`; each gets its own response dict,
+        # carrying the cards of the snapshot its parts came from.
+        return {"session_id": session_id, **result, CARDS_KEY: snapshot.cards}
+
     @request_latency_seconds.time()
-    async def handle_chat(self, query: str, session_id: str | None = None) -> Dict[str, Any]:
+    async def handle_chat(
+        self,
+        query: str,
+        session_id: str | None = None,
+        session: Dict[str, Any] | None = None,
+    ) -> Dict[str, Any]:
+        """
+        One chat turn. `session` is the session's state when the caller already
+        holds it (a /ws/chat connection); otherwise it is looked up by id.
+        """
         with tracer.start_as_current_span("agent.handle_chat") as span:
             try:
                 if not session_id:
                     session_id = str(uuid.uuid4())
+                bound = session is not None
+                # LLM calls made for this turn are fair-queued per session
+                # and must finish within the turn's latency budget.
+                request_session.set(session_id)
+                request_deadline.set(time.monotonic() + CHAT_LATENCY_BUDGET_S)
 
                 q = query.lower().strip()
                 span.set_attribute("query_length", len(query))
 
-                
-                # 1) SESSION MEMORY
-                session = get_session(session_id)
-
-                part_number = _extract_part_number(q)
-                model_number = _extract_model(q) or session.get("model_number")
-                brand = _extract_brand(q) or session.get("brand")
-                appliance = _extract_appliance(q) or session.get("appliance")
-                symptom = _extract_symptom(q) or session.get("symptom")
-                issue_text = query.strip() or session.get("issue_text")
+                # Pin one catalog version for the whole request; a concurrent
+                # reload swaps in a new snapshot without affecting this one.
+                snapshot = get_snapshot()
+                registry = snapshot.registry
+                span.set_attribute("catalog_version", snapshot.version)
 
-                update_session(
-                    session_id,
+                
+                # 1) SESSION MEMORY + ENTITIES, with speculative retrieval
+                # for the RAG flow running alongside entity extraction.
+                turn = await self._turn_graph.run(
                     {
-                        "model_number": model_number,
-                        "brand": brand,
-                        "appliance": appliance,
-                        "symptom": symptom,
-                        "issue_text": issue_text,
-                    },
+                        "query": query,
+                        "q": q,
+                        "session_id": session_id,
+                        "session": session,
+                        "registry": registry,
+                        "snapshot": snapshot,
+                    }
                 )
+                scope, found = turn["scope"], turn["entities"]
+
+                session = scope["session"]
+                session_model = session.get("model_number")
+                part_number = found["part_number"]
+                model_number = found["model_number"] or session_model
+                brand = scope["brand"]
+                appliance = scope["appliance"]
+                symptom = found["symptom"] or session.get("symptom")
+                issue_text = query.strip() or session.get("issue_text")
+
+                updates = {
+                    "model_number": model_number,
+                    "brand": brand,
+                    "appliance": appliance,
+                    "symptom": symptom,
+                    "issue_text": issue_text,
+                }
+                if bound:
+                    session.update(updates)
+                else:
+                    update_session(session_id, updates)
 
                 # 2) HARD SCOPE GUARDRAIL 
                 mentions_supported_appliance = any(w in q for w in SUPPORTED_APPLIANCE_KEYWORDS)
                 mentions_out_of_scope = any(w in q for w in OUT_OF_SCOPE_APPLIANCES)
 
-                mentions_brand = any(b.lower() in q for b in KNOWN_BRANDS)
-                mentions_part_number = any(p.lower() in q for p in KNOWN_PART_NUMBERS)
-                mentions_model = any(m.lower() in q for m in KNOWN_MODELS)
-                mentions_symptom = any(s.lower() in q for s in KNOWN_SYMPTOMS)
+                mentions_brand = any(b.lower() in q for b in registry.brands)
+                # Entities resolved from this message (exactly or by fuzzy
+                # match) count; ones carried over from the session do not.
+                mentions_part_number = part_number is not None
+                mentions_model = found["mentions_model"] or (
+                    model_number is not None and model_number != session_model
+                )
+                mentions_symptom = found["mentions_symptom"]
+
+                # Parts from the session's last answered turn: "install it"
+                # names the best one, and a follow-up about the same entities
+                # reuses them instead of searching again. Only a strict
+                # pointer back at them counts as a scope signal, and never
+                # next to an appliance we do not cover.
+                last = _last_retrieval(session, snapshot)
+                stated = (scope["stated"]["appliance"], scope["stated"]["brand"], found["symptom"])
+                reused = _reusable_parts(last, q, stated)
+                referred = _pronoun_part(last, q)
+                follows_up = not mentions_out_of_scope and (reused is not None or referred is not None)
 
                 # --- Final In-Scope Decision (Multi-Signal) ---
 
@@ -145,6 +477,7 @@ class AgentController:
                     mentions_part_number,
                     mentions_model,
                     mentions_symptom,
+                    follows_up,
                 ])
 
                 if (mentions_out_of_scope and not in_scope) or not in_scope:
@@ -162,110 +495,248 @@ class AgentController:
                         ),
                     }
 
-                
-                # 3) INSTALLATION FLOW
-                if part_number and _wants_installation(q):
-                    results = semantic_search(part_number, top_k=1)
-
-                    if not results:
-                        return {
-                            "session_id": session_id,
-                            "intent": "install_generic",
-                            "entities": {"part_number": part_number},
-                            "tool_used": "FAISS",
-                            "tool_output": [],
-                            "answer": (
-                                "I could not find exact installation steps for this part. "
-                                "Here is a safe general approach:\n"
-                                "1. Disconnect power and water.\n"
-                                "2. Remove access panels.\n"
-                                "3. Remove old part.\n"
-                                "4. Install new part.\n"
-                                "5. Reassemble and restore power.\n\n"
-                                "If you share the model number, I can be more precise."
-                            ),
-                        }
-
-                    part = results[0]
-
-                    system_prompt = """
-You are a PartSelect installation expert.
-Use ONLY the provided data.
-Do NOT use markdown.
-Give clean numbered steps.
-Include a short safety warning at the top.
-"""
-                    user_prompt = f"Install using only this data:\n{part}"
-
-                    raw_answer = deepseek_chat(system_prompt, user_prompt)
-                    answer = clean_llm_text(raw_answer)
-                    agent_tool_invocations_total.labels("installation").inc()
+                part_number = part_number or referred
+                known = last.find(part_number) if last is not None and part_number else None
 
+                # A part number corrected from a typo is only suggested for
+                # a compatibility check: a verdict on another part would read
+                # as one on the part the user has.
+                corrected = found["part_number_corrected"]
+                if corrected and model_number and _wants_compatibility(q) and not _wants_installation(q):
                     return {
                         "session_id": session_id,
-                        "intent": "installation",
-                        "entities": {
-                            "part_number": part["part_number"],
-                            "model_number": model_number,
-                            "brand": part.get("brand"),
-                            "appliance": appliance,
-                        },
-                        "tool_used": "FAISS + DeepSeek",
-                        "tool_output": results,
-                        "answer": answer,
+                        "intent": "part_number_unconfirmed",
+                        "entities": {"did_you_mean": part_number, "model_number": model_number},
+                        "tool_used": None,
+                        "tool_output": [],
+                        "answer": (
+                            f"I could not find that part number in the catalog. Did you mean {part_number}? "
+                            "Please confirm the part number and I will check it against your model."
+                        ),
                     }
 
+                # 3) INSTALLATION FLOW
+                outcome = "searched"
+                if part_number and _wants_installation(q):
+                    result = await self._run_flow(
+                        session_id, "installation", snapshot, part_number,
+                        {"part_number": part_number, "model_number": model_number, "appliance": appliance},
+                        retrieval=[known] if known else None,
+                    )
+                    outcome = "resolved" if known else outcome
+                    if corrected:
+                        # Coalesced callers share the nested dicts; replace, don't mutate.
+                        result["entities"] = {**result["entities"], "part_number_corrected": True}
+                        result["answer"] = (
+                            f"I could not find that part number in the catalog. Did you mean {part_number}? "
+                            f"Here are the steps for it.\n\n{result['answer']}"
+                        )
+
                 
                 # 4) COMPATIBILITY FLOW
-                if part_number and model_number and _wants_compatibility(q):
-                    results = semantic_search(part_number, top_k=1)
-
-                    if not results:
-                        agent_tool_invocations_total.labels("compatibility").inc()
-                        return {
-                            "session_id": session_id,
-                            "intent": "compatibility_unknown",
-                            "entities": {"part_number": part_number, "model_number": model_number},
-                            "tool_used": "FAISS",
-                            "tool_output": [],
-                            "answer": (
-                                f"I could not find part {part_number} for model {model_number}. "
-                                "Compatibility cannot be confirmed."
-                            ),
-                        }
-
-                    part = results[0]
-                    compatible = model_number in part.get("compatible_models", [])
-                    agent_tool_invocations_total.labels("compatibility").inc()
-
-                    return {
-                        "session_id": session_id,
-                        "intent": "compatibility_yes" if compatible else "compatibility_no",
-                        "entities": {"part_number": part["part_number"], "model_number": model_number},
-                        "tool_used": "FAISS",
-                        "tool_output": [part],
-                        "answer": (
-                            "This part is listed as compatible."
-                            if compatible else
-                            "This part is NOT listed as compatible for your model."
-                        ),
-                    }
+                elif part_number and model_number and _wants_compatibility(q):
+                    result = await self._run_flow(
+                        session_id, "compatibility", snapshot, part_number,
+                        {"part_number": part_number, "model_number": model_number},
+                        retrieval=[known] if known else None,
+                    )
+                    outcome = "resolved" if known else outcome
 
                 
                 # 5) MODEL UNKNOWN → BRAND + SYMPTOM SEARCH 
-                if _user_doesnt_know_model(q):
-                    search_query = " ".join(
-                        [x for x in [brand, appliance, symptom, issue_text] if x]
+                elif _user_doesnt_know_model(q):
+                    result = await self._run_flow(
+                        session_id, "brand_symptom", snapshot, query,
+                        {
+                            "model_number": model_number,
+                            "brand": brand,
+                            "appliance": appliance,
+                            "symptom": symptom,
+                            "issue_text": issue_text,
+                        },
                     )
 
-                    results = semantic_search(search_query, top_k=4)
-
-                    if results:
-                        context = "\n".join(
-                            f"{p['name']} — {p.get('symptoms_vector', [])}" for p in results
+         
+                # 6) NORMAL RAG FLOW
+                else:
+                    result = await self._run_flow(
+                        session_id, "rag", snapshot, query,
+                        {"model_number": model_number, "brand": brand, "appliance": appliance},
+                        retrieval=reused if reused is not None else turn["retrieval"],
+                    )
+                    outcome = "reused" if reused is not None else outcome
+
+                # 7) REMEMBER THE PARTS for follow-ups. A part resolved from
+                # them leaves them as they were.
+                retrieval_reuse_total.labels(outcome).inc()
+                if result["tool_output"] and outcome != "resolved":
+                    remember = {
+                        "retrieval": LastRetrieval(
+                            snapshot.version, (appliance, brand, symptom), tuple(result["tool_output"])
                         )
+                    }
+                    if bound:
+                        session.update(remember)
+                    else:
+                        update_session(session_id, remember)
+                return result
+
+            except Exception as e:
+                errors_total.labels("agent").inc()
+                span.record_exception(e)
+                return {
+                    "session_id": session_id,
+                    "intent": "error",
+                    "entities": {},
+                    "tool_used": None,
+                    "tool_output": [],
+                    "answer": "Something went wrong while processing your request. Please try again.",
+                }
 
-                        system_prompt = """
+    # FLOWS
+    # Each flow depends only on (snapshot, prompt, entities) and returns the
+    # response without session_id, so one result can serve coalesced callers.
+
+    def _installation_flow(
+        self,
+        snapshot: CatalogSnapshot,
+        prompt: str,
+        entities: Dict[str, Any],
+        results: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        part_number = entities["part_number"]
+        part = results[0] if results else _find_part(snapshot, part_number)
+
+        if part is None:
+            return {
+                "intent": "install_generic",
+                "entities": {"part_number": part_number},
+                "tool_used": "FAISS",
+                "tool_output": [],
+                "answer": (
+                    "I could not find exact installation steps for this part. "
+                    "Here is a safe general approach:\n"
+                    "1. Disconnect power and water.\n"
+                    "2. Remove access panels.\n"
+                    "3. Remove old part.\n"
+                    "4. Install new part.\n"
+                    "5. Reassemble and restore power.\n\n"
+                    "If you share the model number, I can be more precise."
+                ),
+            }
+
+        # Pre-generated answer (vectorstore/materialize_answers.py) first,
+        # then the template, then a live LLM call.
+        store = get_answer_store()
+        formatted = store.get("installation", part) if store is not None else None
+        path, tool_used = "materialized", "FAISS + Answer Store"
+
+        if formatted is None and INSTALLATION_ANSWER_MODE != "llm":
+            formatted = render_installation(part)
+            path, tool_used = "template", "FAISS + Template"
+
+        degraded = False
+        if formatted is None:
+            try:
+                formatted = generate_installation_answer(part)
+                path, tool_used = "llm", "FAISS + DeepSeek"
+            except LLMUnavailable:
+                degraded_answers_total.labels("installation").inc()
+                formatted = render_installation(part) or FormattedAnswer(
+                    text=render_retrieval_answer([part])
+                )
+                path, tool_used, degraded = "degraded", "FAISS (degraded)", True
+
+        installation_answers_total.labels(path).inc()
+        agent_tool_invocations_total.labels("installation").inc()
+
+        return {
+            "intent": "installation",
+            "entities": {
+                "part_number": part["part_number"],
+                "model_number": entities["model_number"],
+                "brand": part.get("brand"),
+                "appliance": entities["appliance"],
+            },
+            "tool_used": tool_used,
+            "tool_output": [part],
+            "answer": formatted.text,
+            "steps": formatted.steps,
+            "degraded": degraded,
+        }
+
+    def _compatibility_flow(
+        self,
+        snapshot: CatalogSnapshot,
+        prompt: str,
+        entities: Dict[str, Any],
+        results: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        part_number = entities["part_number"]
+        model_number = entities["model_number"]
+        part = results[0] if results else _find_part(snapshot, part_number)
+
+        if part is None:
+            agent_tool_invocations_total.labels("compatibility").inc()
+            return {
+                "intent": "compatibility_unknown",
+                "entities": {"part_number": part_number, "model_number": model_number},
+                "tool_used": "FAISS",
+                "tool_output": [],
+                "answer": (
+                    f"I could not find part {part_number} for model {model_number}. "
+                    "Compatibility cannot be confirmed."
+                ),
+            }
+
+        compatible_models = part.get("compatible_models", [])
+        compatible = model_number in compatible_models
+        agent_tool_invocations_total.labels("compatibility").inc()
+
+        # A partial or unlisted revision: listed for another member of the
+        # same model family is "probably", not "no".
+        family = None if compatible else snapshot.registry.model_trie.family(model_number)
+        listed = [m for m in family.models if m in compatible_models] if family and not family.exact else []
+        if listed:
+            return {
+                "intent": "compatibility_family",
+                "entities": {"part_number": part["part_number"], "model_number": model_number, "model_family": listed},
+                "tool_used": "FAISS + Model Families",
+                "tool_output": [part],
+                "answer": (
+                    f"This part is listed as compatible with the {family.prefix} model family "
+                    f"({', '.join(listed[:3])}), but the exact revision {model_number} is not verified. "
+                    "Check the full model number on the appliance's rating label."
+                ),
+            }
+
+        return {
+            "intent": "compatibility_yes" if compatible else "compatibility_no",
+            "entities": {"part_number": part["part_number"], "model_number": model_number},
+            "tool_used": "FAISS",
+            "tool_output": [part],
+            "answer": (
+                "This part is listed as compatible."
+                if compatible else
+                "This part is NOT listed as compatible for your model."
+            ),
+        }
+
+    def _brand_symptom_flow(self, snapshot: CatalogSnapshot, prompt: str, entities: Dict[str, Any]) -> Dict[str, Any]:
+        brand = entities["brand"]
+        appliance = entities["appliance"]
+        search_query = " ".join(
+            [x for x in [brand, appliance, entities["symptom"], entities["issue_text"]] if x]
+        )
+
+        results = semantic_search(search_query, top_k=4, snapshot=snapshot, appliance=appliance, brand=brand)
+
+        if results:
+            context = "\n".join(
+                f"{p['name']} — {p.get('symptoms_vector', [])}" for p in results
+            )
+
+            system_prompt = """
 You are a PartSelect appliance troubleshooting expert.
 User does NOT know the model.
 Use ONLY the provided data.
@@ -273,77 +744,90 @@ Give safe general guidance.
 Do NOT guarantee compatibility.
 """
 
-                        user_prompt = f"User issue:\n{query}\n\nCatalog data:\n{context}"
-
-                        raw_answer = deepseek_chat(system_prompt, user_prompt)
-                        answer = clean_llm_text(raw_answer)
-                        agent_tool_invocations_total.labels("recommendation").inc()
-
-                        return {
-                            "session_id": session_id,
-                            "intent": "brand_symptom_guidance",
-                            "entities": {"brand": brand, "appliance": appliance},
-                            "tool_used": "FAISS + DeepSeek",
-                            "tool_output": results,
-                            "answer": answer,
-                        }
-
-         
-                # 6) NORMAL RAG FLOW
-                results = semantic_search(query, top_k=4)
+            user_prompt = f"User issue:\n{prompt}\n\nCatalog data:\n{context}"
 
-                if not results:
-                    return {
-                        "session_id": session_id,
-                        "intent": "generic_guidance",
-                        "entities": {
-                            "model_number": model_number,
-                            "brand": brand,
-                            "appliance": appliance,
-                        },
-                        "tool_used": "FAISS",
-                        "tool_output": [],
-                        "answer": (
-                            "I could not find a strong catalog match. "
-                            "Please verify your model number or describe symptoms in more detail."
-                        ),
-                    }
-
-                context = "\n".join(str(p) for p in results)
+            agent_tool_invocations_total.labels("recommendation").inc()
+            try:
+                raw_answer = deepseek_chat(system_prompt, user_prompt, flow="brand_symptom_guidance")
+            except LLMUnavailable:
+                degraded_answers_total.labels("brand_symptom_guidance").inc()
+                return {
+                    "intent": "brand_symptom_guidance",
+                    "entities": {"brand": brand, "appliance": appliance},
+                    "tool_used": "FAISS (degraded)",
+                    "tool_output": results,
+                    "answer": render_retrieval_answer(results),
+                    "degraded": True,
+                }
 
-                system_prompt = """
+            return {
+                "intent": "brand_symptom_guidance",
+                "entities": {"brand": brand, "appliance": appliance},
+                "tool_used": "FAISS + DeepSeek",
+                "tool_output": results,
+                "answer": clean_llm_text(raw_answer),
+            }
+
+        # No catalog match for the brand/symptom search: fall back to the
+        # normal RAG flow, as before.
+        return self._rag_flow(
+            snapshot, prompt,
+            {"model_number": entities["model_number"], "brand": brand, "appliance": appliance},
+        )
+
+    def _rag_flow(
+        self,
+        snapshot: CatalogSnapshot,
+        prompt: str,
+        entities: Dict[str, Any],
+        results: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        if results is None:
+            results = _rag_search(snapshot, prompt, entities.get("appliance"), entities.get("brand"))
+        results = _prefer_family_parts(results, snapshot.registry, entities.get("model_number"))
+
+        if not results:
+            return {
+                "intent": "generic_guidance",
+                "entities": dict(entities),
+                "tool_used": "FAISS",
+                "tool_output": [],
+                "answer": (
+                    "I could not find a strong catalog match. "
+                    "Please verify your model number or describe symptoms in more detail."
+                ),
+            }
+
+        context = "\n".join(str(p) for p in results)
+
+        system_prompt = """
 You are a professional PartSelect expert.
 Use ONLY catalog data.
 Never invent prices or models.
 Give clear reasoning and recommend at most 3 parts.
 """
 
-                user_prompt = f"User issue:\n{query}\n\nCatalog data:\n{context}"
-
-                raw_answer = deepseek_chat(system_prompt, user_prompt)
-                answer = clean_llm_text(raw_answer)
-
-                return {
-                    "session_id": session_id,
-                    "intent": "product_recommendation",
-                    "entities": {
-                        "model_number": model_number,
-                        "brand": brand,
-                        "appliance": appliance,
-                    },
-                    "tool_used": "FAISS + DeepSeek",
-                    "tool_output": results,
-                    "answer": answer,
-                }
-
-            except Exception as e:
-                errors_total.labels("agent").inc()
-                span.record_exception(e)
-                return {
-                    "session_id": session_id,
-                    "intent": "error",
-                    "entities": {},
-                    "tool_used": None,
-                    "tool_output": [],
-                    "answer": "Something went wrong while processing your request. Please try again.",
-                }
+        user_prompt = f"User issue:\n{prompt}\n\nCatalog data:\n{context}"
+
+        try:
+            raw_answer = deepseek_chat(system_prompt, user_prompt, flow="product_recommendation")
+        except LLMUnavailable:
+            degraded_answers_total.labels("product_recommendation").inc()
+            return {
+                "intent": "product_recommendation",
+                "entities": dict(entities),
+                "tool_used": "FAISS (degraded)",
+                "tool_output": results,
+                "answer": render_retrieval_answer(results),
+                "degraded": True,
+            }
+
+        answer = clean_llm_text(raw_answer)
+
+        return {
+            "intent": "product_recommendation",
+            "entities": dict(entities),
+            "tool_used": "FAISS + DeepSeek",
+            "tool_output": results,
+            "answer": answer,
+        }
@@ -0,0 +1,179 @@
+import asyncio
+import os
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Union
+
+import orjson
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from agents.admission import AdmissionController, Overloaded
+from memory.session_store import get_session
+from models.llm_scheduler import request_client
+from observability.metrics import ws_chat_closed_total, ws_chat_connections, ws_chat_messages_total
+from utils.payload import VIEWS, encode_chat_response
+
+# /ws/chat protocol. The client sends {"message", "view"?, "fields"?} frames
+# (the /chat body without session_id); the server answers with JSON frames:
+#   {"type": "session", "session_id"}            once, on connect
+#   {"type": "turn", ...ChatResponse but answer}  per message: intent, entities, tool_output, ...
+#   {"type": "answer", "text"}                    the answer, a few lines per frame
+#   {"type": "done"}                              end of this message's answer
+#   {"type": "error", "status", "detail", "retry_after"?}  message not answered (400 / 429 / 503)
+DONE_FRAME = b'{"type":"done"}'
+
+
+@dataclass(frozen=True)
+class ChatSocketConfig:
+    """
+    /ws/chat settings, read from the environment by `from_env`.
+
+    max_connections     WS_CHAT_MAX_CONNECTIONS     open sockets per worker; more are closed with 1013
+    idle_timeout_s      WS_CHAT_IDLE_TIMEOUT_S      sockets silent for this long are closed
+    send_timeout_s      WS_CHAT_SEND_TIMEOUT_S      a client not taking a frame for this long is dropped
+    answer_chunk_chars  WS_CHAT_ANSWER_CHUNK_CHARS  answer text per frame (whole lines)
+    """
+
+    max_connections: int = 1000
+    idle_timeout_s: float = 600.0
+    send_timeout_s: float = 10.0
+    answer_chunk_chars: int = 512
+
+    @classmethod
+    def from_env(cls) -> "ChatSocketConfig":
+        return cls(
+            max_connections=int(os.getenv("WS_CHAT_MAX_CONNECTIONS", cls.max_connections)),
+            idle_timeout_s=float(os.getenv("WS_CHAT_IDLE_TIMEOUT_S", cls.idle_timeout_s)),
+            send_timeout_s=float(os.getenv("WS_CHAT_SEND_TIMEOUT_S", cls.send_timeout_s)),
+            answer_chunk_chars=int(os.getenv("WS_CHAT_ANSWER_CHUNK_CHARS", cls.answer_chunk_chars)),
+        )
+
+
+class _SlowConsumer(Exception):
+    pass
+
+
+def parse_message(raw: Union[str, bytes]) -> Dict[str, Any]:
+    """Validate one client frame; ValueError says what is wrong with it."""
+    try:
+        req = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        raise ValueError("Frames must be JSON.") from None
+    if not isinstance(req, dict) or not isinstance(req.get("message"), str):
+        raise ValueError('Expected {"message": "..."}.')
+    view = req.get("view", "full")
+    if view not in VIEWS:
+        raise ValueError(f"view must be one of: {', '.join(VIEWS)}.")
+    fields = req.get("fields")
+    if fields is not None and not (isinstance(fields, list) and all(isinstance(f, str) for f in fields)):
+        raise ValueError("fields must be a list of strings.")
+    return {"message": req["message"], "view": view, "fields": fields}
+
+
+def answer_chunks(text: str, size: int) -> Iterator[str]:
+    """Whole lines packed into chunks of up to `size` characters; a longer line is one chunk."""
+    chunk = ""
+    for line in text.splitlines(keepends=True):
+        if chunk and len(chunk) + len(line) > size:
+            yield chunk
+            chunk = ""
+        chunk += line
+    if chunk:
+        yield chunk
+
+
+class ChatSocketServer:
+    """
+    Serves chat turns over one WebSocket per conversation.
+
+    The session is looked up once on connect and passed to every turn, so it
+    stays hot for the connection's lifetime; turns share the /chat admission
+    controller. Backpressure: a connection runs one turn at a time and reads
+    the next message only after the previous answer is sent, so a client
+    sending faster than it is answered fills its own socket buffers, not
+    ours; a client not reading its frames within `send_timeout_s` is dropped.
+    """
+
+    def __init__(self, agent, admission: AdmissionController, config: ChatSocketConfig):
+        self.agent = agent
+        self.admission = admission
+        self.config = config
+        self._open = 0
+
+    def open_connections(self) -> int:
+        return self._open
+
+    async def serve(self, websocket: WebSocket, session_id: Optional[str] = None):
+        await websocket.accept()
+        if self._open >= self.config.max_connections:
+            ws_chat_closed_total.labels("limit").inc()
+            await websocket.close(code=1013, reason="Too many open chat connections.")
+            return
+
+        self._open += 1
+        ws_chat_connections.inc()
+        reason = "client"
+        try:
+            # LLM calls are fair-queued per client (see models/llm_scheduler.py).
+            request_client.set(
+                websocket.headers.get("x-client-id") or (websocket.client.host if websocket.client else None)
+            )
+            session_id = session_id or str(uuid.uuid4())
+            session = get_session(session_id)
+            await self._send(websocket, orjson.dumps({"type": "session", "session_id": session_id}))
+
+            while True:
+                try:
+                    message = await asyncio.wait_for(websocket.receive(), self.config.idle_timeout_s)
+                except asyncio.TimeoutError:
+                    reason = "idle"
+                    await websocket.close(code=1001, reason="Idle timeout.")
+                    return
+                if message["type"] == "websocket.disconnect":
+                    return
+                await self._turn(websocket, session_id, session, message.get("text") or message.get("bytes") or "")
+        except WebSocketDisconnect:
+            pass
+        except _SlowConsumer:
+            reason = "slow_consumer"
+        finally:
+            self._open -= 1
+            ws_chat_connections.dec()
+            ws_chat_closed_total.labels(reason).inc()
+
+    async def _turn(self, websocket: WebSocket, session_id: str, session: Dict[str, Any], raw):
+        try:
+            req = parse_message(raw)
+        except ValueError as e:
+            ws_chat_messages_total.labels("invalid").inc()
+            await self._send(websocket, orjson.dumps({"type": "error", "status": 400, "detail": str(e)}))
+            return
+
+        try:
+            async with self.admission.admit():
+                response = await self.agent.handle_chat(req["message"], session_id=session_id, session=session)
+        except Overloaded as e:
+            ws_chat_messages_total.labels("shed").inc()
+            await self._send(websocket, orjson.dumps({
+                "type": "error",
+                "status": e.status_code,
+                "detail": "The assistant is busy right now. Please retry shortly.",
+                "retry_after": e.retry_after,
+            }))
+            return
+
+        ws_chat_messages_total.labels("answered").inc()
+        turn = {"type": "turn", **{k: v for k, v in response.items() if k != "answer"}}
+        await self._send(
+            websocket,
+            encode_chat_response(turn, view=req["view"], fields=req["fields"]),
+        )
+        for chunk in answer_chunks(response.get("answer") or "", self.config.answer_chunk_chars):
+            await self._send(websocket, orjson.dumps({"type": "answer", "text": chunk}))
+        await self._send(websocket, DONE_FRAME)
+
+    async def _send(self, websocket: WebSocket, frame: bytes):
+        try:
+            await asyncio.wait_for(websocket.send_text(frame.decode()), self.config.send_timeout_s)
+        except asyncio.TimeoutError:
+            raise _SlowConsumer() from None
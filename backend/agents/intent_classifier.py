@@ -25,7 +25,8 @@ def classify_intent(user_message: str) -> str:
     """
     raw = deepseek_chat(
         SYSTEM_PROMPT,
-        user_message
+        user_message,
+        flow="intent_classification",
     )
 
     cleaned = raw.strip().lower()
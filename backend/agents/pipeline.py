@@ -0,0 +1,174 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from opentelemetry import trace
+
+from agents.admission import AdmissionConfig
+from models.llm_scheduler import LLMSchedulerConfig
+
+# --- Observability ---
+from observability.metrics import pipeline_stage_failures_total, pipeline_stage_seconds
+
+tracer = trace.get_tracer(__name__)
+
+# "0" runs every graph one stage at a time in dependency order (for comparison
+# and debugging); results are the same either way.
+CONCURRENT_STAGES = os.getenv("PIPELINE_CONCURRENT_STAGES", "1") != "0"
+
+# Blocking stages and flows run here rather than on asyncio's default
+# executor (min(32, cpu + 4) threads). Every admitted turn may sit in
+# LLMScheduler.submit, so a pool smaller than that turns the executor's FIFO
+# queue into the real LLM queue, ahead of the scheduler's priorities, fair
+# shares and deadlines. Sized for every admitted turn plus every LLM slot.
+WORKER_THREADS = int(
+    os.getenv("AGENT_WORKER_THREADS")
+    or AdmissionConfig.from_env().max_inflight + LLMSchedulerConfig.from_env().max_concurrency
+)
+_workers = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="agent-worker")
+
+
+async def run_blocking(fn: Callable[..., Any], *args: Any) -> Any:
+    """Run `fn(*args)` on the agent worker pool, with the caller's context vars."""
+    call = functools.partial(contextvars.copy_context().run, fn, *args)
+    return await asyncio.get_running_loop().run_in_executor(_workers, call)
+
+
+class StageTimeout(TimeoutError):
+    """A required stage did not finish within its timeout."""
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One node of a StageGraph.
+
+    `fn` gets a read-only mapping of the graph inputs plus the output of every
+    finished stage, by name. Coroutine functions run on the event loop (keep
+    them non-blocking); anything else runs on a worker thread. An `optional`
+    stage that fails or times out yields `default` instead of failing the run.
+    """
+
+    name: str
+    fn: Callable[[Mapping[str, Any]], Any]
+    deps: Tuple[str, ...] = ()
+    timeout_s: Optional[float] = None
+    optional: bool = False
+    default: Any = None
+
+
+class StageGraph:
+    """
+    A small DAG of stages, each started as soon as its dependencies finish,
+    so independent stages (e.g. speculative retrieval and intent
+    classification) overlap. Each stage gets its own tracing span.
+
+    A timed-out stage's worker thread cannot be interrupted: it finishes in
+    the background and its result is dropped.
+    """
+
+    def __init__(self, name: str, stages: Iterable[Stage]):
+        self.name = name
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage {stage.name!r} in {name}")
+            self.stages[stage.name] = stage
+
+        for stage in self.stages.values():
+            missing = [d for d in stage.deps if d not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name!r} depends on unknown {missing}")
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order: List[str] = []
+        state: Dict[str, str] = {}
+
+        def visit(name: str):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Cycle through stage {name!r} in {self.name}")
+            state[name] = "visiting"
+            for dep in self.stages[name].deps:
+                visit(dep)
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    async def run(
+        self,
+        inputs: Optional[Mapping[str, Any]] = None,
+        concurrent: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """Run every stage; returns the inputs plus each stage's output by name."""
+        results: Dict[str, Any] = dict(inputs or {})
+        concurrent = CONCURRENT_STAGES if concurrent is None else concurrent
+
+        with tracer.start_as_current_span(f"pipeline.{self.name}"):
+            if not concurrent:
+                for name in self.order:
+                    results[name] = await self._run_stage(self.stages[name], results)
+                return results
+
+            # Tasks copy the current context, so stage spans nest under the
+            # pipeline span.
+            tasks: Dict[str, asyncio.Task] = {}
+            for name in self.order:
+                stage = self.stages[name]
+                tasks[name] = asyncio.create_task(
+                    self._run_after(stage, [tasks[d] for d in stage.deps], results)
+                )
+            try:
+                await asyncio.gather(*tasks.values())
+            except BaseException:
+                for task in tasks.values():
+                    task.cancel()
+                raise
+            return results
+
+    async def _run_after(self, stage: Stage, deps: List[asyncio.Task], results: Dict[str, Any]):
+        if deps:
+            await asyncio.gather(*deps)
+        results[stage.name] = await self._run_stage(stage, results)
+
+    async def _run_stage(self, stage: Stage, results: Dict[str, Any]) -> Any:
+        with tracer.start_as_current_span(f"stage.{stage.name}") as span:
+            started = time.perf_counter()
+            view = MappingProxyType(results)
+            try:
+                if inspect.iscoroutinefunction(stage.fn):
+                    call = stage.fn(view)
+                else:
+                    call = run_blocking(stage.fn, view)
+                return await asyncio.wait_for(call, stage.timeout_s)
+
+            except asyncio.TimeoutError:
+                pipeline_stage_failures_total.labels(self.name, stage.name, "timeout").inc()
+                span.set_attribute("stage.timed_out", True)
+                if stage.optional:
+                    return stage.default
+                raise StageTimeout(f"Stage {stage.name!r} exceeded {stage.timeout_s}s") from None
+
+            except Exception as e:
+                pipeline_stage_failures_total.labels(self.name, stage.name, "error").inc()
+                span.record_exception(e)
+                if stage.optional:
+                    return stage.default
+                raise
+
+            finally:
+                pipeline_stage_seconds.labels(self.name, stage.name).observe(
+                    time.perf_counter() - started
+                )
@@ -1,9 +1,14 @@
-from typing import Dict, Any
+import os
+from typing import Dict, Any, Optional
 
+from agents.intent_classifier import classify_intent
+from agents.pipeline import Stage, StageGraph
+from tools.entities import extract_entities
 from tools.search_part import search_part
 from tools.compatibility import check_compatibility
 from tools.installation import get_installation_steps
-from tools.troubleshoot import troubleshoot_issue
+from tools.troubleshoot import match_symptoms, troubleshoot_issue
+from vectorstore.search import search_hits
 
 # --- Observability ---
 from observability.metrics import agent_tool_invocations_total, errors_total
@@ -11,19 +16,70 @@ from opentelemetry import trace
 
 tracer = trace.get_tracer(__name__)
 
+# Per-stage timeouts (seconds) for ToolRouter.handle.
+INTENT_TIMEOUT_S = float(os.getenv("ROUTER_INTENT_TIMEOUT_S", "5"))
+RETRIEVAL_TIMEOUT_S = float(os.getenv("ROUTER_RETRIEVAL_TIMEOUT_S", "2"))
+
 
 class ToolRouter:
     """
     Tool routing with OpenTelemetry tracing + Prometheus metrics.
     """
 
-    def route(self, intent: str, query: str, entities: Dict[str, Any]) -> Dict[str, Any]:
+    def __init__(self):
+        # Classification, entity extraction, retrieval and the symptom scan
+        # do not depend on each other, so they run side by side; retrieval is
+        # speculative and only used if the intent needs it.
+        self._graph = StageGraph("tool_router", [
+            Stage(
+                "intent",
+                lambda r: classify_intent(r["query"]),
+                timeout_s=INTENT_TIMEOUT_S,
+                optional=True,
+                default="product_lookup",  # the classifier's own fallback
+            ),
+            Stage("entities", lambda r: {**extract_entities(r["query"]), **r["entities"]}),
+            Stage(
+                "retrieval",
+                lambda r: search_hits(r["query"], top_k=5),
+                timeout_s=RETRIEVAL_TIMEOUT_S,
+                optional=True,
+            ),
+            Stage("symptoms", lambda r: match_symptoms(r["query"]), optional=True),
+            Stage(
+                "route",
+                lambda r: self.route(
+                    r["intent"], r["query"], r["entities"],
+                    hits=r["retrieval"], symptom_matches=r["symptoms"],
+                ),
+                deps=("intent", "entities", "retrieval", "symptoms"),
+            ),
+        ])
+
+    async def handle(self, query: str, entities: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Classify, extract and route one query; returns route()'s result plus the intent."""
+        results = await self._graph.run({"query": query, "entities": {
+            k: v for k, v in (entities or {}).items() if v
+        }})
+        return {"intent": results["intent"], "entities": results["entities"], **results["route"]}
+
+    def route(
+        self,
+        intent: str,
+        query: str,
+        entities: Dict[str, Any],
+        hits: Optional[list] = None,
+        symptom_matches: Optional[list] = None,
+    ) -> Dict[str, Any]:
         intent = (intent or "").lower()
 
         with tracer.start_as_current_span(f"router.{intent}") as span:
             try:
-                span.set_attribute("query", query)
-                span.set_attribute("entities", str(entities))
+                # Sizes and keys only: the raw query and entity values are
+                # large, can hold user data, and cost time on every span.
+                if span.is_recording():
+                    span.set_attribute("query_length", len(query))
+                    span.set_attribute("entities", ",".join(k for k, v in entities.items() if v))
 
                 tool_name = None
                 part_number = entities.get("part_number")
@@ -53,7 +109,7 @@ class ToolRouter:
 
                     return {
                         "tool": tool_name,
-                        "output": troubleshoot_issue(query),
+                        "output": troubleshoot_issue(query, hits=hits, symptom_matches=symptom_matches),
                     }
 
                 if intent == "product_lookup":
@@ -62,7 +118,7 @@ class ToolRouter:
 
                     return {
                         "tool": tool_name,
-                        "output": search_part(query),
+                        "output": search_part(query, hits=hits),
                     }
 
                 # --- FALLBACK ---
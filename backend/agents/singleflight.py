@@ -0,0 +1,47 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from observability.metrics import coalesced_requests_total
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one computation.
+
+    The first caller for a key starts the work as its own task; callers that
+    arrive while it is running await the same task and get the same result
+    (or exception). The task is shielded, so a caller that disconnects does
+    not cancel the work for everyone else. Nothing is cached once it finishes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[Any]],
+        label: str = "default",
+    ) -> Any:
+        task = self._inflight.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finished(key, t))
+        else:
+            coalesced_requests_total.labels(label).inc()
+
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+        # Mark the exception as retrieved even if every waiter went away.
+        if not task.cancelled():
+            task.exception()
@@ -1,16 +1,34 @@
-from fastapi import FastAPI
+import hmac
+import os
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Header, HTTPException, Request, Response, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Any, Dict, Optional
-from data.catalog_registry import load_catalog_registry
+from typing import Any, Dict, List, Literal, Optional
+from data.catalog_snapshot import get_snapshot, reload_catalog_in_background
 
-load_catalog_registry()
+get_snapshot()
 
 
 from observability.tracing import setup_tracing
 from prometheus_fastapi_instrumentator import Instrumentator
 
 from agents.agent import AgentController
+from agents.admission import AdmissionConfig, AdmissionController, Overloaded
+from agents.chat_socket import ChatSocketConfig, ChatSocketServer
+from models.llm_scheduler import request_client
+from observability.multiprocess import mark_worker_dead
+from observability.traffic import TrafficRecorder, replay_id
+from utils.payload import encode_chat_response
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Multi-worker metrics: a stopped worker's live gauges leave the totals.
+    mark_worker_dead()
 
 
 # FastAPI App Config
@@ -18,6 +36,7 @@ app = FastAPI(
     title="PartSelect Chat Agent",
     description="Backend for refrigerator/dishwasher Parts Chat Agent using FAISS + Local Embeddings.",
     version="0.2.0",
+    lifespan=lifespan,
 )
 
 
@@ -35,10 +54,25 @@ app.add_middleware(
 
 agent = AgentController()
 
+# Bounds concurrent /chat turns; the rest wait briefly or are shed with Retry-After.
+admission = AdmissionController(AdmissionConfig.from_env())
+
+# /ws/chat: one connection per conversation, capped per worker.
+chat_sockets = ChatSocketServer(agent, admission, ChatSocketConfig.from_env())
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Opt-in capture of anonymized /chat traffic for replay (TRAFFIC_CAPTURE_PATH).
+traffic_recorder = TrafficRecorder.from_env()
+
 # Pydantic Models-
 class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = None  
+    # Shape of tool_output: "full" part records, or compact "card"s with just
+    # what ProductCard renders. `fields` projects each part to those keys.
+    view: Literal["full", "card"] = "full"
+    fields: Optional[List[str]] = None
 
 
 class ChatResponse(BaseModel):
@@ -48,6 +82,8 @@ class ChatResponse(BaseModel):
     tool_used: str | None
     tool_output: Any
     answer: str
+    steps: List[str] = []  # numbered steps parsed from the answer, when it has any
+    degraded: bool = False  # answered from retrieval alone; the LLM was unavailable
 
 
 class CompatibilityRequest(BaseModel):
@@ -70,11 +106,60 @@ async def health():
 
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat(req: ChatRequest):
-    return await agent.handle_chat(
-        query=req.message,
-        session_id=req.session_id  
-    )
+async def chat(
+    req: ChatRequest,
+    request: Request,
+    x_client_id: Optional[str] = Header(default=None),
+    x_replay_id: Optional[str] = Header(default=None),
+):
+    # LLM calls are fair-queued per client (see models/llm_scheduler.py).
+    request_client.set(x_client_id or (request.client.host if request.client else None))
+    # Set by observability/replay.py, so a stubbed LLM can find the recorded answers.
+    replay_id.set(x_replay_id)
+
+    if traffic_recorder is None:
+        response = await _admit_and_handle(req)
+    else:
+        arrived_at, started = time.time(), time.perf_counter()
+        with traffic_recorder.capture() as llm_calls:
+            try:
+                response = await _admit_and_handle(req)
+            except HTTPException as e:
+                traffic_recorder.record(
+                    llm_calls, arrived_at, req.message, req.session_id, req.view,
+                    e.status_code, time.perf_counter() - started,
+                )
+                raise
+        # The first turn of a session gets its id from the response.
+        traffic_recorder.record(
+            llm_calls, arrived_at, req.message, response.get("session_id") or req.session_id,
+            req.view, 200, time.perf_counter() - started, response,
+        )
+
+    # Encoded directly with orjson (ChatResponse documents the shape).
+    body = encode_chat_response(response, view=req.view, fields=req.fields)
+    return Response(content=body, media_type="application/json")
+
+
+async def _admit_and_handle(req: ChatRequest) -> Dict[str, Any]:
+    try:
+        async with admission.admit():
+            return await agent.handle_chat(
+                query=req.message,
+                session_id=req.session_id  
+            )
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail="The assistant is busy right now. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+@app.websocket("/ws/chat")
+async def ws_chat(websocket: WebSocket, session_id: Optional[str] = None):
+    # Frames and limits: agents/chat_socket.py. Pass ?session_id= to resume a session.
+    await chat_sockets.serve(websocket, session_id)
 
 
 @app.post("/compatibility")
@@ -90,3 +175,28 @@ async def installation(req: InstallationRequest):
 @app.post("/troubleshoot")
 async def troubleshoot(req: TroubleshootRequest):
     return await agent.troubleshoot(req.description)
+
+
+# Admin
+@app.post("/admin/reload-catalog", status_code=202)
+async def reload_catalog(x_admin_token: Optional[str] = Header(default=None)):
+    # Fails closed: without a configured ADMIN_TOKEN nobody may reload.
+    if not ADMIN_TOKEN or not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+
+    started = reload_catalog_in_background()
+    return {
+        "status": "reloading" if started else "already_reloading",
+        "active_version": get_snapshot().version,
+    }
+
+
+@app.get("/admin/catalog")
+async def catalog_info():
+    snapshot = get_snapshot()
+    return {
+        "version": snapshot.version,
+        "loaded_at": snapshot.loaded_at,
+        "parts": len(snapshot.metadata),
+        "models": len(snapshot.registry.models),
+    }
@@ -0,0 +1,127 @@
+# RAG turns with a fixed top-4 retrieval vs the adaptive score cutoff
+# (vectorstore/search.py, RETRIEVAL_*): hits per prompt, prompt tokens, LLM
+# calls skipped by the minimum-score gate, and turn latency.
+#
+# Query embeddings are drawn from the built flat index (vectorstore/index.faiss,
+# from INDEX_SHARDS=0 python -m vectorstore.build_index) so the run needs neither the encoder download nor DeepSeek: "clear" queries
+# sit near one part, "ambiguous" ones between two parts, "off-topic" ones are
+# orthogonal to the catalog. The stub LLM's latency grows with prompt size.
+# Run from backend/: python bench_adaptive_retrieval.py
+
+import asyncio
+import itertools
+import os
+import statistics
+import time
+
+import numpy as np
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "bench-key")
+os.environ.setdefault("TRACING_EXPORTER", "none")
+
+import agents.agent as agent_module
+from data.catalog_snapshot import get_snapshot
+from vectorstore import search as search_module
+from vectorstore.search import RetrievalConfig
+
+TURNS = 60
+MIX = {"clear": 0.6, "ambiguous": 0.25, "off-topic": 0.15}
+LLM_BASE_S = 0.3  # network + completion
+LLM_PREFILL_S_PER_TOKEN = 0.0002
+FIXED = RetrievalConfig(min_score=0.0, relative_gap=1.0)  # every one of the top 4
+
+
+def _unit(v):
+    return (v / np.linalg.norm(v)).astype("float32")
+
+
+def _queries(vectors, rng):
+    basis, _ = np.linalg.qr(vectors.T)
+
+    def noise():
+        q = rng.standard_normal(vectors.shape[1])
+        return _unit(q - basis @ (basis.T @ q))
+
+    queries = []
+    for kind, share in MIX.items():
+        for _ in range(round(TURNS * share)):
+            a, b = rng.choice(len(vectors), 2, replace=False)
+            if kind == "clear":
+                q = 0.8 * vectors[a] + 0.6 * noise()
+            elif kind == "ambiguous":
+                q = 0.5 * vectors[a] + 0.5 * vectors[b] + 0.6 * noise()
+            else:
+                q = noise()
+            queries.append(_unit(q).reshape(1, -1))
+    rng.shuffle(queries)
+    return queries
+
+
+def _measure(queries, config):
+    search_module.RETRIEVAL = config
+    next_query = itertools.cycle(queries).__next__
+    search_module._embed_query = lambda text: next_query()
+    prompt_tokens, llm_calls = [], 0
+
+    def llm(system_prompt, user_prompt, flow=None):
+        nonlocal llm_calls
+        tokens = (len(system_prompt) + len(user_prompt)) / 4  # as models/llm.py estimates
+        prompt_tokens.append(tokens)
+        llm_calls += 1
+        time.sleep(LLM_BASE_S + tokens * LLM_PREFILL_S_PER_TOKEN)
+        return "Check the listed part first."
+
+    agent_module.deepseek_chat = llm
+    agent = agent_module.AgentController()
+
+    async def run():
+        latencies, hits = [], []
+        for i in range(len(queries)):
+            started = time.perf_counter()
+            response = await agent.handle_chat(
+                f"my {('dishwasher', 'refrigerator')[i % 2]} is making a grinding noise, what should I check",
+                session_id=f"bench-{id(config)}-{i}",
+            )
+            latencies.append(time.perf_counter() - started)
+            hits.append(len(response["tool_output"]))
+        return latencies, hits
+
+    latencies, hits = asyncio.run(run())
+    return {
+        "hits": statistics.mean(hits),
+        "llm_calls": llm_calls,
+        "prompt_tokens": statistics.mean(prompt_tokens) if prompt_tokens else 0.0,
+        "total_tokens": sum(prompt_tokens),
+        "p50_ms": statistics.median(latencies) * 1e3,
+        "mean_ms": statistics.mean(latencies) * 1e3,
+    }
+
+
+def main():
+    snapshot = get_snapshot()
+    if snapshot.index is None:
+        raise SystemExit("build the index first: python vectorstore/build_index.py")
+    vectors = snapshot.index.reconstruct_n(0, snapshot.index.ntotal)
+    queries = _queries(vectors, np.random.default_rng(0))
+
+    fixed = _measure(queries, FIXED)
+    adaptive = _measure(queries, RetrievalConfig.from_env())
+
+    print(f"{len(queries)} RAG turns ({', '.join(f'{k} {v:.0%}' for k, v in MIX.items())}), "
+          f"stub LLM {LLM_BASE_S * 1e3:.0f} ms + {LLM_PREFILL_S_PER_TOKEN * 1e6:.0f} µs/prompt token")
+    print(f"{'':22} {'fixed top-4':>12} {'adaptive':>12} {'change':>9}")
+    for key, label in (
+        ("hits", "parts per turn"),
+        ("llm_calls", "LLM calls"),
+        ("prompt_tokens", "prompt tokens / call"),
+        ("total_tokens", "prompt tokens total"),
+        ("p50_ms", "turn p50 ms"),
+        ("mean_ms", "turn mean ms"),
+    ):
+        before, after = fixed[key], adaptive[key]
+        change = (after / before - 1) * 100 if before else 0.0
+        print(f"{label:22} {before:12.1f} {after:12.1f} {change:8.1f}%")
+
+
+if __name__ == "__main__":
+    main()
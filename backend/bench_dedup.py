@@ -0,0 +1,88 @@
+# Index size, search latency and top-5 diversity with and without
+# near-duplicate collapsing (vectorstore/dedup.py, DEDUP_MIN_COSINE).
+#
+# The vectors are the built flat index's (vectorstore/index.faiss, from
+# INDEX_SHARDS=0 python -m vectorstore.build_index), each copied
+# COPIES times with a little noise (cosine ~0.995 to the original), like the
+# catalog's re-listed clones at a larger scale. Both indexes are built the
+# way build_index.py does, batch by batch. Queries sit near one part; the
+# diversity columns count distinct catalog parts (a copy counts as its
+# original) and distinct part names among the top 5 hits.
+# Run from backend/: python bench_dedup.py
+
+import os
+import time
+
+import faiss
+import numpy as np
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "bench-key")
+
+from data.catalog_snapshot import get_snapshot
+from vectorstore.dedup import MIN_COSINE, DuplicateGrouper
+
+COPIES = 40
+NOISE = 0.1
+BATCH_SIZE = 256
+QUERIES = 500
+TOP_K = 5
+
+
+def _unit(m):
+    return (m / np.linalg.norm(m, axis=-1, keepdims=True)).astype("float32")
+
+
+def _catalog(vectors, rng):
+    # Copies interleaved, as clones are spread through the catalog file.
+    n, d = vectors.shape
+    matrix = np.repeat(vectors[None], COPIES, axis=0).reshape(-1, d)
+    matrix = _unit(matrix + NOISE / np.sqrt(d) * rng.standard_normal(matrix.shape))
+    return matrix
+
+
+def _build(matrix, grouper):
+    started = time.perf_counter()
+    index = faiss.IndexIDMap(faiss.IndexFlatL2(matrix.shape[1]))
+    for start in range(0, len(matrix), BATCH_SIZE):
+        batch = matrix[start:start + BATCH_SIZE]
+        rows = np.arange(start, start + len(batch), dtype=np.int64)
+        if grouper is not None:
+            keep = grouper.assign([None] * len(batch), batch, rows)
+            batch, rows = np.ascontiguousarray(batch[keep]), rows[keep]
+        index.add_with_ids(batch, rows)
+    return index, time.perf_counter() - started
+
+
+def _measure(index, queries, names):
+    started = time.perf_counter()
+    _, ids = index.search(queries, TOP_K)
+    search_ms = (time.perf_counter() - started) * 1e3 / len(queries)
+    parts = np.mean([len(set(row % len(names))) for row in ids])
+    distinct_names = np.mean([len(set(names[row % len(names)])) for row in ids])
+    return search_ms, parts, distinct_names
+
+
+def main():
+    snapshot = get_snapshot()
+    if snapshot.index is None:
+        raise SystemExit("build the index first: python vectorstore/build_index.py")
+    rng = np.random.default_rng(0)
+    vectors = snapshot.index.reconstruct_n(0, snapshot.index.ntotal)
+    names = np.array([p["name"] for p in snapshot.metadata[:len(vectors)]])
+    matrix = _catalog(vectors, rng)
+
+    picks = rng.choice(len(vectors), QUERIES)
+    queries = _unit(vectors[picks] + 0.6 / np.sqrt(vectors.shape[1]) * rng.standard_normal((QUERIES, vectors.shape[1])))
+
+    print(f"{len(vectors)} parts x {COPIES} noisy copies = {len(matrix)} vectors, "
+          f"{QUERIES} queries, top {TOP_K}, DEDUP_MIN_COSINE={MIN_COSINE}\n")
+    print(f"{'':10} {'vectors':>9} {'index MB':>9} {'build s':>8} {'search ms':>10} {'parts':>9} {'names':>9}")
+    for label, grouper in (("all", None), ("collapsed", DuplicateGrouper())):
+        index, build_s = _build(matrix, grouper)
+        search_ms, parts, distinct_names = _measure(index, queries, names)
+        size_mb = index.ntotal * (index.d * 4 + 8) / 1e6
+        print(f"{label:10} {index.ntotal:>9} {size_mb:>9.1f} {build_s:>8.2f} {search_ms:>10.3f} {parts:>9.2f} {distinct_names:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Typo-tolerant model lookup: FuzzyIndex vs a brute-force edit-distance scan.
+# Run from backend/: python bench_fuzzy_index.py [num_models]
+
+import random
+import statistics
+import string
+import sys
+import time
+
+from data.fuzzy_index import FuzzyIndex, edit_distance
+
+NUM_MODELS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+QUERIES = 2_000
+BRUTE_FORCE_QUERIES = 20  # a full scan per query is slow; sample a few
+ALPHABET = string.ascii_uppercase + string.digits
+
+
+def _model(rng):
+    # Shapes like WDT780SAEM1 / LFX28968ST: letters, digits, suffix.
+    return (
+        "".join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(2, 4)))
+        + "".join(rng.choice(string.digits) for _ in range(rng.randint(3, 5)))
+        + "".join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 4)))
+    )
+
+
+def _typo(rng, s):
+    i = rng.randrange(len(s))
+    op = rng.choice("sdit")
+    if op == "s":
+        return s[:i] + rng.choice(ALPHABET) + s[i + 1:]
+    if op == "d":
+        return s[:i] + s[i + 1:]
+    if op == "i":
+        return s[:i] + rng.choice(ALPHABET) + s[i:]
+    if i + 1 < len(s):
+        return s[:i] + s[i + 1] + s[i] + s[i + 2:]
+    return s
+
+
+def _brute_force(terms, query, k=2):
+    return {t for t in terms if edit_distance(query, t, k) <= k}
+
+
+def _percentile(samples, p):
+    return sorted(samples)[int(len(samples) * p) - 1]
+
+
+def main():
+    rng = random.Random(42)
+    models = sorted({_model(rng) for _ in range(NUM_MODELS)})
+
+    t0 = time.perf_counter()
+    index = FuzzyIndex(models)
+    build_s = time.perf_counter() - t0
+    print(f"models: {len(index):,}  build: {build_s:.1f}s  index: {index.nbytes() / 1e6:.1f} MB")
+
+    queries = [_typo(rng, rng.choice(models)) for _ in range(QUERIES)]
+
+    timings = []
+    for q in queries:
+        t = time.perf_counter()
+        index.lookup(q)
+        timings.append(time.perf_counter() - t)
+    print(
+        f"indexed     mean {statistics.mean(timings) * 1e3:8.3f} ms"
+        f"  p99 {_percentile(timings, 0.99) * 1e3:8.3f} ms"
+    )
+
+    brute_timings = []
+    for q in queries[:BRUTE_FORCE_QUERIES]:
+        t = time.perf_counter()
+        expected = _brute_force(models, q)
+        brute_timings.append(time.perf_counter() - t)
+        found = {m.term for m in index.lookup(q, limit=len(models))}
+        assert found == expected, (q, found ^ expected)
+    print(
+        f"brute force mean {statistics.mean(brute_timings) * 1e3:8.3f} ms"
+        f"  ({BRUTE_FORCE_QUERIES} queries, results identical)"
+    )
+    print(f"speedup: {statistics.mean(brute_timings) / statistics.mean(timings):,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Worker boot: the catalog registry (entity sets, fuzzy indexes, model
+# trie) parsed and rebuilt from the catalog JSON vs loaded from the compiled
+# registry (data/registry.bin, `python -m data.catalog_registry`).
+#
+# A generated catalog with about 1M distinct model numbers is written to a
+# temp dir. Each load runs in a fresh interpreter, as a worker would boot;
+# the snapshot load includes hashing the catalog to validate it.
+# Run from backend/: python bench_registry_boot.py [parts]
+
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+from pathlib import Path
+
+from data.data_generator import generate, write_catalog
+
+PARTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+MODEL_POOL = 2_000_000
+FANOUT = (8, 12)  # extra compatible models per part
+
+_LOAD = textwrap.dedent(
+    """
+    import sys, time
+    started = time.perf_counter()
+    from data.catalog_registry import load_registry
+    registry = load_registry(sys.argv[1], snapshot_path=sys.argv[2])
+    registry.model_trie.family("WDT780SAEM")
+    elapsed = time.perf_counter() - started
+    with open("/proc/self/status") as f:
+        peak_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+    print(elapsed, peak_kb, len(registry.models))
+    """
+)
+
+
+def _boot(catalog, snapshot):
+    result = subprocess.run(
+        [sys.executable, "-c", _LOAD, str(catalog), str(snapshot)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    seconds, peak_kb, models = result.stdout.split()[-3:]
+    return float(seconds), int(peak_kb) / 1024, int(models)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog, snapshot = Path(tmp) / "catalog.jsonl", Path(tmp) / "registry.bin"
+        write_catalog(generate(PARTS, seed=7, num_models=MODEL_POOL, fanout=FANOUT, workers=os.cpu_count() or 1), catalog)
+
+        # Compiled in a child too: the parent would keep its heap.
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", "import sys; from data.catalog_registry import compile_registry; "
+             "compile_registry(sys.argv[1], sys.argv[2])", str(catalog), str(snapshot)],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            check=True,
+        )
+        compile_s = time.perf_counter() - started
+
+        rebuilt = _boot(catalog, Path(tmp) / "missing.bin")
+        loaded = _boot(catalog, snapshot)
+
+        print(f"{PARTS} parts, {rebuilt[2]} models; catalog {catalog.stat().st_size / 2**20:.0f} MB, "
+              f"compiled registry {snapshot.stat().st_size / 2**20:.0f} MB (compiled in {compile_s:.1f}s)\n")
+        print(f"{'':22} {'boot s':>8} {'peak RSS MB':>12}")
+        print(f"{'parse catalog JSON':22} {rebuilt[0]:>8.2f} {rebuilt[1]:>12.0f}")
+        print(f"{'compiled registry':22} {loaded[0]:>8.2f} {loaded[1]:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
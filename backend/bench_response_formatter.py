@@ -0,0 +1,36 @@
+# Throughput of clean_llm_text vs. the original six-pass regex implementation.
+# Run from backend/: python bench_response_formatter.py
+
+import timeit
+
+from test_response_formatter import CORPUS, legacy_clean_llm_text
+from utils.response_formatter import StreamingFormatter, clean_llm_text
+
+NUMBER = 2000
+
+
+def _stream(text: str, chunk: int = 16):
+    formatter = StreamingFormatter()
+    for i in range(0, len(text), chunk):
+        formatter.feed(text[i:i + chunk])
+    formatter.finish()
+
+
+def _best(fn, text):
+    return min(timeit.repeat(lambda: fn(text), number=NUMBER, repeat=5)) / NUMBER * 1e6
+
+
+if __name__ == "__main__":
+    answers = [t for t in CORPUS if t]
+    samples = {
+        "corpus (avg/answer)": answers,
+        "long markup answer": [CORPUS[2] * 8],
+        "long plain answer": ["Check the drain hose for kinks and clear the filter.\n" * 40],
+    }
+
+    print(f"{'sample':<22}{'legacy us':>12}{'single-pass us':>16}{'streaming us':>14}{'speedup':>9}")
+    for name, texts in samples.items():
+        legacy = sum(_best(legacy_clean_llm_text, t) for t in texts) / len(texts)
+        single = sum(_best(clean_llm_text, t) for t in texts) / len(texts)
+        stream = sum(_best(_stream, t) for t in texts) / len(texts)
+        print(f"{name:<22}{legacy:>12.1f}{single:>16.1f}{stream:>14.1f}{legacy / single:>8.2f}x")
@@ -0,0 +1,64 @@
+# /chat response size and serialization time: pydantic ChatResponse + JSONResponse
+# (the previous path) vs orjson with full parts, pre-encoded cards, and field projection.
+# Run from backend/: python bench_response_payload.py
+
+import os
+import time
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "bench-key")
+os.environ.setdefault("TRACING_EXPORTER", "none")
+
+from fastapi.responses import JSONResponse
+
+from app import ChatResponse
+from data.catalog_snapshot import get_snapshot
+from utils.payload import encode_chat_response
+
+ITERATIONS = 20_000
+
+
+def _response(parts):
+    return {
+        "session_id": "0f8fad5b-d9cb-469f-a165-70867728950e",
+        "intent": "product_recommendation",
+        "entities": {"model_number": "WDT780SAEM1", "brand": "Whirlpool", "appliance": "dishwasher"},
+        "tool_used": "FAISS + DeepSeek",
+        "tool_output": parts,
+        "answer": "Based on your symptoms, the drain pump is the most likely cause. " * 6,
+    }
+
+
+def _pydantic(resp, snapshot):
+    model = ChatResponse.model_validate(resp)
+    return JSONResponse(model.model_dump(mode="json")).body
+
+
+def _time(fn, resp, snapshot):
+    body = fn(resp, snapshot)
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn(resp, snapshot)
+    return len(body), (time.perf_counter() - start) / ITERATIONS
+
+
+def main():
+    snapshot = get_snapshot()
+    resp = _response(snapshot.metadata[:4])  # rag / brand_symptom return top 4
+
+    cases = [
+        ("pydantic + JSONResponse (before)", _pydantic),
+        ("orjson, view=full", lambda r, s: encode_chat_response(r)),
+        ("orjson, view=card", lambda r, s: encode_chat_response(r, view="card", cards=s.cards)),
+        ("orjson, fields=id,name,price",
+         lambda r, s: encode_chat_response(r, fields=["id", "name", "price"])),
+    ]
+
+    results = [(name, *_time(fn, resp, snapshot)) for name, fn in cases]
+    base_time = results[0][2]
+
+    print(f"{'path':34} {'bytes':>7} {'µs/resp':>9} {'speedup':>8}")
+    for name, size, per in results:
+        print(f"{name:34} {size:7d} {per * 1e6:9.1f} {base_time / per:7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Multi-turn conversations with and without reusing the session's last
+# retrieval for follow-ups (agents/agent.py), with a stub LLM and a stub
+# retrieval standing in for DeepSeek and embedding + FAISS.
+#
+# Each conversation asks about a symptom, then follows up about the parts it
+# got back; reports searches run, and the mean latency and the intent each
+# follow-up turn was answered with (without reuse, "it" is not a part number
+# and the follow-ups are answered from a new search).
+# Run from backend/: python bench_session_reuse.py
+
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "bench-key")
+os.environ.setdefault("TRACING_EXPORTER", "none")
+
+import agents.agent as agent_module
+from data.catalog_snapshot import get_snapshot
+
+CONVERSATIONS = 20
+LLM_S = 0.25  # answer round trip
+RETRIEVAL_S = 0.04  # query embedding + FAISS search
+
+_last_retrieval = agent_module._last_retrieval
+
+
+def _measure(reuse):
+    snapshot = get_snapshot()
+    parts = snapshot.metadata[:4]
+    model = parts[0]["compatible_models"][0]
+    turns = [
+        "my whirlpool dishwasher is leaking",
+        "which of these is cheapest for my dishwasher?",
+        "how do I install it in my dishwasher?",
+        f"is it compatible with {model}?",
+    ]
+    searches, latency, intents = [], {t: [] for t in turns[1:]}, {}
+
+    def search(query, top_k=5, snapshot=None, **filters):
+        searches.append(query)
+        time.sleep(RETRIEVAL_S)
+        return parts[:top_k]
+
+    def llm(*args, **kwargs):
+        time.sleep(LLM_S)
+        return "Try these parts."
+
+    agent_module.semantic_search = search
+    agent_module.deepseek_chat = llm
+    agent_module._last_retrieval = _last_retrieval if reuse else (lambda session, snapshot: None)
+    controller = agent_module.AgentController()
+
+    async def run():
+        for i in range(CONVERSATIONS):
+            for turn in turns:
+                started = time.perf_counter()
+                answer = await controller.handle_chat(turn, session_id=f"bench-{reuse}-{i}")
+                if turn in latency:
+                    latency[turn].append((time.perf_counter() - started) * 1000)
+                    intents[turn] = answer["intent"]
+
+    asyncio.run(run())
+    return len(searches) / CONVERSATIONS, {t: f"{statistics.mean(v):.1f} {intents[t]}" for t, v in latency.items()}
+
+
+def main():
+    print(f"{CONVERSATIONS} conversations; stub LLM {LLM_S * 1000:.0f} ms, stub retrieval {RETRIEVAL_S * 1000:.0f} ms\n")
+    results = {label: _measure(reuse) for label, reuse in (("search every turn", False), ("reuse follow-ups", True))}
+
+    print(f"{'':20} {'searches/conv':>14}")
+    for label, (searches, _) in results.items():
+        print(f"{label:20} {searches:>14.1f}")
+
+    print(f"\n{'follow-up turn':46} " + " ".join(f"{label + ' (ms, intent)':<36}" for label in results))
+    for turn in results["search every turn"][1]:
+        print(f"{turn:46} " + " ".join(f"{latency[turn]:<36}" for _, latency in results.values()))
+
+
+if __name__ == "__main__":
+    main()
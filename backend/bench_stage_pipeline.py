@@ -0,0 +1,101 @@
+# End-to-end turn latency with stages run one after another vs on the
+# concurrent stage graph (agents/pipeline.py), with a stub LLM and a stub
+# retrieval standing in for DeepSeek and embedding + FAISS.
+# Run from backend/: python bench_stage_pipeline.py
+
+import asyncio
+import dataclasses
+import os
+import statistics
+import time
+
+import orjson
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "bench-key")
+os.environ.setdefault("TRACING_EXPORTER", "none")
+
+import agents.agent as agent_module
+import agents.router as router_module
+from agents import pipeline
+from data.catalog_registry import build_registry
+from data.catalog_snapshot import get_snapshot
+from data.data_generator import generate
+from tools import troubleshoot
+
+TURNS = 30
+LLM_S = 0.25  # intent classification / answer round trip
+RETRIEVAL_S = 0.04  # query embedding + FAISS search
+
+
+def _stub_retrieval(result):
+    def search(query, top_k=5, snapshot=None, **filters):
+        time.sleep(RETRIEVAL_S)
+        return result
+    return search
+
+
+def _stub_llm(answer):
+    def llm(*args, **kwargs):
+        time.sleep(LLM_S)
+        return answer
+    return llm
+
+
+def _measure(turn, concurrent):
+    pipeline.CONCURRENT_STAGES = concurrent
+
+    async def run():
+        samples = []
+        for i in range(TURNS):
+            started = time.perf_counter()
+            await turn(i)
+            samples.append(time.perf_counter() - started)
+        return samples
+
+    return asyncio.run(run())
+
+
+def _report(name, sequential, concurrent):
+    seq, con = statistics.median(sequential), statistics.median(concurrent)
+    print(f"{name:28} {seq * 1e3:10.1f} {con * 1e3:10.1f} {(1 - con / seq) * 100:8.1f}%")
+
+
+def main():
+    snapshot = get_snapshot()
+
+    # ToolRouter: classification overlaps speculative retrieval and the
+    # symptom scan (over a 50k-part list).
+    parts = [orjson.loads(b) for b in generate(50_000, seed=1, symptom_vocab=2_000)]
+    legacy = [{**p, "symptoms": p.get("symptoms_vector", [])} for p in parts]
+    hits = [{"part": p, "score": 0.5} for p in parts[:5]]
+    router_module.classify_intent = lambda q: (time.sleep(LLM_S), "troubleshooting")[1]
+    router_module.search_hits = _stub_retrieval(hits)
+    troubleshoot.search_hits = _stub_retrieval(hits)
+    troubleshoot._load_parts = lambda: legacy
+    router = router_module.ToolRouter()
+
+    async def router_turn(i):
+        await router.handle(f"ice maker not working {i}")
+
+    # AgentController RAG turn: entity extraction over a 100k-model registry
+    # overlaps the speculative search; the LLM answer follows both.
+    big = dataclasses.replace(
+        snapshot,
+        registry=build_registry(orjson.loads(b) for b in generate(20_000, seed=2, num_models=100_000, fanout=(5, 10))),
+    )
+    agent_module.get_snapshot = lambda: big
+    agent_module.semantic_search = _stub_retrieval(snapshot.metadata[:4])
+    agent_module.deepseek_chat = _stub_llm("Check the water inlet valve.")
+    agent = agent_module.AgentController()
+
+    async def agent_turn(i):
+        await agent.handle_chat(f"my refrigerator ice maker is leaking water {i}", session_id=f"bench-{i}")
+
+    print(f"stub LLM {LLM_S * 1e3:.0f} ms, stub retrieval {RETRIEVAL_S * 1e3:.0f} ms, {TURNS} turns")
+    print(f"{'turn':28} {'seq p50 ms':>10} {'graph p50':>10} {'saved':>9}")
+    for name, turn in (("ToolRouter troubleshooting", router_turn), ("AgentController RAG", agent_turn)):
+        _report(name, _measure(turn, False), _measure(turn, True))
+
+
+if __name__ == "__main__":
+    main()
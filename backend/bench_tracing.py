@@ -0,0 +1,91 @@
+# Per-request tracing overhead for the span shape of one /chat turn.
+# Spans are OTLP-encoded and discarded, so export cost is counted without a network.
+# Run from backend/: python bench_tracing.py
+
+import time
+
+from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from opentelemetry.trace import NoOpTracerProvider
+
+from observability.tracing import TracingConfig, build_tracer_provider
+
+REQUESTS = 20_000
+QUERY = "My Whirlpool dishwasher WDT780SAEM1 is not draining and makes a humming noise " * 3
+ENTITIES = {
+    "part_number": "PS11752778",
+    "model_number": "WDT780SAEM1",
+    "brand": "Whirlpool",
+    "appliance": "dishwasher",
+}
+
+
+class _EncodeOnlyExporter(SpanExporter):
+    def export(self, spans):
+        encode_spans(spans).SerializeToString()
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+
+def _turn_before(tracer):
+    # Attributes as the router set them before: full query and str(entities).
+    with tracer.start_as_current_span("agent.handle_chat") as span:
+        span.set_attribute("query_length", len(QUERY))
+        with tracer.start_as_current_span("router.installation") as s:
+            s.set_attribute("query", QUERY)
+            s.set_attribute("entities", str(ENTITIES))
+        with tracer.start_as_current_span("vectorstore.semantic_search") as s:
+            s.set_attribute("query_length", len(QUERY))
+            s.set_attribute("results_count", 4)
+        with tracer.start_as_current_span("deepseek.chat") as s:
+            s.set_attribute("system_prompt_length", 180)
+            s.set_attribute("user_prompt_length", 2400)
+
+
+def _turn_after(tracer):
+    with tracer.start_as_current_span("agent.handle_chat") as span:
+        span.set_attribute("query_length", len(QUERY))
+        with tracer.start_as_current_span("router.installation") as s:
+            if s.is_recording():
+                s.set_attribute("query_length", len(QUERY))
+                s.set_attribute("entities", ",".join(k for k, v in ENTITIES.items() if v))
+        with tracer.start_as_current_span("vectorstore.semantic_search") as s:
+            s.set_attribute("query_length", len(QUERY))
+            s.set_attribute("results_count", 4)
+        with tracer.start_as_current_span("deepseek.chat") as s:
+            s.set_attribute("system_prompt_length", 180)
+            s.set_attribute("user_prompt_length", 2400)
+
+
+def _measure(provider, turn) -> float:
+    tracer = provider.get_tracer("bench")
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        turn(tracer)
+    if hasattr(provider, "force_flush"):
+        provider.force_flush()
+    elapsed = time.perf_counter() - start
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+    return elapsed / REQUESTS * 1e6
+
+
+def _configured(**kwargs):
+    return build_tracer_provider(TracingConfig(**kwargs), exporter=_EncodeOnlyExporter())
+
+
+if __name__ == "__main__":
+    scenarios = [
+        ("before: 100% traced, raw attributes", lambda: _configured(max_attribute_length=None), _turn_before),
+        ("after: 100% traced, trimmed attributes", lambda: _configured(), _turn_after),
+        ("after: tail 10% (errors/slow kept)", lambda: _configured(tail_sample_ratio=0.1), _turn_after),
+        ("after: head 10%", lambda: _configured(head_sample_ratio=0.1), _turn_after),
+        ("after: head 10% + tail 10%", lambda: _configured(head_sample_ratio=0.1, tail_sample_ratio=0.1), _turn_after),
+        ("after: exporter off", NoOpTracerProvider, _turn_after),
+    ]
+
+    print(f"{'scenario':<42}{'us/request':>12}")
+    for name, make_provider, turn in scenarios:
+        print(f"{name:<42}{_measure(make_provider(), turn):>12.1f}")
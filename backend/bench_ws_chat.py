@@ -0,0 +1,123 @@
+# Chat turns per second on one uvicorn worker: POST /chat (keep-alive
+# connections, the session id sent with every turn) vs /ws/chat (one
+# WebSocket per conversation, session bound to the connection).
+#
+# The server runs the real app and agent in a subprocess, with search and
+# DeepSeek stubbed out so the numbers measure the per-turn HTTP / WebSocket
+# handling rather than the LLM. Besides wall-clock throughput, the worker's
+# own CPU time per turn is reported: 1 / (CPU per turn) is what one worker
+# can sustain, independent of how fast this client drives it.
+# Run from backend/: python bench_ws_chat.py
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+
+import httpx
+import orjson
+from websockets.asyncio.client import connect
+
+SESSIONS = 32
+TURNS = 40  # per session
+MESSAGES = [
+    "My WDT780SAEM1 dishwasher is leaking from the door {i}",
+    "the dishwasher still will not drain, what should I check {i}",
+    "which refrigerator water filter fits a whirlpool fridge {i}",
+]
+
+_SERVER = textwrap.dedent(
+    """
+    import sys
+    import uvicorn
+    import agents.agent as agent_module
+    import app as app_module
+    from data.catalog_snapshot import get_snapshot
+
+    parts = get_snapshot().metadata[:4]
+    answer = "The drain pump is the usual cause.\\n1. Unplug the dishwasher.\\n2. Replace the pump."
+    agent_module.semantic_search = lambda q, top_k=5, snapshot=None, **kw: parts[:top_k]
+    agent_module.deepseek_chat = lambda system_prompt, user_prompt, flow=None: answer
+    uvicorn.run(app_module.app, host="127.0.0.1", port=int(sys.argv[1]), log_level="warning")
+    """
+)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def _post_session(client, n):
+    session_id = None
+    for i in range(TURNS):
+        body = {"message": MESSAGES[i % len(MESSAGES)].format(i=n * TURNS + i), "session_id": session_id, "view": "card"}
+        response = await client.post("/chat", json=body)
+        response.raise_for_status()
+        session_id = response.json()["session_id"]
+
+
+async def _ws_session(url, n):
+    async with connect(url) as ws:
+        orjson.loads(await ws.recv())  # session frame
+        for i in range(TURNS):
+            await ws.send(orjson.dumps({"message": MESSAGES[i % len(MESSAGES)].format(i=n * TURNS + i), "view": "card"}).decode())
+            while orjson.loads(await ws.recv())["type"] != "done":
+                pass
+
+
+async def _run(mode, port):
+    if mode == "POST /chat":
+        limits = httpx.Limits(max_connections=SESSIONS, max_keepalive_connections=SESSIONS)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await asyncio.gather(*(_post_session(client, n) for n in range(SESSIONS)))
+    else:
+        await asyncio.gather(*(_ws_session(f"ws://127.0.0.1:{port}/ws/chat", n) for n in range(SESSIONS)))
+
+
+def _wait_ready(port, server):
+    deadline = time.monotonic() + 120
+    while True:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=2)
+            return
+        except httpx.TransportError:
+            if time.monotonic() > deadline or server.poll() is not None:
+                raise RuntimeError("server did not start")
+            time.sleep(0.5)
+
+
+def main():
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-c", _SERVER, str(port)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, "DEEPSEEK_API_KEY": "bench-key", "TRACING_EXPORTER": "none"},
+    )
+    try:
+        _wait_ready(port, server)
+        turns = SESSIONS * TURNS
+        print(f"{SESSIONS} sessions x {TURNS} turns, 1 worker, search + LLM stubbed\n")
+        print(f"{'mode':<11} {'turns/s':>8} {'worker CPU ms/turn':>19} {'turns/s per CPU-s':>18}")
+        for mode in ("POST /chat", "/ws/chat", "POST /chat", "/ws/chat"):
+            cpu, started = _cpu_seconds(server.pid), time.perf_counter()
+            asyncio.run(_run(mode, port))
+            wall, cpu = time.perf_counter() - started, _cpu_seconds(server.pid) - cpu
+            print(f"{mode:<11} {turns / wall:>8.0f} {cpu / turns * 1000:>19.2f} {turns / cpu:>18.0f}")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from utils.response_formatter import FormattedAnswer
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+ANSWER_STORE_PATH = Path(
+    os.getenv("ANSWER_STORE_PATH", BASE_DIR / "vectorstore" / "answers.sqlite")
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    flow            TEXT NOT NULL,
+    part_id         TEXT NOT NULL,
+    part_digest     TEXT NOT NULL,
+    answer          TEXT NOT NULL,
+    steps           TEXT NOT NULL,
+    created_at      REAL NOT NULL,
+    PRIMARY KEY (flow, part_id)
+)
+"""
+
+
+def part_digest(part: Dict[str, Any]) -> str:
+    """Content hash of one part record; an answer is valid while it matches."""
+    raw = json.dumps(part, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+class AnswerStore:
+    """
+    Pre-generated answers in SQLite, one row per (flow, part id).
+
+    Each row records the digest of the part record it was generated from.
+    Lookups only return an answer whose digest matches the part being served,
+    so a row left over from an older catalog is never served for changed
+    data, while parts a new catalog leaves unchanged keep their answers.
+    """
+
+    def __init__(self, path: Path = ANSWER_STORE_PATH):
+        self.path = Path(path)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        # WAL lets the serving process read while the build job writes.
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        # Stores written before the digest replaced the catalog version.
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(answers)")}
+        if "catalog_version" in columns:
+            self._conn.execute("ALTER TABLE answers DROP COLUMN catalog_version")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, flow: str, part: Dict[str, Any]) -> Optional[FormattedAnswer]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT part_digest, answer, steps FROM answers WHERE flow = ? AND part_id = ?",
+                (flow, part.get("id")),
+            ).fetchone()
+
+        if row is None or row[0] != part_digest(part):
+            return None
+        return FormattedAnswer(text=row[1], steps=json.loads(row[2]))
+
+    def put(self, flow: str, part: Dict[str, Any], answer: FormattedAnswer):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    flow,
+                    part["id"],
+                    part_digest(part),
+                    answer.text,
+                    json.dumps(answer.steps),
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+
+    def digests(self, flow: str) -> Dict[str, str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT part_id, part_digest FROM answers WHERE flow = ?", (flow,)
+            ).fetchall()
+        return dict(rows)
+
+    def prune(self, flow: str, keep_part_ids: Iterable[str]) -> int:
+        """Delete answers for parts no longer in the catalog."""
+        stale = set(self.digests(flow)) - set(keep_part_ids)
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM answers WHERE flow = ? AND part_id = ?",
+                [(flow, pid) for pid in stale],
+            )
+            self._conn.commit()
+        return len(stale)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[AnswerStore] = None
+_store_lock = threading.Lock()
+
+
+def get_answer_store() -> Optional[AnswerStore]:
+    """The shared store, or None until the materialization job has created it."""
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None and ANSWER_STORE_PATH.exists():
+                _store = AnswerStore(ANSWER_STORE_PATH)
+    return _store
@@ -1,8 +1,24 @@
-import json
+import hashlib
+import os
+import time
+from array import array
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Set
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Set
 
-CATALOG_PATH = Path(__file__).parent / "full_catalog.json"
+import numpy as np
+
+from data.fuzzy_index import FuzzyIndex
+from data.ingest import is_jsonl, iter_records, parse_catalog  # noqa: F401  (re-exported)
+from data.model_trie import ModelTrie
+from data.registry_snapshot import pack_strings, read_arrays, unpack_strings, write_arrays
+from observability.metrics import catalog_registry_loads_total
+
+# A JSON array (*.json) or JSON Lines (*.jsonl), e.g. from data/data_generator.py.
+CATALOG_PATH = Path(os.getenv("CATALOG_PATH", Path(__file__).parent / "full_catalog.json"))
+# The compiled registry (`python -m data.catalog_registry`), used instead of
+# parsing the catalog when it was compiled from the same catalog bytes.
+REGISTRY_PATH = Path(__file__).parent / "registry.bin"
 
 KNOWN_BRANDS: Set[str] = set()
 KNOWN_PART_NUMBERS: Set[str] = set()
@@ -10,31 +26,205 @@ KNOWN_MODELS: Set[str] = set()
 KNOWN_SYMPTOMS: Set[str] = set()
 
 
-def load_catalog_registry():
-    global KNOWN_BRANDS, KNOWN_PART_NUMBERS, KNOWN_MODELS, KNOWN_SYMPTOMS
+@dataclass(frozen=True)
+class CatalogRegistry:
+    """Immutable entity vocabularies derived from one catalog version."""
+
+    brands: FrozenSet[str]
+    part_numbers: FrozenSet[str]
+    models: FrozenSet[str]
+    symptoms: FrozenSet[str]
+    # Typo-tolerant lookup over models / part numbers (edit distance <= 2).
+    model_index: FuzzyIndex
+    part_index: FuzzyIndex
+    # Model families (partial / other-revision model numbers) -> compatible part ids.
+    model_trie: ModelTrie
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        arrays = {name: pack_strings(sorted(getattr(self, name))) for name in _TERM_SETS}
+        for name in _MATCHERS:
+            for key, value in getattr(self, name).to_arrays().items():
+                arrays[f"{name}.{key}"] = value
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Mapping[str, np.ndarray]) -> "CatalogRegistry":
+        fields: Dict[str, Any] = {name: frozenset(unpack_strings(arrays[name])) for name in _TERM_SETS}
+        for name, kind in _MATCHERS.items():
+            prefix = f"{name}."
+            fields[name] = kind.from_arrays({k[len(prefix):]: v for k, v in arrays.items() if k.startswith(prefix)})
+        return cls(**fields)
+
+
+_TERM_SETS = ("brands", "part_numbers", "models", "symptoms")
+_MATCHERS = {"model_index": FuzzyIndex, "part_index": FuzzyIndex, "model_trie": ModelTrie}
+
+
+def iter_catalog(path: Path = CATALOG_PATH) -> Iterator[Dict[str, Any]]:
+    """Catalog records in file order, streamed (see data/ingest.py)."""
+    return iter_records(path)
+
+
+def read_catalog(path: Path = CATALOG_PATH) -> List[Dict[str, Any]]:
+    return list(iter_catalog(path))
+
+
+class RegistryBuilder:
+    """
+    Accumulates the entity vocabularies batch by batch, so the registry can
+    be fed from a streaming ingest pass (data/ingest.py) alongside other sinks.
+
+    With `model_parts`, it also records which parts list each model, for
+    ModelTrie.family_parts; that is a few ints per compatible model, so a
+    builder used only for the vocabularies leaves it off.
+    """
+
+    def __init__(self, model_parts: bool = False):
+        self.model_parts = model_parts
+        self.brands: Set[str] = set()
+        self.part_numbers: Set[str] = set()
+        self.models: Dict[str, int] = {}  # model -> id, in first-seen order
+        self.symptoms: Set[str] = set()
+        # Part j lists the model ids _part_models[_part_ends[j - 1]:_part_ends[j]];
+        # flat arrays, as there are several models per part.
+        self._part_ids: List[str] = []
+        self._part_models = array("i")
+        self._part_ends = array("q")
+
+    def __call__(self, batch: Iterable[Dict[str, Any]]):
+        self.add(batch)
+
+    def add(self, catalog: Iterable[Dict[str, Any]]):
+        for item in catalog:
+
+            if item.get("brand"):
+                self.brands.add(item["brand"].lower())
+
+            part_id = item["id"].upper() if item.get("id") else None
+            if part_id:
+                self.part_numbers.add(part_id)
+
+            model_ids = [
+                self.models.setdefault(m.upper(), len(self.models))
+                for m in item.get("compatible_models", [])
+            ]
+            if self.model_parts and part_id and model_ids:
+                self._part_ids.append(part_id)
+                self._part_models.extend(model_ids)
+                self._part_ends.append(len(self._part_models))
+
+            for s in item.get("symptoms_vector", []):
+                self.symptoms.add(s.lower())
+
+    def build(self) -> CatalogRegistry:
+        return CatalogRegistry(
+            brands=frozenset(self.brands),
+            part_numbers=frozenset(self.part_numbers),
+            models=frozenset(self.models),
+            symptoms=frozenset(self.symptoms),
+            model_index=FuzzyIndex(self.models),
+            part_index=FuzzyIndex(self.part_numbers),
+            model_trie=ModelTrie(list(self.models), self._part_ids, self._part_models, self._part_ends),
+        )
+
+
+def build_registry(catalog: Iterable[Dict[str, Any]]) -> CatalogRegistry:
+    builder = RegistryBuilder(model_parts=True)
+    builder.add(catalog)
+    return builder.build()
+
+
+def hash_file(path: Path, digest=None):
+    """`digest` (a new SHA-256 by default) updated with the file's bytes, streamed."""
+    digest = digest or hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest
+
+
+def save_registry(registry: CatalogRegistry, catalog_sha256: str, path: Path = REGISTRY_PATH):
+    """Compile `registry`, built from the catalog with this SHA-256, to one file."""
+    write_arrays(path, registry.to_arrays(), catalog_sha256=catalog_sha256)
+
+
+def read_saved_registry(path: Path, catalog_sha256: str) -> Optional[CatalogRegistry]:
+    """
+    The registry compiled to `path`, if it was compiled from the catalog
+    with this SHA-256 by the current format. Its lookup arrays are mapped
+    from the file, not copied.
+    """
+    loaded = read_arrays(path)
+    if loaded is None or loaded[0].get("catalog_sha256") != catalog_sha256:
+        return None
+    try:
+        return CatalogRegistry.from_arrays(loaded[1])
+    except (KeyError, ValueError):
+        return None
+
+
+def load_registry(
+    catalog_path: Path = CATALOG_PATH,
+    catalog_sha256: Optional[str] = None,
+    snapshot_path: Path = REGISTRY_PATH,
+) -> CatalogRegistry:
+    """
+    The registry for the catalog at `catalog_path`: the compiled one at
+    `snapshot_path` when it matches the catalog's SHA-256 (hashed here
+    unless given), otherwise rebuilt by parsing the catalog.
+    """
+    catalog_sha256 = catalog_sha256 or hash_file(catalog_path).hexdigest()
+    registry = read_saved_registry(snapshot_path, catalog_sha256)
+    if registry is not None:
+        catalog_registry_loads_total.labels("snapshot").inc()
+        return registry
+
+    catalog_registry_loads_total.labels("catalog").inc()
+    # Streamed: only the vocabularies are kept, never the full record list.
+    return build_registry(iter_catalog(catalog_path))
+
+
+def compile_registry(catalog_path: Path = CATALOG_PATH, out: Path = REGISTRY_PATH) -> CatalogRegistry:
+    """Build the registry from the catalog and save it to `out` for `load_registry`."""
+    # Hashed before parsing: if the catalog changes in between, the saved
+    # hash is the old file's and the snapshot is never used for the new one.
+    catalog_sha256 = hash_file(catalog_path).hexdigest()
+    registry = build_registry(iter_catalog(catalog_path))
+    save_registry(registry, catalog_sha256, out)
+    return registry
+
 
-    if not CATALOG_PATH.exists():
-        raise RuntimeError(f"Catalog file not found: {CATALOG_PATH}")
+def load_catalog_registry() -> CatalogRegistry:
+    """
+    Load the registry (see `load_registry`) and refill the module-level
+    KNOWN_* sets from it.
 
-    with open(CATALOG_PATH, "r", encoding="utf-8") as f:
-        catalog = json.load(f)
+    The sets are cleared and refilled in place so existing importers keep
+    working; request handling reads the immutable registry held by the
+    active catalog snapshot instead (see data/catalog_snapshot.py).
+    """
+    registry = load_registry(CATALOG_PATH, snapshot_path=REGISTRY_PATH)
 
-    for item in catalog:
-        
-        if item.get("brand"):
-            KNOWN_BRANDS.add(item["brand"].lower())
+    for target, values in (
+        (KNOWN_BRANDS, registry.brands),
+        (KNOWN_PART_NUMBERS, registry.part_numbers),
+        (KNOWN_MODELS, registry.models),
+        (KNOWN_SYMPTOMS, registry.symptoms),
+    ):
+        target.clear()
+        target.update(values)
 
-        if item.get("id"):
-            KNOWN_PART_NUMBERS.add(item["id"].upper())
+    return registry
 
-        for m in item.get("compatible_models", []):
-            KNOWN_MODELS.add(m.upper())
 
-        for s in item.get("symptoms_vector", []):
-            KNOWN_SYMPTOMS.add(s.lower())
+def main():
+    started = time.perf_counter()
+    registry = compile_registry()
+    print(
+        f"[CATALOG] Compiled registry ({len(registry.part_numbers)} parts, {len(registry.models)} models) "
+        f"→ {REGISTRY_PATH} in {time.perf_counter() - started:.1f}s"
+    )
 
-    print(f"[CATALOG] Brands: {len(KNOWN_BRANDS)}")
-    print(f"[CATALOG] Part Numbers: {len(KNOWN_PART_NUMBERS)}")
-    print(f"[CATALOG] Models: {len(KNOWN_MODELS)}")
-    print(f"[CATALOG] Symptoms: {len(KNOWN_SYMPTOMS)}")
 
+if __name__ == "__main__":
+    main()
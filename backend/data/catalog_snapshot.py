@@ -0,0 +1,244 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import faiss
+import numpy as np
+
+from data.catalog_registry import CATALOG_PATH, REGISTRY_PATH, CatalogRegistry, hash_file, load_registry
+from utils.payload import encode_cards
+from vectorstore.dedup import DuplicateGroups
+from vectorstore.shards import ShardedIndex, load_shards
+from vectorstore.symptoms import SymptomIndex
+
+# --- Observability ---
+from observability.metrics import (
+    catalog_version_info,
+    catalog_reloads_total,
+    catalog_parts,
+    catalog_registry_terms,
+    errors_total,
+)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+INDEX_PATH = BASE_DIR / "vectorstore" / "index.faiss"
+META_PATH = BASE_DIR / "vectorstore" / "parts_metadata.json"
+SHARDS_DIR = BASE_DIR / "vectorstore" / "shards"
+SYMPTOMS_PATH = BASE_DIR / "vectorstore" / "symptoms.npz"
+DUPLICATES_PATH = BASE_DIR / "vectorstore" / "duplicates.npz"
+# Written next to the metadata file once an index build has replaced all of
+# its outputs (vectorstore/build_index.py): the SHA-256 of each file and the
+# shard build id. Files that do not match it are from another build.
+BUILD_MANIFEST = "build.json"
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """
+    One immutable catalog version: FAISS index, part metadata and registry sets.
+
+    Requests grab the active snapshot once and use it until they finish, so a
+    reload never changes data underneath an in-flight request.
+    """
+
+    version: str
+    registry: CatalogRegistry
+    index: Any  # faiss.Index, or None when the index has not been built (or is sharded)
+    metadata: List[Dict[str, Any]]
+    loaded_at: float
+    cards: Dict[str, bytes]  # part id -> pre-encoded ProductCard JSON
+    shards: Optional[ShardedIndex] = None  # per-(appliance, brand) index, used instead of `index`
+    symptoms: Optional[SymptomIndex] = None  # symptom vocabulary index; rows refer to `metadata`
+    duplicates: Optional[DuplicateGroups] = None  # parts collapsed into each indexed representative
+
+
+_current: Optional[CatalogSnapshot] = None
+_swap_lock = threading.Lock()
+_reload_lock = threading.Lock()
+
+
+def _read_bytes(path: Path) -> Optional[bytes]:
+    if not path.exists():
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _read_manifest(meta_path: Path) -> Optional[Dict[str, str]]:
+    """The last build's output digests; None for builds before manifests were written."""
+    raw = _read_bytes(meta_path.with_name(BUILD_MANIFEST))
+    return json.loads(raw) if raw is not None else None
+
+
+def _check_build(expected: Dict[str, str], digests: Dict[str, str]):
+    stale = sorted(name for name, digest in digests.items() if name in expected and expected[name] != digest)
+    if stale:
+        raise RuntimeError(
+            f"Index files from different builds ({', '.join(stale)} do not match "
+            f"{BUILD_MANIFEST}); is a build still writing them?"
+        )
+
+
+def load_snapshot(
+    catalog_path: Optional[Path] = None,
+    index_path: Optional[Path] = None,
+    meta_path: Optional[Path] = None,
+    shards_dir: Optional[Path] = None,
+    symptoms_path: Optional[Path] = None,
+    duplicates_path: Optional[Path] = None,
+    registry_path: Optional[Path] = None,
+) -> CatalogSnapshot:
+    """
+    Build a snapshot from disk without touching the active one.
+
+    Each file is read once; the version is a content hash of all of them, so
+    reloading unchanged files yields the same version string. Files that
+    do not match the last build's manifest (a build is replacing them)
+    raise RuntimeError rather than being paired with each other. The registry
+    comes from the compiled `registry_path` when it matches the catalog's
+    hash; otherwise the catalog is streamed again and parsed, never held
+    whole in memory.
+    """
+    catalog_path = Path(catalog_path or CATALOG_PATH)
+    index_path = index_path or INDEX_PATH
+    meta_path = meta_path or META_PATH
+    shards_dir = shards_dir or SHARDS_DIR
+    symptoms_path = symptoms_path or SYMPTOMS_PATH
+    duplicates_path = duplicates_path or DUPLICATES_PATH
+    registry_path = registry_path or REGISTRY_PATH
+
+    if not catalog_path.exists():
+        raise RuntimeError(f"Catalog file not found: {catalog_path}")
+
+    digest = hash_file(catalog_path)
+    registry = load_registry(catalog_path, digest.hexdigest(), registry_path)
+
+    manifest = _read_manifest(meta_path)
+    meta_raw = _read_bytes(meta_path)
+    # A build writes either shards or the flat index; its manifest says which,
+    # so files left over from a build of the other layout are not loaded.
+    sharded = manifest is None or "shards" in manifest
+    shards = load_shards(shards_dir) if meta_raw is not None and sharded else None
+    index_raw = _read_bytes(index_path) if shards is None else None
+    symptoms_raw = _read_bytes(symptoms_path) if meta_raw is not None else None
+    duplicates_raw = _read_bytes(duplicates_path) if meta_raw is not None else None
+    files = {"index": index_raw, "metadata": meta_raw, "symptoms": symptoms_raw, "duplicates": duplicates_raw}
+    digests = {name: hashlib.sha256(raw).hexdigest() for name, raw in files.items() if raw is not None}
+    if shards is not None:
+        digests["shards"] = shards.build_id
+    if meta_raw is not None and manifest is not None:
+        _check_build(manifest, digests)
+    for name in sorted(digests):
+        digest.update(f"{name}={digests[name]};".encode())
+
+    index = None
+    metadata: List[Dict[str, Any]] = []
+    if meta_raw is not None and (shards is not None or index_raw is not None):
+        if index_raw is not None:
+            index = faiss.deserialize_index(np.frombuffer(index_raw, dtype=np.uint8))
+        metadata = json.loads(meta_raw)
+    else:
+        print("[CATALOG] Index or metadata missing; semantic search disabled.")
+
+    return CatalogSnapshot(
+        version=digest.hexdigest()[:12],
+        registry=registry,
+        index=index,
+        metadata=metadata,
+        loaded_at=time.time(),
+        cards=encode_cards(metadata),
+        shards=shards,
+        symptoms=SymptomIndex.load(io.BytesIO(symptoms_raw)) if symptoms_raw and metadata else None,
+        duplicates=DuplicateGroups.load(io.BytesIO(duplicates_raw)) if duplicates_raw and metadata else None,
+    )
+
+
+def activate(snapshot: CatalogSnapshot) -> Optional[CatalogSnapshot]:
+    """Atomically make `snapshot` the active version. Returns the previous one."""
+    global _current
+
+    with _swap_lock:
+        previous = _current
+        _current = snapshot
+
+    if previous is not None and previous.version != snapshot.version:
+        # Zeroed first: with multiprocess metrics the value outlives remove().
+        catalog_version_info.labels(previous.version).set(0)
+        catalog_version_info.remove(previous.version)
+    catalog_version_info.labels(snapshot.version).set(1)
+    catalog_parts.set(len(snapshot.metadata))
+    for kind in ("brands", "part_numbers", "models", "symptoms"):
+        catalog_registry_terms.labels(kind).set(len(getattr(snapshot.registry, kind)))
+
+    print(
+        f"[CATALOG] Active version {snapshot.version}: "
+        f"{len(snapshot.metadata)} parts, {len(snapshot.registry.models)} models"
+    )
+    return previous
+
+
+def get_snapshot() -> CatalogSnapshot:
+    """Return the active snapshot, loading it on first use."""
+    snapshot = _current
+    if snapshot is not None:
+        return snapshot
+
+    with _reload_lock:
+        if _current is None:
+            activate(load_snapshot())
+    return _current
+
+
+def _reload_locked() -> CatalogSnapshot:
+    try:
+        snapshot = load_snapshot()
+    except Exception:
+        errors_total.labels("catalog").inc()
+        catalog_reloads_total.labels("failure").inc()
+        raise
+
+    activate(snapshot)
+    catalog_reloads_total.labels("success").inc()
+    return snapshot
+
+
+def reload_catalog() -> CatalogSnapshot:
+    """Rebuild the snapshot from disk and swap it in. Concurrent calls are serialized."""
+    with _reload_lock:
+        return _reload_locked()
+
+
+def reload_catalog_in_background() -> bool:
+    """
+    Start a reload on a daemon thread.
+
+    Returns False without starting anything if a reload is already running.
+    """
+    if not _reload_lock.acquire(blocking=False):
+        return False
+
+    def _run():
+        try:
+            _reload_locked()
+        except Exception as e:
+            print(f"[CATALOG] Reload failed, keeping current version: {e}")
+        finally:
+            _reload_lock.release()
+
+    threading.Thread(target=_run, name="catalog-reload", daemon=True).start()
+    return True
+
+
+def write_atomic(path: str, data: bytes):
+    """Write a file via rename so readers never observe a partially written file."""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
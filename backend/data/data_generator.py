@@ -1,77 +1,251 @@
+# Synthetic PartSelect-style catalog generator.
+#
+# Run from backend/:
+#   python -m data.data_generator --parts 250 --out data/full_catalog.json
+#   python -m data.data_generator --parts 2000000 --models 50000 --symptoms 2000 \
+#       --workers 4 --out /tmp/catalog_2m.jsonl
+#
+# Parts are produced in fixed-size chunks, each from its own seeded RNG, and
+# written as they arrive, so memory stays bounded and the output for a given
+# seed is identical whatever the number of worker processes.
+
+import argparse
+import itertools
 import json
 import random
-import uuid
-import copy
+import time
+from collections import deque
+from functools import partial
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Tuple
+
+import orjson
+
+GOLDEN_PATH = Path(__file__).parent / "golden_records.json"
+
+CHUNK_SIZE = 10_000
+
+# The model numbers the original generator drew from; always part of the pool.
+REAL_MODELS = [
+    "WDT780SAEM1",
+    "WDT730PAHZ0",
+    "KDTE334GPS0",
+    "GDF650SMJ0ES",
+    "FGHD2465NF1A",
+    "KDTM354ESS3",
+    "ADB1500AWW",
+    "FFSS2615TS",
+    "LFX28968ST",
+    "WRF535SMMB00",
+]
+
+OEM_PREFIXES = ["WP", "W", "WD", "WDT", "530", "242", "EDR", "WB"]
+MODEL_PREFIXES = ["WDT", "KDT", "GDF", "FGHD", "ADB", "FFSS", "LFX", "WRF", "WRS", "MDB", "KRF", "GSS"]
+SYMPTOM_QUALIFIERS = [
+    "intermittently", "after defrost", "at night", "when door opens", "after power outage",
+    "on startup", "during cycle", "since moving", "with loud noise", "in cold weather",
+]
+
+# Part ids are PS + 8 digits. Index i maps to (A * i + B) mod ID_SPACE, a
+# bijection because A is coprime to ID_SPACE, so ids are unique and look random.
+ID_SPACE = 90_000_000
+_ID_MULTIPLIER = 48_271
+
+
+def load_golden(path: Path = GOLDEN_PATH) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_model_pool(num_models: int, seed: int) -> List[str]:
+    rng = random.Random(f"models-{seed}")
+    pool = list(REAL_MODELS)
+    seen = set(pool)
+    while len(pool) < max(num_models, len(REAL_MODELS)):
+        model = (
+            rng.choice(MODEL_PREFIXES)
+            + str(rng.randint(100, 99999))
+            + "".join(rng.choice("ABCDEFGHJKLMNPRSTWXYZ0123456789") for _ in range(rng.randint(1, 4)))
+        )
+        if model not in seen:
+            seen.add(model)
+            pool.append(model)
+    return pool
+
+
+def build_symptom_vocab(golden: List[Dict[str, Any]], size: int) -> List[str]:
+    """
+    Golden symptoms first, then qualified variants of them ("ice maker not
+    working at night"), up to `size` (about 7,000 for the golden records).
+    """
+    base = sorted({s for p in golden for s in p.get("symptoms_vector", [])})
+    variants = itertools.chain(
+        base,
+        (f"{s} {q}" for q in SYMPTOM_QUALIFIERS for s in base),
+        (f"{s} {q1} and {q2}" for q1, q2 in itertools.permutations(SYMPTOM_QUALIFIERS, 2) for s in base),
+    )
+    return list(itertools.islice(variants, max(size, len(base))))
+
+
+def _part_id(index: int, seed: int) -> str:
+    offset = (seed * 7_919) % ID_SPACE
+    return f"PS{10_000_000 + (_ID_MULTIPLIER * index + offset) % ID_SPACE}"
+
+
+def _generate_part(
+    rng: random.Random,
+    index: int,
+    seed: int,
+    golden: List[Dict[str, Any]],
+    models: List[str],
+    fanout: Tuple[int, int],
+    symptoms: List[str],
+) -> Dict[str, Any]:
+    base = rng.choice(golden)
+    # Only top-level lists are changed below, so a shallow copy suffices.
+    part = dict(base)
+
+    part["id"] = _part_id(index, seed)
+    part["part_number"] = f"{rng.choice(OEM_PREFIXES)}{rng.randint(1_000_000, 9_999_999)}"
+    part["price"] = round(base["price"] * rng.uniform(0.9, 1.15), 2)
+    part["review_count"] = max(0, base["review_count"] + rng.randint(5, 120))
+
+    extra = rng.sample(models, min(len(models), rng.randint(*fanout)))
+    part["compatible_models"] = list(dict.fromkeys(base.get("compatible_models", []) + extra))
+
+    if symptoms:
+        extra_symptoms = rng.sample(symptoms, min(len(symptoms), rng.randint(0, 2)))
+        part["symptoms_vector"] = list(dict.fromkeys(base.get("symptoms_vector", []) + extra_symptoms))
+
+    if "description" in base:
+        part["description"] = (
+            base["description"]
+            + " This item is part of our verified OEM-compatible appliance replacement catalog."
+        )
 
-with open("golden_records.json", "r") as f:
-    base_parts = json.load(f)
+    part["in_stock"] = rng.random() < 0.92
+    return part
+
+
+def generate_chunk(
+    chunk: int,
+    *,
+    total: int,
+    seed: int,
+    golden: List[Dict[str, Any]],
+    models: List[str],
+    fanout: Tuple[int, int],
+    symptoms: List[str],
+) -> List[bytes]:
+    """Encoded parts [chunk * CHUNK_SIZE, ...), one JSON document each."""
+    rng = random.Random(seed * 1_000_003 + chunk)
+    start = chunk * CHUNK_SIZE
+    return [
+        orjson.dumps(_generate_part(rng, i, seed, golden, models, fanout, symptoms))
+        for i in range(start, min(start + CHUNK_SIZE, total))
+    ]
 
-generated = []
 
-NUM_PARTS_TO_GENERATE = 250  
+_worker_task = None
 
-def generate_ps_id():
-    return f"PS{random.randint(10000000, 99999999)}"
 
-def generate_oem_part_number():
-    prefixes = ["WP", "W", "WD", "WDT", "530", "242", "EDR", "WB"]
-    prefix = random.choice(prefixes)
-    return f"{prefix}{random.randint(1000000, 9999999)}"
+def _init_worker(task):
+    # The generation settings (model pool, golden records, ...) are sent to
+    # each worker once instead of with every chunk.
+    global _worker_task
+    _worker_task = task
 
 
-def generate_real_model():
-    models = [
-        "WDT780SAEM1",
-        "WDT730PAHZ0",
-        "KDTE334GPS0",
-        "GDF650SMJ0ES",
-        "FGHD2465NF1A",
-        "KDTM354ESS3",
-        "ADB1500AWW",
-        "FFSS2615TS",
-        "LFX28968ST",
-        "WRF535SMMB00"
-    ]
-    return random.choice(models)
+def _run_worker_chunk(chunk: int) -> List[bytes]:
+    return _worker_task(chunk)
 
-for _ in range(NUM_PARTS_TO_GENERATE):
-    base = random.choice(base_parts)
-    part = copy.deepcopy(base)
 
-   
-    part["id"] = generate_ps_id()
-    part["part_number"] = generate_oem_part_number()
-    part["price"] = round(part["price"] * random.uniform(0.9, 1.15), 2)
+def generate(
+    total: int,
+    seed: int = 42,
+    num_models: int = len(REAL_MODELS),
+    fanout: Tuple[int, int] = (1, 3),
+    symptom_vocab: int = 0,
+    workers: int = 1,
+) -> Iterator[bytes]:
+    """Yield `total` encoded parts in order, CHUNK_SIZE at a time."""
+    if total > ID_SPACE:
+        raise ValueError(f"At most {ID_SPACE} parts can have unique PS ids.")
 
-    part["review_count"] = max(
-        0, part["review_count"] + random.randint(5, 120)
+    golden = load_golden()
+    task = partial(
+        generate_chunk,
+        total=total,
+        seed=seed,
+        golden=golden,
+        models=build_model_pool(num_models, seed),
+        fanout=fanout,
+        symptoms=build_symptom_vocab(golden, symptom_vocab) if symptom_vocab else [],
     )
-
-    extra_models = [
-        generate_real_model()
-        for _ in range(random.randint(1, 3))
-    ]
-
-    part["compatible_models"] = list(
-        set(part.get("compatible_models", []) + extra_models)
+    chunks = range((total + CHUNK_SIZE - 1) // CHUNK_SIZE)
+
+    if workers <= 1:
+        for chunk in chunks:
+            yield from task(chunk)
+        return
+
+    # At most two chunks per worker are in flight, and they are consumed in
+    # chunk order, so memory stays bounded and the output does not depend
+    # on `workers`.
+    with Pool(workers, initializer=_init_worker, initargs=(task,)) as pool:
+        pending: Deque = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(_run_worker_chunk, (chunk,)))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+def write_catalog(parts: Iterator[bytes], out: Path) -> int:
+    """Write JSONL for *.jsonl, otherwise a JSON array; streamed either way."""
+    jsonl = out.suffix == ".jsonl"
+    count = 0
+    with open(out, "wb") as f:
+        if not jsonl:
+            f.write(b"[\n")
+        for encoded in parts:
+            if jsonl:
+                f.write(encoded + b"\n")
+            else:
+                f.write((b",\n" if count else b"") + encoded)
+            count += 1
+        if not jsonl:
+            f.write(b"\n]\n")
+    return count
+
+
+def _fanout(value: str) -> Tuple[int, int]:
+    low, _, high = value.partition("-")
+    return int(low), int(high or low)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic parts catalog.")
+    parser.add_argument("--parts", type=int, default=250, help="number of parts")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--models", type=int, default=len(REAL_MODELS), help="size of the model-number pool")
+    parser.add_argument("--fanout", type=_fanout, default=(1, 3), help="extra compatible models per part, e.g. 1-3")
+    parser.add_argument("--symptoms", type=int, default=0, help="symptom vocabulary size (0: golden symptoms only)")
+    parser.add_argument("--workers", type=int, default=1, help="generator processes")
+    parser.add_argument("--out", type=Path, default=Path(__file__).parent / "full_catalog.json",
+                        help="*.jsonl for JSON Lines, anything else for a JSON array")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    count = write_catalog(
+        generate(args.parts, args.seed, args.models, args.fanout, args.symptoms, args.workers),
+        args.out,
     )
+    print(f" Generated {count} realistic PartSelect-style appliance parts → {args.out} "
+          f"in {time.perf_counter() - started:.1f}s")
 
-    
-    if "description" in part:
-        part["description"] += (
-            " This item is part of our verified OEM-compatible appliance replacement catalog."
-        )
-
-   
-    part["in_stock"] = random.choices(
-        [True, False],
-        weights=[92, 8]
-    )[0]
-
-    generated.append(part)
-
-
-with open("full_catalog.json", "w") as f:
-    json.dump(generated, f, indent=2)
 
-print(f" Generated {len(generated)} realistic PartSelect-style appliance parts.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import zlib
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Set
+
+import numpy as np
+
+from data.registry_snapshot import pack_strings, unpack_strings
+
+
+@dataclass(frozen=True)
+class FuzzyMatch:
+    term: str
+    distance: int
+    confidence: float
+
+
+def _deletes(term: str, max_distance: int) -> Set[str]:
+    """All strings reachable from `term` by removing up to `max_distance` characters."""
+    out = {term}
+    frontier = {term}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        out |= frontier
+    return out
+
+
+def _key(s: str) -> int:
+    # Stable 32-bit key (unlike hash()); collisions only add candidates that
+    # the distance check then rejects.
+    return zlib.crc32(s.encode())
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Optimal-string-alignment distance (adjacent transpositions cost 1),
+    computed only inside the `max_distance` band. Returns max_distance + 1
+    as soon as the distance is known to exceed the bound.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if a == b:
+        return 0
+
+    over = max_distance + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [over] * (len(b) + 1)
+        cur[0] = i
+        lo = max(1, i - max_distance)
+        hi = min(len(b), i + max_distance)
+        ca = a[i - 1]
+        for j in range(lo, hi + 1):
+            cost = 0 if ca == b[j - 1] else 1
+            d = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and j > 1 and ca == b[j - 2] and a[i - 2] == b[j - 1]:
+                d = min(d, prev2[j - 2] + 1)
+            cur[j] = d
+        if min(cur[lo - 1:hi + 1]) > max_distance:
+            return over
+        prev2, prev = prev, cur
+
+    return min(prev[len(b)], over)
+
+
+class FuzzyIndex:
+    """
+    Symmetric-delete (SymSpell-style) index for typo-tolerant code lookup.
+
+    Every term is indexed under all of its variants with up to
+    `max_distance` characters deleted; a query looks up its own deletion
+    variants, so any term within `max_distance` edits shares at least one
+    variant with it. Variant keys are stored as a sorted uint32 array with a
+    parallel term-id array, which keeps 100k+ terms compact and makes a
+    lookup a single vectorized binary search plus a few distance checks.
+    """
+
+    def __init__(self, terms: Iterable[str], max_distance: int = 2):
+        self.max_distance = max_distance
+        self._terms: List[str] = sorted({t.upper() for t in terms if t})
+
+        # Typed arrays: a list would hold each of the tens of millions of
+        # variant keys as a separate int object.
+        keys, ids = array("I"), array("I")
+        for term_id, term in enumerate(self._terms):
+            variant_keys = [_key(v) for v in _deletes(term, max_distance)]
+            keys.extend(variant_keys)
+            ids.extend([term_id] * len(variant_keys))
+
+        key_arr = np.frombuffer(keys, dtype=np.uint32)
+        id_arr = np.frombuffer(ids, dtype=np.uint32)
+        order = np.argsort(key_arr, kind="stable")
+        self._keys = key_arr[order]
+        self._ids = id_arr[order]
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def nbytes(self) -> int:
+        return self._keys.nbytes + self._ids.nbytes
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "terms": pack_strings(self._terms),
+            "keys": self._keys,
+            "ids": self._ids,
+            "max_distance": np.array(self.max_distance),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Mapping[str, np.ndarray]) -> "FuzzyIndex":
+        """An index saved by `to_arrays`, without recomputing the variants."""
+        index = cls.__new__(cls)
+        index.max_distance = int(arrays["max_distance"])
+        index._terms = unpack_strings(arrays["terms"])
+        index._keys = arrays["keys"]
+        index._ids = arrays["ids"]
+        return index
+
+    def lookup(self, query: str, limit: int = 5) -> List[FuzzyMatch]:
+        """
+        Terms within `max_distance` edits of `query`, best first.
+
+        Confidence is 1 - distance / length, divided by the number of terms
+        tied at the best distance, so an ambiguous typo scores low.
+        """
+        q = query.upper()
+        k = self.max_distance
+        if not q or not self._terms:
+            return []
+
+        q_keys = np.fromiter(
+            (_key(v) for v in _deletes(q, k)), dtype=np.uint32
+        )
+        lo = np.searchsorted(self._keys, q_keys, side="left")
+        hi = np.searchsorted(self._keys, q_keys, side="right")
+
+        candidate_ids: Set[int] = set()
+        for start, end in zip(lo.tolist(), hi.tolist()):
+            if end > start:
+                candidate_ids.update(self._ids[start:end].tolist())
+
+        matches = []
+        for term_id in candidate_ids:
+            term = self._terms[term_id]
+            d = edit_distance(q, term, k)
+            if d <= k:
+                matches.append((d, term))
+
+        if not matches:
+            return []
+
+        matches.sort()
+        best = matches[0][0]
+        ties = sum(1 for d, _ in matches if d == best)
+
+        results = []
+        for d, term in matches[:limit]:
+            confidence = 1.0 - d / max(len(q), len(term))
+            if d == best:
+                confidence /= ties
+            results.append(FuzzyMatch(term=term, distance=d, confidence=round(confidence, 3)))
+        return results
@@ -0,0 +1,156 @@
+import codecs
+import json
+import os
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Sequence
+
+import orjson
+
+Record = Dict[str, Any]
+Sink = Callable[[List[Record]], None]
+
+DEFAULT_BATCH_SIZE = 1024
+_READ_SIZE = 1 << 20
+
+
+def is_jsonl(path: Path) -> bool:
+    return Path(path).suffix == ".jsonl"
+
+
+def parse_catalog(raw: bytes, jsonl: bool) -> List[Record]:
+    """Parse an in-memory catalog file (JSON array or JSON Lines)."""
+    if jsonl:
+        return [orjson.loads(line) for line in raw.splitlines() if line.strip()]
+    return json.loads(raw)
+
+
+def iter_jsonl(f: BinaryIO) -> Iterator[Record]:
+    for line in f:
+        if line.strip():
+            yield orjson.loads(line)
+
+
+def iter_json_array(f: BinaryIO, read_size: int = _READ_SIZE) -> Iterator[Record]:
+    """
+    Incrementally decode the elements of a top-level JSON array.
+
+    Only the unread tail of the current read buffer is held, so memory is
+    bounded by the largest single element plus `read_size`.
+    """
+    decoder = json.JSONDecoder()
+    # Incremental, so a multi-byte character split across reads is kept whole.
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace and separators between elements.
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+
+        if not started and pos < len(buf):
+            if buf[pos] != "[":
+                raise ValueError("Catalog JSON must be a top-level array.")
+            started = True
+            pos += 1
+            continue
+
+        if started and pos < len(buf) and buf[pos] == "]":
+            return
+
+        if pos < len(buf):
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                # A scalar ending exactly at the buffer edge may be cut short.
+                complete = eof or end < len(buf)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False  # element continues past the buffer; read more
+            if complete:
+                yield item
+                pos = end
+                continue
+
+        if eof:
+            raise ValueError("Catalog JSON ended before the closing ']'.")
+
+        chunk = f.read(read_size)
+        eof = not chunk
+        buf = buf[pos:] + utf8.decode(chunk, final=eof)
+        pos = 0
+
+
+def iter_records(path: Path) -> Iterator[Record]:
+    """Catalog records in file order, streamed from a JSON array or JSONL file."""
+    path = Path(path)
+    if not path.exists():
+        raise RuntimeError(f"Catalog file not found: {path}")
+
+    with open(path, "rb") as f:
+        yield from iter_file(f, is_jsonl(path))
+
+
+def iter_file(f: BinaryIO, jsonl: bool) -> Iterator[Record]:
+    return iter_jsonl(f) if jsonl else iter_json_array(f)
+
+
+def iter_batches(records: Iterable[Record], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Record]]:
+    batch: List[Record] = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ingest(path: Path, sinks: Sequence[Sink], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Read the catalog once and hand each batch to every sink in turn.
+
+    Only one batch is alive at a time, so ingestion memory is constant in
+    the catalog size; whatever the sinks accumulate is their own business.
+    Returns the number of records read.
+    """
+    count = 0
+    for batch in iter_batches(iter_records(path), batch_size):
+        for sink in sinks:
+            sink(batch)
+        count += len(batch)
+    return count
+
+
+class MetadataWriter:
+    """
+    Stream records into a JSON array file, written to a temp file and
+    atomically moved into place on close (so readers never see a partial
+    file).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._tmp = self.path.with_name(self.path.name + ".tmp")
+        self._f = open(self._tmp, "wb")
+        self._f.write(b"[")
+        self.count = 0
+
+    def __call__(self, batch: List[Record]):
+        for record in batch:
+            self._f.write(b",\n" if self.count else b"\n")
+            self._f.write(orjson.dumps(record, option=orjson.OPT_INDENT_2))
+            self.count += 1
+
+    def close(self):
+        self._f.write(b"\n]\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        self._f.close()
+        self._tmp.unlink(missing_ok=True)
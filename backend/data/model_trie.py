@@ -0,0 +1,204 @@
+import os
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data.registry_snapshot import pack_strings, unpack_strings
+
+# A partial model number must share at least this many leading characters
+# with catalog models to name a family ("WDT780" does, "WD" does not).
+MIN_FAMILY_PREFIX = int(os.getenv("MODEL_FAMILY_MIN_PREFIX", "6"))
+# Characters past the shared prefix that may still be an unknown revision
+# or colour suffix ("WDT780SAEM2" against "WDT780SAEM1").
+MAX_REVISION_SUFFIX = int(os.getenv("MODEL_FAMILY_MAX_SUFFIX", "4"))
+
+
+@dataclass(frozen=True)
+class ModelFamily:
+    prefix: str  # leading characters the query shares with every member
+    models: Tuple[str, ...]
+    exact: bool  # the query is itself a catalog model
+
+
+class _Node:
+    __slots__ = ("edges", "model")
+
+    def __init__(self):
+        # first character -> (edge label, child)
+        self.edges: Dict[str, Tuple[str, "_Node"]] = {}
+        self.model: Optional[int] = None  # model id, on nodes that end a model number
+
+
+def _common_prefix(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class ModelTrie:
+    """
+    Compressed prefix trie over model numbers. A lookup walks the query
+    once, so resolving a partial model number is O(length) plus the
+    family's size.
+
+    Part `j` (`part_ids[j]`) lists the models with ids
+    `part_models[part_ends[j - 1]:part_ends[j]]`, ids being positions in
+    `models`. The trie turns that into per-model posting lists held as two
+    flat arrays, rather than a list of part ids on every node.
+
+    The trie is built from linked nodes, then flattened: node `n`'s edges
+    are `_edge_begin[n]:_edge_begin[n + 1]`, each with its first character
+    in `_first`, label in `_labels` and child node. `to_arrays` /
+    `from_arrays` save and restore it without a rebuild.
+    """
+
+    def __init__(
+        self,
+        models: Sequence[str],
+        part_ids: Sequence[str] = (),
+        part_models: Sequence[int] = (),
+        part_ends: Sequence[int] = (),
+    ):
+        root = _Node()
+        self.size = len(models)
+        for model_id, model in enumerate(models):
+            self._add(root, model, model_id)
+        self._flatten(root)
+
+        self._part_ids = list(part_ids)
+        part_models = np.asarray(part_models, dtype=np.int32)
+        ends = np.asarray(part_ends, dtype=np.int64)
+        owners = np.repeat(np.arange(len(ends), dtype=np.int32), np.diff(ends, prepend=0))
+        # Stable, so each model's parts stay in catalog order.
+        self._rows = owners[np.argsort(part_models, kind="stable")]
+        self._offsets = np.zeros(self.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(part_models, minlength=self.size), out=self._offsets[1:])
+
+    @staticmethod
+    def _add(root: _Node, model: str, model_id: int):
+        node, rest = root, model
+        while rest:
+            edge = node.edges.get(rest[0])
+            if edge is None:
+                child = _Node()
+                node.edges[rest[0]] = (rest, child)
+                node, rest = child, ""
+                break
+            label, child = edge
+            shared = _common_prefix(label, rest)
+            if shared < len(label):
+                # Split the edge where the new model diverges.
+                middle = _Node()
+                middle.edges[label[shared]] = (label[shared:], child)
+                node.edges[rest[0]] = (label[:shared], middle)
+                child = middle
+            node, rest = child, rest[shared:]
+        node.model = model_id
+
+    def _flatten(self, root: _Node):
+        # Breadth first, so node 0 is the root and a node's edges are adjacent.
+        nodes, labels = [root], []
+        node_model, edge_begin, children = array("i"), array("q", [0]), array("i")
+        for node in nodes:  # grows as children are queued
+            node_model.append(-1 if node.model is None else node.model)
+            for label, child in node.edges.values():
+                labels.append(label)
+                children.append(len(nodes))
+                nodes.append(child)
+            edge_begin.append(len(children))
+
+        self._node_model = np.frombuffer(node_model, dtype=np.int32)
+        self._edge_begin = np.frombuffer(edge_begin, dtype=np.int64)
+        self._children = np.frombuffer(children, dtype=np.int32)
+        self._first = "".join(label[0] for label in labels)
+        self._labels = "".join(labels)
+        self._label_ends = np.zeros(len(labels) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, labels), dtype=np.int64, count=len(labels)), out=self._label_ends[1:])
+
+    _ARRAYS = ("node_model", "edge_begin", "children", "label_ends", "rows", "offsets")
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        arrays = {name: getattr(self, f"_{name}") for name in self._ARRAYS}
+        arrays["first"] = np.frombuffer(self._first.encode(), dtype=np.uint8)
+        arrays["labels"] = np.frombuffer(self._labels.encode(), dtype=np.uint8)
+        arrays["part_ids"] = pack_strings(self._part_ids)
+        arrays["size"] = np.array(self.size)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Mapping[str, np.ndarray]) -> "ModelTrie":
+        """A trie saved by `to_arrays`, without rebuilding it."""
+        trie = cls.__new__(cls)
+        for name in cls._ARRAYS:
+            setattr(trie, f"_{name}", arrays[name])
+        trie._first = arrays["first"].tobytes().decode()
+        trie._labels = arrays["labels"].tobytes().decode()
+        trie._part_ids = unpack_strings(arrays["part_ids"])
+        trie.size = int(arrays["size"])
+        return trie
+
+    def _edges(self, node: int) -> range:
+        return range(int(self._edge_begin[node]), int(self._edge_begin[node + 1]))
+
+    def _label(self, edge: int) -> str:
+        return self._labels[int(self._label_ends[edge]):int(self._label_ends[edge + 1])]
+
+    def _walk(self, code: str) -> Tuple[int, int, str]:
+        """
+        Follow `code` down the trie. Returns how many characters matched, the
+        deepest node reached and the model prefix it stands for (the node's
+        full path when the walk stopped inside an edge).
+        """
+        node, matched, path = 0, 0, ""
+        while matched < len(code):
+            edges = self._edges(node)
+            edge = self._first.find(code[matched], edges.start, edges.stop)
+            if edge < 0:
+                break
+            label = self._label(edge)
+            shared = _common_prefix(label, code[matched:])
+            matched += shared
+            node, path = int(self._children[edge]), path + label
+            if shared < len(label):
+                break
+        return matched, node, path
+
+    def _members(self, node: int, path: str) -> Iterator[Tuple[str, int]]:
+        stack = [(node, path)]
+        while stack:
+            node, path = stack.pop()
+            if self._node_model[node] >= 0:
+                yield path, int(self._node_model[node])
+            for edge in self._edges(node):
+                stack.append((int(self._children[edge]), path + self._label(edge)))
+
+    def _resolve(self, code: str) -> Tuple[Optional[ModelFamily], List[int]]:
+        code = code.upper()
+        matched, node, path = self._walk(code)
+        if matched == len(code) == len(path) and self._node_model[node] >= 0:
+            return ModelFamily(prefix=code, models=(code,), exact=True), [int(self._node_model[node])]
+        if matched < MIN_FAMILY_PREFIX or len(code) - matched > MAX_REVISION_SUFFIX:
+            return None, []
+        members = sorted(self._members(node, path))
+        family = ModelFamily(prefix=code[:matched], models=tuple(m for m, _ in members), exact=False)
+        return family, [model_id for _, model_id in members]
+
+    def family(self, code: str) -> Optional[ModelFamily]:
+        """
+        The catalog models `code` names: itself if it is one, otherwise every
+        model extending its longest known prefix, provided that prefix is at
+        least MIN_FAMILY_PREFIX long and at most MAX_REVISION_SUFFIX
+        characters of `code` are left over. None when `code` names no family.
+        """
+        return self._resolve(code)[0]
+
+    def family_parts(self, code: str) -> List[str]:
+        """Ids of the parts compatible with any member of `code`'s family."""
+        rows: Dict[int, None] = {}
+        for model_id in self._resolve(code)[1]:
+            rows.update(dict.fromkeys(self._rows[self._offsets[model_id]:self._offsets[model_id + 1]].tolist()))
+        return [self._part_ids[row] for row in rows]
@@ -0,0 +1,86 @@
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Bump when the layout of any saved structure changes; older files are then
+# ignored and the registry is rebuilt from the catalog.
+FORMAT_VERSION = 1
+
+_MAGIC = b"PSREG\0"
+_HEADER_LEN = struct.Struct("<Q")
+_ALIGN = 64
+
+
+def pack_strings(strings: Iterable[str]) -> np.ndarray:
+    """Newline-terminated UTF-8, as one uint8 array; see `unpack_strings`."""
+    strings = list(strings)
+    text = "".join(s + "\n" for s in strings)
+    if text.count("\n") != len(strings):
+        raise ValueError("Strings containing a newline cannot be packed.")
+    return np.frombuffer(text.encode(), dtype=np.uint8)
+
+
+def unpack_strings(packed: np.ndarray) -> List[str]:
+    return packed.tobytes().decode().split("\n")[:-1]
+
+
+def write_arrays(path, arrays: Dict[str, np.ndarray], **header: Any):
+    """
+    Save `arrays` to one file, replaced atomically: a JSON header (`header`
+    plus each array's dtype, shape and offset) followed by the raw arrays,
+    each aligned so `read_arrays` can map them in place.
+    """
+    entries, offset = {}, 0
+    for name, array in arrays.items():
+        array = np.asarray(array, order="C")
+        entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+    meta = json.dumps({**header, "format": FORMAT_VERSION, "arrays": entries}).encode()
+    start = -(-(len(_MAGIC) + _HEADER_LEN.size + len(meta)) // _ALIGN) * _ALIGN
+
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    with open(tmp, "wb") as f:
+        f.write(_MAGIC + _HEADER_LEN.pack(len(meta)) + meta)
+        for name, array in arrays.items():
+            f.seek(start + entries[name]["offset"])
+            f.write(np.asarray(array, order="C").tobytes())
+        f.truncate(start + offset)
+    os.replace(tmp, path)
+
+
+def read_arrays(path) -> Optional[Tuple[Dict[str, Any], Dict[str, np.ndarray]]]:
+    """
+    The header and arrays of a `write_arrays` file, mapped read-only rather
+    than read, so workers share one copy in the page cache. None when the
+    file is missing, of another format version or malformed.
+    """
+    try:
+        with open(path, "rb") as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):  # missing, or empty
+        return None
+
+    try:
+        if buf[:len(_MAGIC)] != _MAGIC:
+            return None
+        (meta_len,) = _HEADER_LEN.unpack_from(buf, len(_MAGIC))
+        meta_end = len(_MAGIC) + _HEADER_LEN.size + meta_len
+        header = json.loads(buf[len(_MAGIC) + _HEADER_LEN.size:meta_end])
+        if header.get("format") != FORMAT_VERSION:
+            return None
+        start = -(-meta_end // _ALIGN) * _ALIGN
+        arrays = {}
+        for name, entry in header.pop("arrays").items():
+            dtype = np.dtype(entry["dtype"])
+            count = int(np.prod(entry["shape"], dtype=np.int64))
+            arrays[name] = np.frombuffer(buf, dtype=dtype, count=count, offset=start + entry["offset"])
+            arrays[name] = arrays[name].reshape(tuple(entry["shape"]))
+    except (ValueError, KeyError, TypeError, AttributeError, struct.error):
+        return None
+    return header, arrays
@@ -1,4 +1,5 @@
-from typing import Dict, Any
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Tuple
 import time
 
 SESSION_TTL = 1800  # 30 minutes
@@ -6,6 +7,21 @@ SESSION_TTL = 1800  # 30 minutes
 _sessions: Dict[str, Dict[str, Any]] = {}
 
 
+@dataclass(frozen=True)
+class LastRetrieval:
+    """
+    The parts the session's last answered turn retrieved, best first, with
+    the catalog version and search entities (appliance, brand, symptom) they
+    came from. `parts` are the snapshot's own records, not copies.
+    """
+    version: str
+    entities: Tuple[Optional[str], ...]
+    parts: Tuple[Dict[str, Any], ...]
+
+    def find(self, part_number: str) -> Optional[Dict[str, Any]]:
+        return next((p for p in self.parts if (p.get("id") or "").upper() == part_number), None)
+
+
 def get_session(session_id: str) -> Dict[str, Any]:
     session = _sessions.get(session_id)
     if not session:
@@ -15,6 +31,7 @@ def get_session(session_id: str) -> Dict[str, Any]:
             "appliance": None,
             "last_intent": None,
             "issue": None,
+            "retrieval": None,
         }
         _sessions[session_id] = session
     return session
@@ -0,0 +1,78 @@
+import threading
+import time
+from typing import Callable
+
+from observability.metrics import llm_circuit_breaker_state
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After `failure_threshold` failed or slow calls in a row the breaker opens
+    and `allow()` refuses calls for `open_s` seconds. Then a single probe call
+    is let through (half-open): success closes the breaker, failure reopens it.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        open_s: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.open_s = open_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_inflight = False
+        llm_circuit_breaker_state.set(_STATE_VALUE[CLOSED])
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.open_s:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+
+            if self._state == OPEN:
+                if self._clock() - self._opened_at < self.open_s:
+                    return False
+                self._set_state(HALF_OPEN)
+
+            # Half-open: one probe at a time.
+            if self._probe_inflight:
+                return False
+            self._probe_inflight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probe_inflight = False
+            if self._state != CLOSED:
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            probe_failed = self._probe_inflight
+            self._probe_inflight = False
+
+            if probe_failed or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+                self._set_state(OPEN)
+
+    def _set_state(self, state: str):
+        self._state = state
+        llm_circuit_breaker_state.set(_STATE_VALUE[state])
@@ -1,14 +1,33 @@
 # backend/models/llm.py
 
 import os
+import time
 from dotenv import load_dotenv
 from openai import OpenAI
 
 # --- Observability ---
-from observability.metrics import deepseek_calls_total, errors_total
+from observability.metrics import (
+    deepseek_calls_total,
+    errors_total,
+    llm_tokens_total,
+    llm_estimated_cost_usd_total,
+    llm_call_latency_seconds,
+    llm_prompt_tokens,
+    llm_completion_tokens,
+    llm_latency_per_output_token_seconds,
+)
 from opentelemetry import trace
 tracer = trace.get_tracer(__name__)
 
+from observability.traffic import LLMStub, note_llm_call
+from models.circuit_breaker import CircuitBreaker
+from models.llm_scheduler import (
+    LLMDeadlineExceeded,
+    LLMScheduler,
+    LLMSchedulerConfig,
+    request_deadline,
+)
+
 # -------------------------
 # Load API keys + Create Client
 # -------------------------
@@ -20,39 +39,180 @@ DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
 if not DEEPSEEK_API_KEY:
     raise RuntimeError("DEEPSEEK_API_KEY is missing from environment variables.")
 
+# No SDK retries: each attempt would get the whole remaining budget as its
+# timeout. A failed call is answered from retrieval (degraded mode) and
+# counted by the circuit breaker instead.
 client = OpenAI(
     api_key=DEEPSEEK_API_KEY,
     base_url=DEEPSEEK_BASE_URL,
+    max_retries=0,
 )
 
+# USD per 1M tokens, used only for the cost estimate metric.
+PRICE_CACHE_HIT_PER_M = float(os.getenv("DEEPSEEK_PRICE_CACHE_HIT_PER_M", "0.028"))
+PRICE_CACHE_MISS_PER_M = float(os.getenv("DEEPSEEK_PRICE_CACHE_MISS_PER_M", "0.28"))
+PRICE_OUTPUT_PER_M = float(os.getenv("DEEPSEEK_PRICE_OUTPUT_PER_M", "0.42"))
+
+# Every DeepSeek call goes through one scheduler: global concurrency cap,
+# per-client/session fairness, flow priorities and queueing deadlines.
+scheduler = LLMScheduler(LLMSchedulerConfig.from_env())
+
+# Repeated failed or slow calls trip the breaker; callers then get
+# LLMUnavailable immediately and answer from retrieval alone.
+SLOW_CALL_S = float(os.getenv("LLM_SLOW_CALL_S", "10"))
+MIN_CALL_BUDGET_S = 0.5  # not worth starting a call with less time left
+breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+    open_s=float(os.getenv("LLM_BREAKER_OPEN_S", "30")),
+)
+
+
+# Replays (observability/replay.py) run the backend with LLM_STUB_LOG set:
+# answers then come from a capture log instead of DeepSeek.
+stub = LLMStub.from_env()
+
+
+class LLMUnavailable(RuntimeError):
+    """No LLM answer within the request's budget (timeout, failure, open breaker)."""
+
+
+# -------------------------
+# Token + Cost Accounting
+# -------------------------
+def _cache_split(usage, prompt_tokens: int):
+    """Return (cache_hit_tokens, cache_miss_tokens), or None if the API did not say."""
+    hit = getattr(usage, "prompt_cache_hit_tokens", None)
+    miss = getattr(usage, "prompt_cache_miss_tokens", None)
+
+    if hit is None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        hit = getattr(details, "cached_tokens", None)
+    if hit is None:
+        return None
+
+    return hit, miss if miss is not None else max(prompt_tokens - hit, 0)
+
+
+def record_usage(flow: str, usage, latency_s: float, span=None) -> str:
+    """
+    Record the usage block of a chat completion under `flow`.
+    Returns the prompt-cache outcome label (hit / partial / miss / unknown).
+    """
+    prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+    completion_tokens = getattr(usage, "completion_tokens", None) or 0
+
+    split = _cache_split(usage, prompt_tokens) if usage is not None else None
+    if split is None:
+        cache = "unknown"
+        hit, miss = 0, prompt_tokens
+    else:
+        hit, miss = split
+        cache = "miss" if hit == 0 else ("hit" if miss == 0 else "partial")
+
+    llm_call_latency_seconds.labels(flow, cache).observe(latency_s)
+
+    if usage is None:
+        return cache
+
+    llm_prompt_tokens.labels(flow, cache).observe(prompt_tokens)
+    llm_completion_tokens.labels(flow, cache).observe(completion_tokens)
+
+    llm_tokens_total.labels(flow, "prompt_cache_hit").inc(hit)
+    llm_tokens_total.labels(flow, "prompt_cache_miss").inc(miss)
+    llm_tokens_total.labels(flow, "completion").inc(completion_tokens)
+
+    llm_estimated_cost_usd_total.labels(flow).inc(
+        (hit * PRICE_CACHE_HIT_PER_M
+         + miss * PRICE_CACHE_MISS_PER_M
+         + completion_tokens * PRICE_OUTPUT_PER_M) / 1_000_000
+    )
+
+    if completion_tokens:
+        llm_latency_per_output_token_seconds.labels(flow).observe(latency_s / completion_tokens)
+
+    if span is not None:
+        span.set_attribute("deepseek.prompt_tokens", prompt_tokens)
+        span.set_attribute("deepseek.completion_tokens", completion_tokens)
+        span.set_attribute("deepseek.prompt_cache_hit_tokens", hit)
+
+    return cache
+
 # -------------------------
 # DeepSeek Chat Wrapper + Telemetry
 # -------------------------
-def deepseek_chat(system_prompt: str, user_prompt: str) -> str:
+def deepseek_chat(system_prompt: str, user_prompt: str, flow: str = "unknown") -> str:
     deepseek_calls_total.inc()
 
     with tracer.start_as_current_span("deepseek.chat") as span:
         try:
+            span.set_attribute("flow", flow)
             span.set_attribute("system_prompt_length", len(system_prompt))
             span.set_attribute("user_prompt_length", len(user_prompt))
 
-            resp = client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                temperature=0.2,
-            )
+            deadline = request_deadline.get()
+
+            def call():
+                options = {}
+                if deadline is not None:
+                    options["timeout"] = deadline - time.monotonic()
+                    if options["timeout"] < MIN_CALL_BUDGET_S:
+                        raise LLMUnavailable("latency budget exhausted")
+                if not breaker.allow():
+                    raise LLMUnavailable("circuit breaker open")
+
+                started = time.perf_counter()
+                if stub is not None:
+                    answer = stub.answer(flow, system_prompt, user_prompt)
+                    breaker.record_success()
+                    return answer, time.perf_counter() - started
+
+                try:
+                    resp = client.chat.completions.create(
+                        model="deepseek-chat",
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_prompt},
+                        ],
+                        temperature=0.2,
+                        **options,
+                    )
+                except Exception as e:
+                    breaker.record_failure()
+                    errors_total.labels("deepseek").inc()
+                    span.record_exception(e)
+                    raise LLMUnavailable(f"DeepSeek call failed: {e}") from e
 
-            answer = resp.choices[0].message.content
+                latency = time.perf_counter() - started
+                if latency > SLOW_CALL_S:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+
+                record_usage(flow, resp.usage, latency, span)
+                return resp.choices[0].message.content, latency
+
+            # Cost for fair queuing: roughly the prompt size in tokens.
+            try:
+                answer, latency = scheduler.submit(
+                    call,
+                    flow=flow,
+                    cost=(len(system_prompt) + len(user_prompt)) / 4,
+                    deadline=deadline,
+                )
+            except LLMDeadlineExceeded as e:
+                raise LLMUnavailable(str(e)) from e
 
             if not answer:
                 return "I'm sorry, I couldn't generate a response at the moment."
 
             span.set_attribute("deepseek.response_length", len(answer))
+            note_llm_call(flow, system_prompt, user_prompt, answer, latency)
             return answer
 
+        except LLMUnavailable as e:
+            span.set_attribute("deepseek.unavailable", str(e))
+            raise
+
         except Exception as e:
             errors_total.labels("deepseek").inc()
             span.record_exception(e)
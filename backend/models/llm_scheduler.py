@@ -0,0 +1,255 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from observability.metrics import (
+    llm_scheduler_expired_total,
+    llm_scheduler_queue_depth,
+    llm_scheduler_wait_seconds,
+)
+
+# Who an LLM call is made for. Set per request (app.py / AgentController) and
+# carried into worker threads by the context copy in agents.pipeline.run_blocking.
+request_client: ContextVar[Optional[str]] = ContextVar("llm_request_client", default=None)
+request_session: ContextVar[Optional[str]] = ContextVar("llm_request_session", default=None)
+# time.monotonic() by which the whole request must be answered (its latency budget).
+request_deadline: ContextVar[Optional[float]] = ContextVar("llm_request_deadline", default=None)
+
+# Lower runs first. Short interactive flows outrank long recommendation prompts.
+FLOW_PRIORITY = {
+    "intent_classification": 0,
+    "installation": 0,
+    "brand_symptom_guidance": 0,
+    "product_recommendation": 1,
+}
+DEFAULT_PRIORITY = 1
+
+# Seconds a call may wait for a slot before it is abandoned.
+FLOW_DEADLINE_S = {
+    "intent_classification": 5.0,
+    "installation": 15.0,
+    "brand_symptom_guidance": 20.0,
+    "product_recommendation": 30.0,
+}
+DEFAULT_DEADLINE_S = 30.0
+
+
+class LLMDeadlineExceeded(RuntimeError):
+    """The call waited past its deadline and was never sent."""
+
+
+def _parse_weights(raw: str) -> Dict[str, float]:
+    weights = {}
+    for item in filter(None, (s.strip() for s in raw.split(","))):
+        name, _, value = item.partition("=")
+        weights[name.strip()] = float(value)
+    return weights
+
+
+@dataclass(frozen=True)
+class LLMSchedulerConfig:
+    """
+    max_concurrency  LLM_MAX_CONCURRENCY  calls in flight at once (match the DeepSeek rate limit)
+    client_weights   LLM_CLIENT_WEIGHTS   e.g. "bulk-importer=0.25,partner=2"; others weigh 1
+    """
+
+    max_concurrency: int = 16
+    client_weights: Dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_env(cls) -> "LLMSchedulerConfig":
+        return cls(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", cls.max_concurrency)),
+            client_weights=_parse_weights(os.getenv("LLM_CLIENT_WEIGHTS", "")),
+        )
+
+
+@dataclass(eq=False)
+class _Ticket:
+    flow: str
+    key: Tuple[int, str, str]  # (priority, client, session)
+    deadline: float
+    seq: int
+    enqueued: float
+    granted: bool = False
+    expired: bool = False
+
+    def __lt__(self, other: "_Ticket") -> bool:
+        return (self.deadline, self.seq) < (other.deadline, other.seq)
+
+
+class _FlowQueue:
+    """Waiting calls of one (priority, client, session), plus their WFQ finish tags."""
+
+    def __init__(self):
+        self.tickets: List[_Ticket] = []  # heap, earliest deadline first
+        self.tags: Deque[float] = deque()  # increasing virtual finish tags
+        self.last_finish = 0.0
+
+
+class LLMScheduler:
+    """
+    Gate for outbound LLM calls: a global concurrency cap with fair ordering.
+
+    Calls are grouped by (flow priority, client, session). Strict priority
+    decides between groups of different priority; within a priority level the
+    group with the smallest weighted-fair-queuing finish tag goes next, so a
+    client that floods the queue only delays itself. A client's weight is
+    shared by its active sessions. Within a group, the call with the earliest
+    deadline goes first, and calls still waiting at their deadline are
+    abandoned instead of spending a slot on an answer nobody is waiting for.
+    Cost is the prompt size, so long prompts use up a client's share faster.
+    """
+
+    def __init__(self, config: LLMSchedulerConfig, clock: Callable[[], float] = time.monotonic):
+        self.config = config
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._queues: Dict[Tuple[int, str, str], _FlowQueue] = {}
+        self._sessions: Dict[str, Counter] = {}  # client -> live calls per session
+        self._virtual_time = 0.0
+        self._running = 0
+        self._waiting = 0
+        self._seq = itertools.count()
+
+    def running(self) -> int:
+        return self._running
+
+    def waiting(self) -> int:
+        return self._waiting
+
+    def submit(
+        self,
+        fn: Callable[[], Any],
+        flow: str,
+        cost: float = 1.0,
+        client: Optional[str] = None,
+        session: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> Any:
+        """
+        Run `fn` once the scheduler grants it a slot; blocks the calling thread.
+
+        `deadline` (on the scheduler's clock) tightens the flow's own deadline.
+        """
+        client = client or request_client.get() or "anonymous"
+        session = session or request_session.get() or "-"
+
+        ticket = self._enqueue(flow, client, session, cost, deadline)
+        try:
+            self._wait_for_slot(ticket)
+            return fn()
+        finally:
+            self._finish(ticket, client, session)
+
+    # -- queueing --
+
+    def _enqueue(
+        self, flow: str, client: str, session: str, cost: float, deadline: Optional[float]
+    ) -> _Ticket:
+        now = self._clock()
+        priority = FLOW_PRIORITY.get(flow, DEFAULT_PRIORITY)
+        key = (priority, client, session)
+
+        with self._cond:
+            sessions = self._sessions.setdefault(client, Counter())
+            sessions[session] += 1
+            weight = self.config.client_weights.get(client, 1.0) / len(sessions)
+
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = self._queues[key] = _FlowQueue()
+
+            start = max(self._virtual_time, queue.last_finish)
+            queue.last_finish = start + max(cost, 1.0) / weight
+            queue.tags.append(queue.last_finish)
+
+            ticket = _Ticket(
+                flow=flow,
+                key=key,
+                deadline=min(
+                    now + FLOW_DEADLINE_S.get(flow, DEFAULT_DEADLINE_S),
+                    deadline if deadline is not None else float("inf"),
+                ),
+                seq=next(self._seq),
+                enqueued=now,
+            )
+            heapq.heappush(queue.tickets, ticket)
+            self._waiting += 1
+            llm_scheduler_queue_depth.set(self._waiting)
+
+            self._dispatch_locked()
+        return ticket
+
+    def _wait_for_slot(self, ticket: _Ticket):
+        with self._cond:
+            while not ticket.granted:
+                remaining = ticket.deadline - self._clock()
+                if remaining <= 0:
+                    self._expire_locked(ticket)
+                    raise LLMDeadlineExceeded(
+                        f"{ticket.flow} call waited past its deadline"
+                    )
+                self._cond.wait(timeout=remaining)
+
+        llm_scheduler_wait_seconds.labels(ticket.flow).observe(self._clock() - ticket.enqueued)
+
+    def _expire_locked(self, ticket: _Ticket):
+        ticket.expired = True
+        queue = self._queues[ticket.key]
+        queue.tickets.remove(ticket)
+        heapq.heapify(queue.tickets)
+        # Give back the newest share; older tags keep their place, and the
+        # next call of this group starts where the remaining ones finish.
+        queue.tags.pop()
+        if queue.tickets:
+            queue.last_finish = queue.tags[-1]
+        else:
+            del self._queues[ticket.key]
+
+        self._waiting -= 1
+        llm_scheduler_queue_depth.set(self._waiting)
+        llm_scheduler_expired_total.labels(ticket.flow).inc()
+
+    def _finish(self, ticket: _Ticket, client: str, session: str):
+        with self._cond:
+            if ticket.granted:
+                self._running -= 1
+
+            sessions = self._sessions[client]
+            sessions[session] -= 1
+            if sessions[session] <= 0:
+                del sessions[session]
+            if not sessions:
+                del self._sessions[client]
+
+            self._dispatch_locked()
+
+    def _dispatch_locked(self):
+        granted = False
+        while self._running < self.config.max_concurrency and self._queues:
+            key, queue = min(
+                self._queues.items(),
+                key=lambda kv: (kv[0][0], kv[1].tags[0]),
+            )
+            ticket = heapq.heappop(queue.tickets)
+            # Serving a lower priority level can pick a smaller tag than one
+            # already served; virtual time never moves backwards.
+            self._virtual_time = max(self._virtual_time, queue.tags.popleft())
+            if not queue.tickets:
+                del self._queues[key]
+
+            ticket.granted = True
+            self._running += 1
+            self._waiting -= 1
+            granted = True
+
+        if granted:
+            llm_scheduler_queue_depth.set(self._waiting)
+            self._cond.notify_all()
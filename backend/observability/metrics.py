@@ -1,6 +1,6 @@
 # backend/observability/metrics.py
 
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 # ---- Counters ----
 
@@ -14,6 +14,17 @@ vector_search_total = Counter(
     "Total number of FAISS semantic searches",
 )
 
+vector_shard_searches_total = Counter(
+    "vector_shard_searches_total",
+    "Semantic searches over the sharded index by how many shards they queried",
+    ["mode"],  # targeted (appliance/brand known) / scatter (several shards)
+)
+
+vector_search_gated_total = Counter(
+    "vector_search_gated_total",
+    "Semantic searches that returned nothing because no hit reached the minimum score",
+)
+
 agent_tool_invocations_total = Counter(
     "agent_tool_invocations_total",
     "Total number of tool invocations by the agent",
@@ -26,6 +37,157 @@ errors_total = Counter(
     ["type"],  # type of error (deepseek, vectorstore, tool, agent)
 )
 
+fuzzy_entity_matches_total = Counter(
+    "fuzzy_entity_matches_total",
+    "Model / part numbers resolved by typo-tolerant matching",
+    ["entity"],  # model / part_number
+)
+
+installation_answers_total = Counter(
+    "installation_answers_total",
+    "Installation answers by how they were produced",
+    ["path"],  # materialized (offline answer store) / template (LLM-free) / llm / degraded (LLM unavailable)
+)
+
+admission_shed_total = Counter(
+    "admission_shed_total",
+    "Chat turns rejected by admission control",
+    ["reason"],  # queue_full (429) / queue_timeout (503)
+)
+
+llm_scheduler_expired_total = Counter(
+    "llm_scheduler_expired_total",
+    "LLM calls abandoned after waiting past their deadline",
+    ["flow"],
+)
+
+degraded_answers_total = Counter(
+    "degraded_answers_total",
+    "Answers built from retrieval alone because the LLM was unavailable",
+    ["flow"],
+)
+
+coalesced_requests_total = Counter(
+    "coalesced_requests_total",
+    "Requests served by joining an identical in-flight computation",
+    ["flow"],
+)
+
+retrieval_reuse_total = Counter(
+    "retrieval_reuse_total",
+    "Answered chat turns by where their parts came from: reused or resolved from the session's last retrieval, or searched",
+    ["outcome"],
+)
+
+pipeline_stage_failures_total = Counter(
+    "pipeline_stage_failures_total",
+    "Pipeline stages that timed out or raised",
+    ["pipeline", "stage", "reason"],  # reason: timeout / error
+)
+
+trace_sampling_decisions_total = Counter(
+    "trace_sampling_decisions_total",
+    "Tail-sampling decisions for finished traces",
+    ["decision"],  # error / slow / sampled / dropped / evicted
+)
+
+catalog_reloads_total = Counter(
+    "catalog_reloads_total",
+    "Total number of catalog snapshot reloads",
+    ["status"],  # success / failure
+)
+
+catalog_registry_loads_total = Counter(
+    "catalog_registry_loads_total",
+    "Catalog registry loads, from the compiled snapshot or by parsing the catalog",
+    ["source"],  # snapshot / catalog
+)
+
+llm_tokens_total = Counter(
+    "llm_tokens_total",
+    "LLM tokens billed, by flow and token type",
+    ["flow", "type"],  # type: prompt_cache_hit / prompt_cache_miss / completion
+)
+
+llm_estimated_cost_usd_total = Counter(
+    "llm_estimated_cost_usd_total",
+    "Estimated LLM spend in USD from token usage and configured prices",
+    ["flow"],
+)
+
+ws_chat_messages_total = Counter(
+    "ws_chat_messages_total",
+    "Chat turns received over /ws/chat by outcome",
+    ["outcome"],  # answered | shed | invalid
+)
+
+ws_chat_closed_total = Counter(
+    "ws_chat_closed_total",
+    "/ws/chat connections closed, by reason",
+    ["reason"],  # client | limit | idle | slow_consumer
+)
+
+# ---- Gauges ----
+# multiprocess_mode says how per-worker values combine when several workers
+# share PROMETHEUS_MULTIPROC_DIR (observability/multiprocess.py); "live"
+# modes leave out stopped workers. It has no effect in a single process.
+
+catalog_version_info = Gauge(
+    "catalog_version_info",
+    "Active catalog snapshot (value is 1 for the version currently serving)",
+    ["version"],
+    multiprocess_mode="livemax",
+)
+
+catalog_parts = Gauge(
+    "catalog_parts",
+    "Number of parts in the active catalog snapshot",
+    multiprocess_mode="livemax",
+)
+
+catalog_registry_terms = Gauge(
+    "catalog_registry_terms",
+    "Entries in the active catalog registry, by vocabulary",
+    ["kind"],  # brands / part_numbers / models / symptoms
+    multiprocess_mode="livemax",
+)
+
+admission_inflight = Gauge(
+    "admission_inflight",
+    "Chat turns currently admitted",
+    multiprocess_mode="livesum",
+)
+
+admission_queue_depth = Gauge(
+    "admission_queue_depth",
+    "Chat turns waiting for admission",
+    multiprocess_mode="livesum",
+)
+
+admission_concurrency_limit = Gauge(
+    "admission_concurrency_limit",
+    "Current adaptive in-flight limit for chat turns",
+    multiprocess_mode="livesum",
+)
+
+llm_scheduler_queue_depth = Gauge(
+    "llm_scheduler_queue_depth",
+    "LLM calls waiting for a scheduler slot",
+    multiprocess_mode="livesum",
+)
+
+ws_chat_connections = Gauge(
+    "ws_chat_connections",
+    "Open /ws/chat connections",
+    multiprocess_mode="livesum",
+)
+
+llm_circuit_breaker_state = Gauge(
+    "llm_circuit_breaker_state",
+    "DeepSeek circuit breaker state (0 closed, 1 half-open, 2 open)",
+    multiprocess_mode="livemax",
+)
+
 # ---- Histograms ----
 
 request_latency_seconds = Histogram(
@@ -34,3 +196,56 @@ request_latency_seconds = Histogram(
     buckets=[0.05, 0.1, 0.2, 0.5, 1, 3, 5],
 )
 
+vector_search_results = Histogram(
+    "vector_search_results",
+    "Hits kept per semantic search after the adaptive score cutoff",
+    buckets=[0, 1, 2, 3, 4, 5, 8],
+)
+
+admission_queue_wait_seconds = Histogram(
+    "admission_queue_wait_seconds",
+    "Time chat turns spent waiting for admission",
+    buckets=[0, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5],
+)
+
+pipeline_stage_seconds = Histogram(
+    "pipeline_stage_seconds",
+    "Duration of each pipeline stage",
+    ["pipeline", "stage"],
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5],
+)
+
+llm_scheduler_wait_seconds = Histogram(
+    "llm_scheduler_wait_seconds",
+    "Time LLM calls waited for a scheduler slot",
+    ["flow"],
+    buckets=[0, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20],
+)
+
+llm_call_latency_seconds = Histogram(
+    "llm_call_latency_seconds",
+    "DeepSeek call latency by flow and prompt-cache outcome",
+    ["flow", "cache"],
+    buckets=[0.25, 0.5, 1, 2, 3, 5, 8, 13, 20],
+)
+
+llm_prompt_tokens = Histogram(
+    "llm_prompt_tokens",
+    "Prompt tokens per DeepSeek call",
+    ["flow", "cache"],  # cache: hit / partial / miss / unknown
+    buckets=[64, 128, 256, 512, 1024, 2048, 4096, 8192],
+)
+
+llm_completion_tokens = Histogram(
+    "llm_completion_tokens",
+    "Completion tokens per DeepSeek call",
+    ["flow", "cache"],
+    buckets=[16, 32, 64, 128, 256, 512, 1024, 2048],
+)
+
+llm_latency_per_output_token_seconds = Histogram(
+    "llm_latency_per_output_token_seconds",
+    "DeepSeek call latency divided by completion tokens",
+    ["flow"],
+    buckets=[0.005, 0.01, 0.02, 0.03, 0.05, 0.075, 0.1, 0.2, 0.5],
+)
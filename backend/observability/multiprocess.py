@@ -0,0 +1,69 @@
+# Prometheus metrics across several worker processes.
+#
+# With PROMETHEUS_MULTIPROC_DIR set, prometheus_client keeps every metric in
+# per-process mmap'd files in that directory, and /metrics (served by the
+# Instrumentator in app.py) aggregates all of them at scrape time, so a
+# scrape reports the whole deployment, whichever worker answers it.
+#
+# Run from backend/ to start N uvicorn workers in this mode:
+#   python -m observability.multiprocess --workers 4 --port 8000
+#
+# Under gunicorn, export PROMETHEUS_MULTIPROC_DIR (emptied before start) and
+# call mark_worker_dead(worker.pid) from the child_exit hook.
+
+import argparse
+import os
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+
+def enabled() -> bool:
+    return bool(os.getenv(MULTIPROC_DIR_ENV))
+
+
+def reset_dir(path) -> Path:
+    """
+    Create the metrics directory, or empty it of a previous run's files.
+    Must run before any worker starts: counts left behind would be added in.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    for stale in path.glob("*.db"):
+        stale.unlink()
+    return path
+
+
+def mark_worker_dead(pid: Optional[int] = None):
+    """
+    Drop a stopped worker's live gauges (admission_inflight, queue depths,
+    ...). Its counters and histograms stay in the totals.
+    """
+    if not enabled():
+        return
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(pid or os.getpid())
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve app:app on several workers with shared metrics.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    directory = reset_dir(os.getenv(MULTIPROC_DIR_ENV) or tempfile.mkdtemp(prefix="prometheus-"))
+    # Workers inherit the environment, and read it before importing prometheus_client.
+    os.environ[MULTIPROC_DIR_ENV] = str(directory)
+    print(f"[METRICS] Multiprocess metrics in {directory}, {args.workers} workers")
+
+    import uvicorn
+
+    uvicorn.run("app:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
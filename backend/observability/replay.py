@@ -0,0 +1,219 @@
+# Replay captured /chat traffic (TRAFFIC_CAPTURE_PATH) against a local backend.
+#
+# Run from backend/, with the backend's LLM stubbed from the same log:
+#   LLM_STUB_LOG=traffic.jsonl uvicorn app:app --port 8000
+#   python -m observability.replay traffic.jsonl --url http://localhost:8000 --speed 4
+#
+# Requests keep their recorded inter-arrival gaps (divided by --speed; 0 sends
+# as fast as possible), and turns of one session are sent in order, each after
+# the previous one has been answered, so session memory behaves as recorded.
+
+import argparse
+import asyncio
+import difflib
+import json
+import math
+import sys
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from observability.traffic import anonymize_text, read_log
+
+
+@dataclass
+class ReplayResult:
+    record: Dict[str, Any]
+    status: int
+    latency_s: float
+    answer: Optional[str]
+    lateness_s: float  # how far behind its scheduled send time the request went out
+
+
+@dataclass
+class ReplayReport:
+    results: List[ReplayResult]
+    duration_s: float
+    diffs: List[str] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        return len(self.results) / self.duration_s if self.duration_s else 0.0
+
+    def latency_ms(self, recorded: bool = False) -> Dict[str, float]:
+        values = sorted(
+            (r.record["ms"] if recorded else r.latency_s * 1000) for r in self.results
+        )
+        return {f"p{p}": _percentile(values, p) for p in (50, 90, 99)} | {
+            "max": values[-1] if values else 0.0
+        }
+
+    @property
+    def statuses(self) -> Counter:
+        return Counter(r.status for r in self.results)
+
+    @property
+    def compared(self) -> int:
+        return sum(1 for r in self.results if _comparable(r))
+
+    @property
+    def diff_rate(self) -> float:
+        return len(self.diffs) / self.compared if self.compared else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "requests": len(self.results),
+            "duration_s": round(self.duration_s, 3),
+            "throughput_rps": round(self.throughput, 2),
+            "latency_ms": {k: round(v, 1) for k, v in self.latency_ms().items()},
+            "recorded_latency_ms": {k: round(v, 1) for k, v in self.latency_ms(recorded=True).items()},
+            "statuses": dict(self.statuses),
+            "answers_compared": self.compared,
+            "answers_changed": len(self.diffs),
+            "max_lateness_ms": round(max((r.lateness_s for r in self.results), default=0) * 1000, 1),
+        }
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values), max(1, math.ceil(p / 100 * len(sorted_values)))) - 1
+    return sorted_values[rank]
+
+
+def _comparable(result: ReplayResult) -> bool:
+    return result.record.get("st") == 200 and result.status == 200
+
+
+def _normalize(answer: str) -> List[str]:
+    return [" ".join(line.split()) for line in anonymize_text(answer or "").splitlines()]
+
+
+def answer_diff(record: Dict[str, Any], answer: str) -> Optional[str]:
+    recorded, replayed = _normalize(record.get("answer", "")), _normalize(answer)
+    if recorded == replayed:
+        return None
+    return "\n".join(difflib.unified_diff(
+        recorded, replayed, f"recorded {record['id']}", f"replayed {record['id']}", lineterm=""
+    ))
+
+
+async def replay(
+    records: List[Dict[str, Any]],
+    client: httpx.AsyncClient,
+    speed: float = 1.0,
+    concurrency: int = 256,
+) -> ReplayReport:
+    """Re-issue `records` through `client` (its base_url is the backend)."""
+    records = sorted(records, key=lambda r: r["ts"])
+    if not records:
+        return ReplayReport(results=[], duration_s=0.0)
+
+    run = uuid.uuid4().hex[:8]
+    first_ts = records[0]["ts"]
+    slots = asyncio.Semaphore(concurrency)
+    previous_turn: Dict[str, asyncio.Task] = {}
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    async def send(record: Dict[str, Any], after: Optional[asyncio.Task]) -> ReplayResult:
+        target = started + ((record["ts"] - first_ts) / speed if speed > 0 else 0.0)
+        await asyncio.sleep(max(0.0, target - loop.time()))
+        if after is not None:
+            await asyncio.wait([after])
+
+        session = record.get("s")
+        payload = {
+            "message": record["m"],
+            "session_id": f"replay-{run}-{session}" if session else None,
+            "view": record.get("v") or "full",
+        }
+        async with slots:
+            sent = loop.time()
+            try:
+                response = await client.post(
+                    "/chat", json=payload,
+                    headers={"X-Replay-Id": f"{run}:{record['id']}", "X-Client-Id": f"replay-{run}"},
+                )
+                status = response.status_code
+                answer = response.json().get("answer") if status == 200 else None
+            except httpx.HTTPError:
+                status, answer = 0, None
+            return ReplayResult(record, status, loop.time() - sent, answer, sent - target)
+
+    tasks = []
+    for record in records:
+        session = record.get("s")
+        task = asyncio.create_task(send(record, previous_turn.get(session) if session else None))
+        if session:
+            previous_turn[session] = task
+        tasks.append(task)
+
+    results = await asyncio.gather(*tasks)
+    report = ReplayReport(results=list(results), duration_s=loop.time() - started)
+    for result in results:
+        if _comparable(result):
+            diff = answer_diff(result.record, result.answer)
+            if diff is not None:
+                report.diffs.append(diff)
+    return report
+
+
+def _print_report(report: ReplayReport, show_diffs: int):
+    summary = report.summary()
+    print(f"[REPLAY] {summary['requests']} requests in {summary['duration_s']}s "
+          f"({summary['throughput_rps']} req/s), statuses {summary['statuses']}")
+    print(f"{'latency ms':14} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    for name, lat in (("replayed", summary["latency_ms"]), ("recorded", summary["recorded_latency_ms"])):
+        print(f"{name:14} {lat['p50']:8.1f} {lat['p90']:8.1f} {lat['p99']:8.1f} {lat['max']:8.1f}")
+    print(f"[REPLAY] answers changed: {summary['answers_changed']} / {summary['answers_compared']}")
+    for diff in report.diffs[:show_diffs]:
+        print(diff)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay captured /chat traffic.")
+    parser.add_argument("log", help="capture log (TRAFFIC_CAPTURE_PATH)")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--speed", type=float, default=1.0, help="N× the recorded rate; 0 = no pacing")
+    parser.add_argument("--concurrency", type=int, default=256, help="max requests in flight")
+    parser.add_argument("--limit", type=int, default=0, help="replay only the first N requests")
+    parser.add_argument("--show-diffs", type=int, default=5, help="answer diffs to print")
+    parser.add_argument("--json", dest="json_out", help="also write the summary here")
+    parser.add_argument("--max-p99-ms", type=float, help="exit 1 if replayed p99 latency is higher")
+    parser.add_argument("--max-diff-rate", type=float, help="exit 1 if more answers than this fraction changed")
+    args = parser.parse_args(argv)
+
+    records = list(read_log(args.log))
+    if args.limit:
+        records = sorted(records, key=lambda r: r["ts"])[:args.limit]
+
+    async def run():
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            return await replay(records, client, args.speed, args.concurrency)
+
+    started = time.perf_counter()
+    report = asyncio.run(run())
+    _print_report(report, args.show_diffs)
+    print(f"[REPLAY] done in {time.perf_counter() - started:.1f}s")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(report.summary(), f, indent=2)
+
+    failed = False
+    if args.max_p99_ms is not None and report.latency_ms()["p99"] > args.max_p99_ms:
+        print(f"[REPLAY] FAIL: p99 {report.latency_ms()['p99']:.1f} ms > {args.max_p99_ms} ms")
+        failed = True
+    if args.max_diff_rate is not None and report.diff_rate > args.max_diff_rate:
+        print(f"[REPLAY] FAIL: {report.diff_rate:.1%} of answers changed > {args.max_diff_rate:.1%}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,30 +1,199 @@
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional
+
 from opentelemetry import trace
 from opentelemetry.sdk.resources import Resource
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+from opentelemetry.sdk.trace import ReadableSpan, SpanLimits, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import StatusCode
+
+from observability.metrics import trace_sampling_decisions_total
 
 
-def setup_tracing():
+@dataclass(frozen=True)
+class TracingConfig:
     """
-    Configure OpenTelemetry + OTLP exporter (Grafana Tempo).
+    Tracing settings, read from the environment by `from_env`.
+
+    exporter            TRACING_EXPORTER            otlp | console | none
+    endpoint            OTEL_EXPORTER_OTLP_ENDPOINT OTLP gRPC endpoint
+    head_sample_ratio   TRACING_HEAD_SAMPLE_RATIO   fraction of traces recorded at all
+    tail_sample_ratio   TRACING_TAIL_SAMPLE_RATIO   fraction of recorded, healthy traces exported
+    slow_threshold_ms   TRACING_SLOW_THRESHOLD_MS   traces at least this slow are always exported
+    max_attribute_length TRACING_MAX_ATTRIBUTE_LENGTH  longer string attributes are truncated
+    max_attributes      TRACING_MAX_ATTRIBUTES      attributes kept per span; later ones are dropped
+    """
+
+    exporter: str = "otlp"
+    endpoint: str = "http://localhost:4317"
+    head_sample_ratio: float = 1.0
+    tail_sample_ratio: float = 1.0
+    slow_threshold_ms: float = 2000.0
+    max_attribute_length: int = 256
+    max_attributes: int = 32
+
+    @classmethod
+    def from_env(cls) -> "TracingConfig":
+        return cls(
+            exporter=os.getenv("TRACING_EXPORTER", cls.exporter).lower(),
+            endpoint=os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", cls.endpoint),
+            head_sample_ratio=float(os.getenv("TRACING_HEAD_SAMPLE_RATIO", cls.head_sample_ratio)),
+            tail_sample_ratio=float(os.getenv("TRACING_TAIL_SAMPLE_RATIO", cls.tail_sample_ratio)),
+            slow_threshold_ms=float(os.getenv("TRACING_SLOW_THRESHOLD_MS", cls.slow_threshold_ms)),
+            max_attribute_length=int(os.getenv("TRACING_MAX_ATTRIBUTE_LENGTH", cls.max_attribute_length)),
+            max_attributes=int(os.getenv("TRACING_MAX_ATTRIBUTES", cls.max_attributes)),
+        )
+
+
+class TailSamplingSpanProcessor(SpanProcessor):
+    """
+    Buffer the spans of each trace until its local root ends, then decide.
+
+    Traces containing an error or slower than the threshold are always kept;
+    the rest are kept with probability `sample_ratio` (deterministically, by
+    trace id, independently of the head sampler). Kept spans are handed to `delegate` (normally a batch exporter).
     """
 
+    def __init__(
+        self,
+        delegate: SpanProcessor,
+        sample_ratio: float,
+        slow_threshold_ms: float,
+        max_pending_traces: int = 10_000,
+    ):
+        self._delegate = delegate
+        self._ratio_bound = int(max(0.0, min(1.0, sample_ratio)) * (1 << 64))
+        self._slow_ns = int(slow_threshold_ms * 1e6)
+        self._max_pending = max_pending_traces
+        self._pending: "OrderedDict[int, List[ReadableSpan]]" = OrderedDict()
+        # Decisions for recently finished traces, for spans that end after their root.
+        self._decided: "OrderedDict[int, bool]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def on_start(self, span, parent_context=None):
+        pass
+
+    def on_end(self, span: ReadableSpan):
+        trace_id = span.context.trace_id
+        is_local_root = span.parent is None or span.parent.is_remote
+
+        with self._lock:
+            late_decision = self._decided.get(trace_id)
+            if late_decision is None:
+                spans = self._pending.setdefault(trace_id, [])
+                spans.append(span)
+
+                if not is_local_root:
+                    if len(self._pending) > self._max_pending:
+                        self._pending.popitem(last=False)
+                        trace_sampling_decisions_total.labels("evicted").inc()
+                    return
+
+                del self._pending[trace_id]
+
+        if late_decision is not None:
+            if late_decision:
+                self._delegate.on_end(span)
+            return
+
+        reason = self._decide(span, spans)
+        keep = reason != "dropped"
+        trace_sampling_decisions_total.labels(reason).inc()
+
+        with self._lock:
+            self._decided[trace_id] = keep
+            if len(self._decided) > self._max_pending:
+                self._decided.popitem(last=False)
+
+        if keep:
+            for s in spans:
+                self._delegate.on_end(s)
+
+    def _decide(self, root: ReadableSpan, spans: List[ReadableSpan]) -> str:
+        for s in spans:
+            if s.status.status_code is StatusCode.ERROR:
+                return "error"
+            if any(e.name == "exception" for e in s.events):
+                return "error"
+
+        if root.end_time - root.start_time >= self._slow_ns:
+            return "slow"
+
+        # The high 64 bits: the head sampler (TraceIdRatioBased) already
+        # tested the low ones, so every trace it recorded would pass them.
+        if (root.context.trace_id >> 64) < self._ratio_bound:
+            return "sampled"
+        return "dropped"
+
+    def shutdown(self):
+        self._delegate.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self._delegate.force_flush(timeout_millis)
+
+
+def _make_exporter(config: TracingConfig) -> SpanExporter:
+    if config.exporter == "console":
+        return ConsoleSpanExporter()
+
+    from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+
+    return OTLPSpanExporter(endpoint=config.endpoint, insecure=True)
+
+
+def build_tracer_provider(
+    config: TracingConfig,
+    exporter: Optional[SpanExporter] = None,
+) -> Optional[TracerProvider]:
+    """
+    Build a provider for `config`, or None when tracing is switched off.
+
+    `exporter` overrides the configured one (used by tests and benchmarks).
+    """
+    if config.exporter == "none" or config.head_sample_ratio <= 0:
+        return None
+
     # ✅ This gives your service a visible name in Grafana
     resource = Resource.create({
         "service.name": "partselect-backend"
     })
 
-    provider = TracerProvider(resource=resource)
+    provider = TracerProvider(
+        resource=resource,
+        sampler=ParentBased(TraceIdRatioBased(config.head_sample_ratio)),
+        span_limits=SpanLimits(
+            max_span_attributes=config.max_attributes,
+            max_span_attribute_length=config.max_attribute_length,
+        ),
+    )
 
-    processor = BatchSpanProcessor(
-        OTLPSpanExporter(
-            endpoint="http://localhost:4317",
-            insecure=True
+    processor: SpanProcessor = BatchSpanProcessor(exporter or _make_exporter(config))
+    if config.tail_sample_ratio < 1.0:
+        processor = TailSamplingSpanProcessor(
+            processor,
+            sample_ratio=config.tail_sample_ratio,
+            slow_threshold_ms=config.slow_threshold_ms,
         )
-    )
 
     provider.add_span_processor(processor)
-    trace.set_tracer_provider(provider)
+    return provider
+
+
+def setup_tracing(config: Optional[TracingConfig] = None):
+    """
+    Configure OpenTelemetry + OTLP exporter (Grafana Tempo).
+
+    With TRACING_EXPORTER=none no SDK provider is installed at all, so every
+    tracer in the app stays a no-op and spans cost next to nothing.
+    """
+    config = config or TracingConfig.from_env()
+
+    provider = build_tracer_provider(config)
+    if provider is not None:
+        trace.set_tracer_provider(provider)
 
     return trace.get_tracer(__name__)
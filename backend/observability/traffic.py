@@ -0,0 +1,231 @@
+import hashlib
+import hmac
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+
+# LLM calls made while serving the current captured request.
+_llm_calls: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("traffic_llm_calls", default=None)
+# "<run>:<record id>" of the recorded request being replayed (X-Replay-Id),
+# for the LLM stub.
+replay_id: ContextVar[Optional[str]] = ContextVar("traffic_replay_id", default=None)
+
+MAX_MESSAGE_CHARS = 2_000
+
+# Personal data that has no bearing on routing or retrieval. Part numbers
+# (PS...), model numbers and symptoms are kept: they are what replay needs.
+_SCRUBBERS = [
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "<email>"),
+    (re.compile(r"https?://\S+"), "<url>"),
+    (re.compile(r"(?<![\w-])\+?\d[\d\s().-]{7,}\d(?![\w-])"), "<phone>"),
+    (re.compile(r"\b\d{1,5}\s+\w+(\s\w+)?\s+(street|st|avenue|ave|road|rd|drive|dr|lane|ln|blvd)\b", re.I), "<address>"),
+]
+
+
+def anonymize_text(text: str) -> str:
+    for pattern, replacement in _SCRUBBERS:
+        text = pattern.sub(replacement, text)
+    return text[:MAX_MESSAGE_CHARS]
+
+
+def anonymize_session(session_id: Optional[str], salt: bytes) -> Optional[str]:
+    """Keyed hash: turns of one session stay linked, the original id is not kept."""
+    if not session_id:
+        return None
+    return hmac.new(salt, session_id.encode(), hashlib.sha256).hexdigest()[:16]
+
+
+def prompt_key(flow: str, system_prompt: str, user_prompt: str) -> str:
+    digest = hashlib.sha256()
+    for part in (flow, system_prompt, user_prompt):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def note_llm_call(flow: str, system_prompt: str, user_prompt: str, answer: str, latency_s: float):
+    """Remember an LLM answer for the request being captured, if any."""
+    calls = _llm_calls.get()
+    if calls is not None:
+        calls.append({
+            "f": flow,
+            "k": prompt_key(flow, system_prompt, user_prompt),
+            "ms": round(latency_s * 1000, 1),
+            "a": anonymize_text(answer),
+        })
+
+
+@dataclass(frozen=True)
+class TrafficConfig:
+    """
+    path         TRAFFIC_CAPTURE_PATH    append-only JSONL log; capture is off when unset
+    sample_rate  TRAFFIC_CAPTURE_SAMPLE  fraction of /chat requests recorded
+    salt         TRAFFIC_CAPTURE_SALT    key for session-id hashing; required with a path, and shared
+                                         by every worker so a session's turns hash alike
+    """
+
+    path: Optional[str] = None
+    sample_rate: float = 1.0
+    salt: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> "TrafficConfig":
+        return cls(
+            path=os.getenv("TRAFFIC_CAPTURE_PATH") or None,
+            sample_rate=float(os.getenv("TRAFFIC_CAPTURE_SAMPLE", cls.sample_rate)),
+            salt=os.getenv("TRAFFIC_CAPTURE_SALT") or None,
+        )
+
+
+class TrafficRecorder:
+    """
+    Appends one compact JSON line per /chat request: anonymized message and
+    session, arrival time, latency, status, the answer, and the LLM answers
+    used for it (so replays can stub the LLM).
+    """
+
+    def __init__(self, config: TrafficConfig):
+        if not config.salt:
+            # A per-process salt would split one session's turns across
+            # workers and restarts, and replay would treat them as unrelated.
+            raise RuntimeError("TRAFFIC_CAPTURE_SALT is required when TRAFFIC_CAPTURE_PATH is set.")
+        self.config = config
+        self._salt = config.salt.encode()
+        self._lock = threading.Lock()
+        Path(config.path).parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(config.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    @classmethod
+    def from_env(cls) -> Optional["TrafficRecorder"]:
+        config = TrafficConfig.from_env()
+        return cls(config) if config.path else None
+
+    @contextmanager
+    def capture(self):
+        """
+        Collect the LLM calls made inside the block. Yields None for requests
+        left out by sampling, which are then not recorded.
+        """
+        if random.random() >= self.config.sample_rate:
+            yield None
+            return
+
+        calls: List[Dict[str, Any]] = []
+        token = _llm_calls.set(calls)
+        try:
+            yield calls
+        finally:
+            _llm_calls.reset(token)
+
+    def record(
+        self,
+        calls: Optional[List[Dict[str, Any]]],
+        arrived_at: float,
+        message: str,
+        session_id: Optional[str],
+        view: str,
+        status: int,
+        latency_s: float,
+        response: Optional[Dict[str, Any]] = None,
+    ):
+        if calls is None:
+            return
+        response = response or {}
+        line = orjson.dumps({
+            "id": uuid.uuid4().hex[:12],
+            "ts": round(arrived_at, 3),
+            "s": anonymize_session(session_id, self._salt),
+            "m": anonymize_text(message),
+            "v": view,
+            "st": status,
+            "ms": round(latency_s * 1000, 1),
+            "intent": response.get("intent"),
+            "answer": anonymize_text(response.get("answer") or ""),
+            "llm": calls,
+        }) + b"\n"
+
+        # One unbuffered write() per line on an O_APPEND fd, so lines from
+        # other workers appending to the same log never interleave.
+        with self._lock:
+            os.write(self._fd, line)
+
+    def close(self):
+        with self._lock:
+            os.close(self._fd)
+
+
+def read_log(path) -> Iterator[Dict[str, Any]]:
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield orjson.loads(line)
+
+
+class LLMStub:
+    """
+    Serves recorded LLM answers in place of DeepSeek during a replay.
+
+    Calls are matched by prompt first. If the prompt changed (different
+    retrieval results, scrubbed message), they fall back to the n-th call
+    of the replayed request (X-Replay-Id), then to a fixed answer.
+    """
+
+    FALLBACK = "Recorded answer unavailable (replay stub)."
+
+    def __init__(self, records, replay_latency: bool = True):
+        self.replay_latency = replay_latency
+        self._by_key: Dict[str, Tuple[str, float]] = {}
+        self._by_request: Dict[str, List[Tuple[str, float]]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = {"prompt": 0, "request": 0, "fallback": 0}
+
+        for record in records:
+            calls = [(c["a"], c["ms"] / 1000) for c in record.get("llm", [])]
+            self._by_request[record["id"]] = calls
+            for call, answer in zip(record.get("llm", []), calls):
+                self._by_key.setdefault(call["k"], answer)
+
+    @classmethod
+    def from_env(cls) -> Optional["LLMStub"]:
+        """LLM_STUB_LOG names a capture log; LLM_STUB_LATENCY=0 answers instantly."""
+        path = os.getenv("LLM_STUB_LOG")
+        if not path:
+            return None
+        return cls(read_log(path), replay_latency=os.getenv("LLM_STUB_LATENCY", "1") != "0")
+
+    def answer(self, flow: str, system_prompt: str, user_prompt: str) -> str:
+        found = self._by_key.get(prompt_key(flow, system_prompt, user_prompt))
+        source = "prompt"
+
+        if found is None:
+            rid = replay_id.get()
+            record_id = rid.rpartition(":")[2] if rid else None
+            with self._lock:
+                # The cursor is per replay run, so every run starts at the first call.
+                calls = self._by_request.get(record_id, [])
+                n = self._cursor.get(rid, 0)
+                if n < len(calls):
+                    found, source = calls[n], "request"
+                    self._cursor[rid] = n + 1
+
+        if found is None:
+            found, source = (self.FALLBACK, 0.0), "fallback"
+
+        with self._lock:
+            self.hits[source] += 1
+
+        answer, latency_s = found
+        if self.replay_latency and latency_s:
+            time.sleep(latency_s)
+        return answer
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from agents.admission import AdmissionConfig, AdmissionController, Overloaded
+from observability.metrics import admission_shed_total
+
+
+def _shed(reason):
+    return admission_shed_total.labels(reason)._value.get()
+
+
+async def _hold(controller, release: asyncio.Event, started: list):
+    async with controller.admit():
+        started.append(1)
+        await release.wait()
+
+
+def test_queue_full_is_rejected_immediately_with_429():
+    async def scenario():
+        controller = AdmissionController(
+            AdmissionConfig(min_inflight=2, initial_inflight=2, max_queue=1, max_wait_s=5)
+        )
+        release, started = asyncio.Event(), []
+        holders = [asyncio.create_task(_hold(controller, release, started)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        assert controller.inflight() == 2 and controller.queued() == 1
+
+        before = _shed("queue_full")
+        with pytest.raises(Overloaded) as exc:
+            async with controller.admit():
+                pass
+        assert exc.value.status_code == 429 and exc.value.retry_after >= 1
+        assert _shed("queue_full") - before == 1
+
+        # The queued turn is admitted once a slot frees up.
+        release.set()
+        await asyncio.gather(*holders)
+        assert len(started) == 3 and controller.inflight() == 0
+
+    asyncio.run(scenario())
+
+
+def test_waiting_longer_than_max_wait_is_rejected_with_503():
+    async def scenario():
+        controller = AdmissionController(
+            AdmissionConfig(min_inflight=1, initial_inflight=1, max_wait_s=0.05)
+        )
+        release, started = asyncio.Event(), []
+        holder = asyncio.create_task(_hold(controller, release, started))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(Overloaded) as exc:
+            async with controller.admit():
+                pass
+        assert exc.value.status_code == 503 and exc.value.reason == "queue_timeout"
+        assert controller.queued() == 0
+
+        release.set()
+        await holder
+        assert controller.inflight() == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        controller = AdmissionController(
+            AdmissionConfig(min_inflight=1, initial_inflight=1, max_wait_s=5)
+        )
+        release, started = asyncio.Event(), []
+        holder = asyncio.create_task(_hold(controller, release, started))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(_hold(controller, release, started))
+        await asyncio.sleep(0.01)
+
+        waiter.cancel()
+        release.set()
+        await holder
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert controller.inflight() == 0 and controller.queued() == 0
+
+        # The slot is still usable.
+        async with controller.admit():
+            assert controller.inflight() == 1
+
+    asyncio.run(scenario())
+
+
+def test_limit_adapts_to_latency():
+    controller = AdmissionController(
+        AdmissionConfig(min_inflight=2, max_inflight=20, initial_inflight=10, target_latency_s=1.0)
+    )
+
+    # Fast turns grow the limit additively.
+    for _ in range(30):
+        controller._on_complete(0.1)
+    assert controller.limit == 12
+
+    # A burst of slow turns cuts it once, not once per turn.
+    for _ in range(5):
+        controller._on_complete(3.0)
+    assert controller.limit == 9
+
+    # Repeated slow intervals keep cutting, down to the floor.
+    for _ in range(20):
+        controller._last_decrease = 0.0
+        controller._on_complete(3.0)
+    assert controller.limit == 2
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import threading
+import time
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+import pytest
+
+from agents import agent as agent_module
+from agents.agent import AgentController
+from agents.singleflight import SingleFlight
+from memory.session_store import get_session
+from observability.metrics import coalesced_requests_total
+
+PART = "PS40308276"
+
+
+class _Counter:
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def hit(self):
+        with self._lock:
+            self.calls += 1
+
+
+@pytest.fixture
+def stub_backends(monkeypatch):
+    llm, search = _Counter(), _Counter()
+
+    def fake_search(query, top_k=5, snapshot=None, **filters):
+        search.hit()
+        time.sleep(0.05)
+        return [p for p in snapshot.metadata if p["id"] == query.upper()][:top_k]
+
+    def fake_llm(system_prompt, user_prompt, flow=None):
+        llm.hit()
+        time.sleep(0.2)
+        return "**Safety:** unplug first.\n1. Remove bin\n2. Swap part"
+
+    monkeypatch.setattr(agent_module, "semantic_search", fake_search)
+    monkeypatch.setattr(agent_module, "deepseek_chat", fake_llm)
+    # Exercise the slow LLM path rather than the template fast path.
+    monkeypatch.setattr(agent_module, "INSTALLATION_ANSWER_MODE", "llm")
+    return llm, search
+
+
+def _coalesced(flow):
+    return coalesced_requests_total.labels(flow)._value.get()
+
+
+def test_identical_concurrent_turns_share_one_computation(stub_backends):
+    llm, search = stub_backends
+    controller = AgentController()
+    before = _coalesced("installation")
+
+    async def burst():
+        return await asyncio.gather(*[
+            controller.handle_chat(f"How do I install {PART}?", session_id=f"s{i}")
+            for i in range(5)
+        ])
+
+    responses = asyncio.run(burst())
+
+    assert llm.calls == 1 and search.calls == 1
+    assert _coalesced("installation") - before == 4
+    assert [r["session_id"] for r in responses] == [f"s{i}" for i in range(5)]
+    assert all(r["intent"] == "installation" for r in responses)
+    assert len({r["answer"] for r in responses}) == 1
+    assert responses[0]["steps"] == ["Remove bin", "Swap part"]
+
+    # Each caller's own session was updated.
+    for i in range(5):
+        assert get_session(f"s{i}")["issue_text"] == f"How do I install {PART}?"
+
+
+def test_different_session_context_is_not_coalesced(stub_backends):
+    llm, _ = stub_backends
+    controller = AgentController()
+
+    async def burst():
+        return await asyncio.gather(
+            controller.handle_chat(f"Install {PART} in my dishwasher", session_id="a"),
+            controller.handle_chat(f"Install {PART} in my fridge", session_id="b"),
+        )
+
+    first, second = asyncio.run(burst())
+
+    assert llm.calls == 2
+    assert first["entities"]["appliance"] == "dishwasher"
+    assert second["entities"]["appliance"] == "refrigerator"
+
+
+def test_singleflight_shares_errors_and_does_not_cache():
+    flight = SingleFlight("test")
+    runs = []
+
+    async def boom():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    async def main():
+        results = await asyncio.gather(
+            flight.do("k", boom), flight.do("k", boom), return_exceptions=True,
+        )
+        assert all(isinstance(r, ValueError) for r in results)
+        assert flight.inflight() == 0
+
+        await asyncio.gather(flight.do("k", boom), return_exceptions=True)
+
+    asyncio.run(main())
+    assert len(runs) == 2
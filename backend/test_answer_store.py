@@ -0,0 +1,108 @@
+import asyncio
+import os
+import sqlite3
+import threading
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+from agents import agent as agent_module
+from agents.agent import AgentController
+from data import answer_store
+from data.answer_store import AnswerStore
+from data.catalog_snapshot import get_snapshot
+from vectorstore import materialize_answers
+from vectorstore.materialize_answers import materialize
+from utils.response_formatter import FormattedAnswer
+
+
+def _parts():
+    return [
+        {"id": "PS1", "name": "Latch", "installation_guide_markdown": "Open → Swap"},
+        {"id": "PS2", "name": "Pump", "installation_guide_markdown": "Drain → Swap"},
+        {"id": "PS3", "name": "Bin", "installation_guide_markdown": "Lift → Seat"},
+    ]
+
+
+class _FakeGenerator:
+    def __init__(self, fail_on=()):
+        self.calls = []
+        self.fail_on = set(fail_on)
+        self._lock = threading.Lock()
+
+    def __call__(self, part):
+        with self._lock:
+            self.calls.append(part["id"])
+        if part["id"] in self.fail_on:
+            raise RuntimeError("LLM timeout")
+        return FormattedAnswer(text=f"1. Install {part['name']}", steps=[f"Install {part['name']}"])
+
+
+def test_job_is_resumable_and_incremental(tmp_path, monkeypatch):
+    store = AnswerStore(tmp_path / "answers.sqlite")
+    parts = _parts()
+
+    # First run: one part fails and is left out.
+    flaky = _FakeGenerator(fail_on={"PS2"})
+    monkeypatch.setitem(materialize_answers.GENERATORS, "installation", flaky)
+    stats = materialize(store, "installation", parts, concurrency=2)
+    assert stats == {"generated": 2, "failed": 1, "pruned": 0, "skipped": 0}
+
+    # Rerun resumes with only the missing part.
+    gen = _FakeGenerator()
+    monkeypatch.setitem(materialize_answers.GENERATORS, "installation", gen)
+    materialize(store, "installation", parts)
+    assert gen.calls == ["PS2"]
+
+    # New catalog: one changed part, one removed. Only the change is regenerated.
+    gen.calls.clear()
+    parts[0]["name"] = "Door Latch"
+    del parts[2]
+    stats = materialize(store, "installation", parts)
+    assert gen.calls == ["PS1"]
+    assert stats == {"generated": 1, "failed": 0, "pruned": 1, "skipped": 1}
+
+    assert store.get("installation", parts[0]).steps == ["Install Door Latch"]
+    assert store.get("installation", {"id": "PS3", "name": "Bin"}) is None
+
+
+def test_stale_answer_is_not_served(tmp_path):
+    store = AnswerStore(tmp_path / "answers.sqlite")
+    part = _parts()[0]
+    store.put("installation", part, FormattedAnswer(text="old", steps=[]))
+
+    assert store.get("installation", part).text == "old"
+    assert store.get("installation", {**part, "name": "Changed"}) is None
+    assert store.get("troubleshooting", part) is None
+
+
+def test_stores_with_a_catalog_version_column_are_migrated(tmp_path):
+    path = tmp_path / "answers.sqlite"
+    conn = sqlite3.connect(str(path))
+    conn.execute(
+        "CREATE TABLE answers (flow TEXT NOT NULL, part_id TEXT NOT NULL, part_digest TEXT NOT NULL, "
+        "catalog_version TEXT NOT NULL, answer TEXT NOT NULL, steps TEXT NOT NULL, "
+        "created_at REAL NOT NULL, PRIMARY KEY (flow, part_id))"
+    )
+    conn.close()
+
+    store = AnswerStore(path)
+    part = _parts()[0]
+    store.put("installation", part, FormattedAnswer(text="new", steps=[]))
+    assert store.get("installation", part).text == "new"
+
+
+def test_handle_chat_serves_from_the_store_first(tmp_path, monkeypatch):
+    part = next(p for p in get_snapshot().metadata if p["id"] == "PS40308276")
+    store = AnswerStore(tmp_path / "answers.sqlite")
+    store.put("installation", part, FormattedAnswer(text="1. Stored step", steps=["Stored step"]))
+
+    monkeypatch.setattr(answer_store, "_store", store)
+    monkeypatch.setattr(agent_module, "semantic_search", lambda q, top_k=5, snapshot=None, **filters: [part])
+    monkeypatch.setattr(agent_module, "deepseek_chat", lambda *a, **k: 1 / 0)
+
+    response = asyncio.run(
+        AgentController().handle_chat("How do I install PS40308276?", session_id="store")
+    )
+
+    assert response["tool_used"] == "FAISS + Answer Store"
+    assert response["steps"] == ["Stored step"]
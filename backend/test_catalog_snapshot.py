@@ -0,0 +1,170 @@
+import asyncio
+import json
+
+import faiss
+import httpx
+import numpy as np
+import pytest
+
+from data import catalog_snapshot
+from vectorstore.build_index import build
+
+
+def _part(pid, model, brand="Whirlpool", symptom="leaking"):
+    return {
+        "id": pid,
+        "brand": brand,
+        "compatible_models": [model],
+        "symptoms_vector": [symptom],
+    }
+
+
+def _write_catalog(tmp_path, parts):
+    (tmp_path / "catalog.json").write_text(json.dumps(parts))
+    (tmp_path / "meta.json").write_text(json.dumps(parts))
+
+    index = faiss.IndexFlatL2(4)
+    index.add(np.random.rand(len(parts), 4).astype("float32"))
+    faiss.write_index(index, str(tmp_path / "index.faiss"))
+
+
+def _point_at(monkeypatch, tmp_path):
+    monkeypatch.setattr(catalog_snapshot, "CATALOG_PATH", tmp_path / "catalog.json")
+    monkeypatch.setattr(catalog_snapshot, "INDEX_PATH", tmp_path / "index.faiss")
+    monkeypatch.setattr(catalog_snapshot, "META_PATH", tmp_path / "meta.json")
+    monkeypatch.setattr(catalog_snapshot, "SHARDS_DIR", tmp_path / "shards")
+    monkeypatch.setattr(catalog_snapshot, "SYMPTOMS_PATH", tmp_path / "symptoms.npz")
+    monkeypatch.setattr(catalog_snapshot, "DUPLICATES_PATH", tmp_path / "duplicates.npz")
+    monkeypatch.setattr(catalog_snapshot, "REGISTRY_PATH", tmp_path / "registry.bin")
+    monkeypatch.setattr(catalog_snapshot, "_current", None)
+
+
+def test_reload_swaps_version_and_replaces_registry(tmp_path, monkeypatch):
+    _point_at(monkeypatch, tmp_path)
+    _write_catalog(tmp_path, [_part("PS1", "WDT780SAEM1"), _part("PS2", "LFX28968ST")])
+
+    old = catalog_snapshot.get_snapshot()
+    assert old.index.ntotal == 2
+    assert old.registry.models == {"WDT780SAEM1", "LFX28968ST"}
+
+    _write_catalog(tmp_path, [_part("PS3", "KDTM354ESS3", brand="KitchenAid")])
+    new = catalog_snapshot.reload_catalog()
+
+    assert new.version != old.version
+    assert catalog_snapshot.get_snapshot() is new
+
+    # Registry sets are rebuilt, not accumulated.
+    assert new.registry.models == {"KDTM354ESS3"}
+    assert new.registry.part_numbers == {"PS3"}
+
+    # A request still holding the old snapshot keeps a consistent view.
+    assert old.registry.models == {"WDT780SAEM1", "LFX28968ST"}
+    assert old.index.ntotal == 2 and len(old.metadata) == 2
+
+
+def test_unchanged_files_keep_the_same_version(tmp_path, monkeypatch):
+    _point_at(monkeypatch, tmp_path)
+    _write_catalog(tmp_path, [_part("PS1", "WDT780SAEM1")])
+
+    first = catalog_snapshot.load_snapshot()
+    second = catalog_snapshot.load_snapshot()
+    assert first.version == second.version
+
+
+def test_failed_reload_keeps_serving_previous_version(tmp_path, monkeypatch):
+    _point_at(monkeypatch, tmp_path)
+    _write_catalog(tmp_path, [_part("PS1", "WDT780SAEM1")])
+    active = catalog_snapshot.get_snapshot()
+
+    (tmp_path / "catalog.json").write_text("{not json")
+    try:
+        catalog_snapshot.reload_catalog()
+    except ValueError:
+        pass
+
+    assert catalog_snapshot.get_snapshot() is active
+
+
+def test_background_reload_is_single_flight(tmp_path, monkeypatch):
+    _point_at(monkeypatch, tmp_path)
+    _write_catalog(tmp_path, [_part("PS1", "WDT780SAEM1")])
+
+    with catalog_snapshot._reload_lock:
+        assert catalog_snapshot.reload_catalog_in_background() is False
+
+
+def test_reload_refuses_files_from_different_builds(tmp_path, monkeypatch):
+    _point_at(monkeypatch, tmp_path)
+
+    def build_catalog(parts):
+        (tmp_path / "catalog.json").write_text(json.dumps(parts))
+        build(
+            tmp_path / "catalog.json", tmp_path / "index.faiss", tmp_path / "meta.json", None,
+            tmp_path / "symptoms.npz", None,
+            embed_batch=lambda texts: np.random.default_rng(len(texts)).random((len(texts), 4), dtype=np.float32),
+        )
+
+    build_catalog([_part("PS1", "WDT780SAEM1")])
+    active = catalog_snapshot.get_snapshot()
+    old_index = (tmp_path / "index.faiss").read_bytes()
+
+    # A build caught half way: new metadata, previous index.
+    build_catalog([_part("PS2", "LFX28968ST"), _part("PS3", "KDTM354ESS3")])
+    new_index = (tmp_path / "index.faiss").read_bytes()
+    (tmp_path / "index.faiss").write_bytes(old_index)
+    with pytest.raises(RuntimeError, match="different builds"):
+        catalog_snapshot.reload_catalog()
+    assert catalog_snapshot.get_snapshot() is active
+
+    (tmp_path / "index.faiss").write_bytes(new_index)
+    assert len(catalog_snapshot.reload_catalog().metadata) == 2
+
+
+def test_a_build_writes_one_layout_and_leftovers_of_the_other_are_ignored(tmp_path, monkeypatch):
+    _point_at(monkeypatch, tmp_path)
+    (tmp_path / "catalog.json").write_text(json.dumps([_part("PS1", "WDT780SAEM1"), _part("PS2", "LFX28968ST")]))
+
+    def build_catalog(sharded):
+        build(
+            tmp_path / "catalog.json", tmp_path / "index.faiss", tmp_path / "meta.json",
+            tmp_path / "shards" if sharded else None, None, None,
+            embed_batch=lambda texts: np.random.default_rng(len(texts)).random((len(texts), 4), dtype=np.float32),
+        )
+
+    build_catalog(sharded=True)
+    assert not (tmp_path / "index.faiss").exists()
+    snapshot = catalog_snapshot.reload_catalog()
+    assert snapshot.index is None and snapshot.shards.ntotal == 2
+
+    # The shards from the previous build stay on disk but are not served.
+    build_catalog(sharded=False)
+    snapshot = catalog_snapshot.reload_catalog()
+    assert snapshot.shards is None and snapshot.index.ntotal == 2
+
+    build_catalog(sharded=True)
+    snapshot = catalog_snapshot.reload_catalog()
+    assert snapshot.index is None and snapshot.shards.ntotal == 2
+
+
+def test_admin_reload_requires_a_configured_token(monkeypatch):
+    import app as app_module
+
+    started = []
+    monkeypatch.setattr(app_module, "reload_catalog_in_background", lambda: started.append(1) or True)
+
+    def post(token):
+        async def run():
+            transport = httpx.ASGITransport(app=app_module.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                headers = {"X-Admin-Token": token} if token is not None else {}
+                return (await client.post("/admin/reload-catalog", headers=headers)).status_code
+        return asyncio.run(run())
+
+    # No token configured: closed to everyone.
+    monkeypatch.setattr(app_module, "ADMIN_TOKEN", None)
+    assert post(None) == 403 and post("") == 403 and post("anything") == 403
+
+    monkeypatch.setattr(app_module, "ADMIN_TOKEN", "s3cret")
+    assert post(None) == 403 and post("wrong") == 403
+    assert post("s3cret") == 202
+    assert started == [1]
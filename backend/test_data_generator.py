@@ -0,0 +1,48 @@
+import json
+
+from data import data_generator
+from data.catalog_registry import build_registry, iter_catalog
+from data.data_generator import build_symptom_vocab, generate, load_golden, write_catalog
+
+
+def test_output_is_seeded_and_independent_of_worker_count(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_generator, "CHUNK_SIZE", 250)
+
+    serial = list(generate(1_000, seed=7, num_models=200, workers=1))
+    parallel = list(generate(1_000, seed=7, num_models=200, workers=2))
+    other_seed = list(generate(1_000, seed=8, num_models=200, workers=1))
+
+    assert len(serial) == 1_000
+    assert serial == parallel
+    assert serial != other_seed
+
+
+def test_ids_are_unique_and_fanout_and_vocabulary_are_respected():
+    golden = load_golden()
+    golden_models = {p["id"]: set(p.get("compatible_models", [])) for p in golden}
+    vocab = set(build_symptom_vocab(golden, 300))
+    golden_symptoms = {s for p in golden for s in p.get("symptoms_vector", [])}
+
+    parts = [json.loads(b) for b in generate(2_000, seed=1, num_models=500, fanout=(2, 4), symptom_vocab=300)]
+
+    assert len({p["id"] for p in parts}) == len(parts)
+    assert all(p["id"].startswith("PS") and len(p["id"]) == 10 for p in parts)
+    assert len(vocab) == 300 and golden_symptoms <= vocab
+    assert all(set(p["symptoms_vector"]) <= vocab for p in parts)
+
+    # Every part adds 2-4 models to its golden record's list.
+    pool = set(data_generator.build_model_pool(500, seed=1))
+    for p in parts:
+        extra = set(p["compatible_models"]) - set().union(*golden_models.values())
+        assert extra <= pool and len(extra) <= 4
+
+
+def test_registry_reads_jsonl_and_json_alike(tmp_path):
+    jsonl, array = tmp_path / "catalog.jsonl", tmp_path / "catalog.json"
+    assert write_catalog(generate(300, seed=3), jsonl) == 300
+    write_catalog(generate(300, seed=3), array)
+
+    from_jsonl = list(iter_catalog(jsonl))
+    assert from_jsonl == json.loads(array.read_text())
+    streamed, loaded = build_registry(iter_catalog(jsonl)), build_registry(from_jsonl)
+    assert (streamed.part_numbers, streamed.models) == (loaded.part_numbers, loaded.models)
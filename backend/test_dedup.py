@@ -0,0 +1,105 @@
+import json
+import os
+import re
+import zlib
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+import numpy as np
+import pytest
+
+from data import catalog_snapshot
+from vectorstore import search as search_module
+from vectorstore.build_index import build
+from vectorstore.dedup import DuplicateGrouper
+
+DIM = 128
+GOLDEN = [
+    ("Dishwasher Drain Pump", "Whirlpool", "Dishwasher", "Pumps water out of the tub after each cycle."),
+    ("Refrigerator Ice Maker Assembly", "Whirlpool", "Refrigerator", "Makes and ejects ice cubes into the bin."),
+    ("Door Gasket", "GE", "Refrigerator", "Seals the fresh food door against warm air."),
+]
+
+
+def _embed(texts):
+    # Unit-length bag of words, like the sentence-transformer's output.
+    matrix = np.zeros((len(texts), DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in re.findall(r"[a-z0-9]+", text.lower()):
+            matrix[row, zlib.crc32(word.encode()) % DIM] += 1
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def _catalog():
+    # Clones of each golden record differ only in id, part number and price
+    # (not embedded), so they embed alike.
+    parts = []
+    for n in range(4):
+        for g, (name, brand, category, description) in enumerate(GOLDEN):
+            parts.append({
+                "id": f"PS{g}{n}", "part_number": f"W{g}{n}", "name": name, "brand": brand,
+                "category": category, "description": description, "price": 10.0 + n,
+                "compatible_models": ["WDT780SAEM1", "KDTM354ESS3"],
+            })
+    return parts
+
+
+@pytest.fixture(params=[(True, 256), (True, 2), (False, 256), (False, 2)], ids=lambda p: f"sharded={p[0]}-batch={p[1]}")
+def snapshot(request, tmp_path, monkeypatch):
+    sharded, batch_size = request.param
+    catalog = _catalog()
+    (tmp_path / "catalog.json").write_text(json.dumps(catalog))
+    paths = [tmp_path / name for name in ("index.faiss", "meta.json", "shards", "symptoms.npz", "duplicates.npz")]
+    build(
+        tmp_path / "catalog.json", paths[0], paths[1], paths[2] if sharded else None, paths[3], paths[4],
+        embed_batch=_embed, batch_size=batch_size,
+    )
+    monkeypatch.setattr(search_module, "_embed_query", lambda text: _embed([text]))
+    return catalog_snapshot.load_snapshot(tmp_path / "catalog.json", *paths), sharded
+
+
+def test_clones_collapse_into_one_indexed_vector_per_group(snapshot):
+    snapshot, sharded = snapshot
+    index = snapshot.shards if sharded else snapshot.index
+
+    assert len(snapshot.metadata) == 12 and index.ntotal == 3
+    assert len(snapshot.duplicates) == 9
+    assert snapshot.duplicates.members(0).tolist() == [3, 6, 9]
+    assert snapshot.duplicates.members(3).tolist() == []
+
+
+def test_search_returns_distinct_parts_and_expands_members_on_request(snapshot):
+    snapshot, _ = snapshot
+    hits = search_module.search_hits("dishwasher drain pump water", top_k=3, snapshot=snapshot, adaptive=False)
+    assert len({h["part"]["name"] for h in hits}) == len(hits) == 3
+
+    expanded = search_module.search_hits("dishwasher drain pump", top_k=1, snapshot=snapshot, expand=True)
+    assert expanded[0]["part"]["id"] == "PS00"
+    assert [p["id"] for p in expanded[0]["members"]][:3] == ["PS01", "PS02", "PS03"]
+    parts = search_module.semantic_search("dishwasher drain pump", top_k=1, snapshot=snapshot, expand=True)
+    assert parts[0] is expanded[0]["part"] and parts[1:] == expanded[0]["members"]
+
+
+def test_grouper_keeps_different_keys_and_distant_vectors_apart():
+    grouper = DuplicateGrouper(min_cosine=0.98)
+    a, b = np.eye(2, dtype=np.float32)
+    matrix = np.stack([a, a, b, a * 0.999 + b * 0.04])
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+
+    keep = grouper.assign(["x", "y", "x", "x"], matrix, np.arange(10, 14))
+    assert keep.tolist() == [True, True, True, False]  # row 13 folds into row 10
+    assert grouper.collapsed == 1
+
+    # Later batches are matched against the representatives already kept.
+    keep = grouper.assign(["x", "y"], matrix[:2], np.array([20, 21]))
+    assert keep.tolist() == [False, False] and grouper.collapsed == 3
+
+
+def test_grouper_only_compares_the_recent_window():
+    grouper = DuplicateGrouper(min_cosine=0.98, window=2)
+    vectors = np.eye(4, dtype=np.float32)
+
+    assert grouper.assign(["x"] * 3, vectors[:3], np.arange(3)).all()
+    # Row 0 has left the 2-representative window; rows 1 and 2 are in it.
+    keep = grouper.assign(["x"] * 3, vectors[[0, 2, 1]], np.arange(3, 6))
+    assert keep.tolist() == [True, False, False]
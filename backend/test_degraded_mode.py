@@ -0,0 +1,157 @@
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+import pytest
+
+from agents import agent as agent_module
+from agents.agent import AgentController
+from data.catalog_snapshot import get_snapshot
+from models import llm
+from models.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from models.llm import LLMUnavailable, deepseek_chat
+from models.llm_scheduler import request_deadline
+from observability.metrics import degraded_answers_total, installation_answers_total
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_probes_and_closes():
+    clock = _Clock()
+    breaker = CircuitBreaker(failure_threshold=3, open_s=10, clock=clock)
+
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    # After the open period one probe is let through at a time.
+    clock.now = 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() and not breaker.allow()
+
+    # A failed probe reopens immediately.
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+class _FakeCompletions:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.fail:
+            raise TimeoutError("read timed out")
+        return SimpleNamespace(
+            usage=None,
+            choices=[SimpleNamespace(message=SimpleNamespace(content="answer"))],
+        )
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    completions = _FakeCompletions()
+    monkeypatch.setattr(llm, "client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    monkeypatch.setattr(llm, "breaker", CircuitBreaker(failure_threshold=2, open_s=60))
+    return completions
+
+
+def test_llm_gets_the_remaining_budget_as_timeout(fake_client):
+    request_deadline.set(time.monotonic() + 5)
+    try:
+        assert deepseek_chat("sys", "user", flow="test") == "answer"
+        assert 4 < fake_client.calls[0]["timeout"] <= 5
+
+        # Too little budget left: fail fast without calling DeepSeek.
+        request_deadline.set(time.monotonic() + 0.1)
+        with pytest.raises(LLMUnavailable):
+            deepseek_chat("sys", "user", flow="test")
+        assert len(fake_client.calls) == 1
+    finally:
+        request_deadline.set(None)
+
+
+def test_sdk_does_not_retry_past_the_deadline():
+    # A retry would get the whole remaining budget again.
+    assert llm.client.max_retries == 0
+
+
+def test_repeated_failures_trip_the_breaker(fake_client):
+    fake_client.fail = True
+    for _ in range(2):
+        with pytest.raises(LLMUnavailable):
+            deepseek_chat("sys", "user", flow="test")
+
+    assert llm.breaker.state == OPEN
+    with pytest.raises(LLMUnavailable, match="circuit breaker open"):
+        deepseek_chat("sys", "user", flow="test")
+    assert len(fake_client.calls) == 2
+
+
+def _degraded(flow):
+    return degraded_answers_total.labels(flow)._value.get()
+
+
+def test_turn_is_answered_from_retrieval_when_the_llm_is_unavailable(monkeypatch):
+    parts = get_snapshot().metadata[:2]
+
+    def unavailable(*args, **kwargs):
+        raise LLMUnavailable("circuit breaker open")
+
+    monkeypatch.setattr(agent_module, "semantic_search", lambda q, top_k=5, snapshot=None, **filters: parts)
+    monkeypatch.setattr(agent_module, "deepseek_chat", unavailable)
+    before = _degraded("product_recommendation")
+
+    response = asyncio.run(
+        AgentController().handle_chat("My refrigerator ice maker is leaking", session_id="degraded")
+    )
+
+    assert response["intent"] == "product_recommendation"
+    assert response["degraded"] is True
+    assert response["tool_output"] == parts
+    for part in parts:
+        assert f"{part['name']} ({part['id']}): ${part['price']:.2f}" in response["answer"]
+    assert "Install: " in response["answer"]
+    assert _degraded("product_recommendation") - before == 1
+
+
+def _installation_answers(path):
+    return installation_answers_total.labels(path)._value.get()
+
+
+def test_degraded_installation_answers_are_not_counted_as_template_wins(monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise LLMUnavailable("circuit breaker open")
+
+    def search(query, top_k=5, snapshot=None, **filters):
+        return [p for p in snapshot.metadata if p["id"] == query.upper()][:top_k]
+
+    monkeypatch.setattr(agent_module, "INSTALLATION_ANSWER_MODE", "llm")
+    monkeypatch.setattr(agent_module, "get_answer_store", lambda: None)
+    monkeypatch.setattr(agent_module, "semantic_search", search)
+    monkeypatch.setattr(agent_module, "deepseek_chat", unavailable)
+    before = {path: _installation_answers(path) for path in ("template", "degraded")}
+
+    response = asyncio.run(
+        AgentController().handle_chat("How do I install PS40308276?", session_id="degraded-install")
+    )
+
+    assert response["degraded"] is True
+    assert _installation_answers("degraded") - before["degraded"] == 1
+    assert _installation_answers("template") == before["template"]
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import random
+import string
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+import agents.agent as agent_module
+from agents.agent import AgentController, _extract_model, _extract_part_number
+from data.catalog_registry import build_registry
+from data.catalog_snapshot import get_snapshot
+from data.fuzzy_index import FuzzyIndex, edit_distance
+
+
+def _osa(a, b):
+    # Unbanded reference implementation.
+    d = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in range(len(a) + 1):
+        d[i][0] = i
+    for j in range(len(b) + 1):
+        d[0][j] = j
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[len(a)][len(b)]
+
+
+def _mutate(rng, s, edits):
+    alphabet = string.ascii_uppercase + string.digits
+    for _ in range(edits):
+        i = rng.randrange(len(s))
+        op = rng.choice("sidt")
+        if op == "s":
+            s = s[:i] + rng.choice(alphabet) + s[i + 1:]
+        elif op == "i":
+            s = s[:i] + rng.choice(alphabet) + s[i:]
+        elif op == "d" and len(s) > 1:
+            s = s[:i] + s[i + 1:]
+        elif op == "t" and i + 1 < len(s):
+            s = s[:i] + s[i + 1] + s[i] + s[i + 2:]
+    return s
+
+
+def test_banded_distance_matches_reference():
+    rng = random.Random(7)
+    for _ in range(2000):
+        a = "".join(rng.choice("AB12") for _ in range(rng.randint(0, 8)))
+        b = _mutate(rng, a, rng.randint(0, 3)) if a else "A"
+        expected = _osa(a, b)
+        assert edit_distance(a, b, 2) == (expected if expected <= 2 else 3)
+
+
+def test_lookup_finds_every_term_within_two_edits():
+    rng = random.Random(11)
+    alphabet = string.ascii_uppercase + string.digits
+    terms = ["".join(rng.choice(alphabet) for _ in range(rng.randint(6, 12))) for _ in range(500)]
+    index = FuzzyIndex(terms)
+
+    for _ in range(100):
+        query = _mutate(rng, rng.choice(terms), rng.randint(1, 2))
+        expected = {t for t in index._terms if _osa(query, t) <= 2}
+        found = {m.term for m in index.lookup(query, limit=len(terms))}
+        assert found == expected
+
+
+def test_confidence_drops_with_distance_and_ties():
+    index = FuzzyIndex(["WDT780SAEM1", "KDTM354ESS3", "ABC1234X", "ABC1234Y"])
+
+    exact = index.lookup("wdt780saem1")[0]
+    assert exact.term == "WDT780SAEM1" and exact.distance == 0 and exact.confidence == 1.0
+
+    typo = index.lookup("WDT780SAEM")[0]
+    assert typo.term == "WDT780SAEM1" and typo.distance == 1
+    assert 0.75 < typo.confidence < 1.0
+
+    # Two equally close terms: neither is trusted.
+    ambiguous = index.lookup("ABC1234")
+    assert {m.term for m in ambiguous} == {"ABC1234X", "ABC1234Y"}
+    assert all(m.confidence < 0.5 for m in ambiguous)
+
+    assert index.lookup("ZZZZZZZZ") == []
+
+
+def test_agent_extracts_mistyped_model_and_part_number():
+    registry = build_registry([
+        {"id": "PS11752778", "brand": "Whirlpool", "compatible_models": ["WDT780SAEM1"]},
+        {"id": "PS12345678", "brand": "GE", "compatible_models": ["GSS25GSHSS"]},
+    ])
+
+    # A missing revision suffix names the model family, not one revision.
+    assert _extract_model("is this for my wdt780saem dishwasher?", registry) == "WDT780SAEM"
+    assert _extract_model("model WTD780SAEM1 leaks", registry) == "WDT780SAEM1"
+    assert _extract_part_number("how do i install ps11725778", registry) == "PS11752778"
+
+    # Exact matches still win, and unrelated codes are not forced onto a model.
+    assert _extract_model("GSS25GSHSS", registry) == "GSS25GSHSS"
+    assert _extract_model("my code is 99999", registry) is None
+
+
+def test_corrected_part_numbers_are_surfaced_not_silently_substituted(monkeypatch):
+    part = get_snapshot().metadata[0]
+    typo = part["id"][:-2] + part["id"][-1] + part["id"][-2]  # last two digits swapped
+    monkeypatch.setattr(agent_module, "semantic_search", lambda q, top_k=5, snapshot=None, **kw: [part])
+
+    def ask(message):
+        return asyncio.run(AgentController().handle_chat(message, session_id=None))
+
+    # A compatibility verdict would be about another part: ask instead.
+    model = part["compatible_models"][0]
+    response = ask(f"is {typo} compatible with {model}?")
+    assert response["intent"] == "part_number_unconfirmed"
+    assert response["entities"]["did_you_mean"] == part["id"]
+    assert f"Did you mean {part['id']}?" in response["answer"] and response["tool_output"] == []
+
+    response = ask(f"how do I install {typo}?")
+    assert response["intent"] == "installation" and response["entities"]["part_number_corrected"]
+    assert response["answer"].startswith("I could not find that part number")
+
+    exact = ask(f"how do I install {part['id']}?")
+    assert "part_number_corrected" not in exact["entities"]
+    assert not exact["answer"].startswith("I could not find")
@@ -0,0 +1,115 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from data.catalog_registry import RegistryBuilder, build_registry
+from data.data_generator import generate, write_catalog
+from data.ingest import MetadataWriter, ingest, iter_json_array, iter_records
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+# Size of the peak-RSS build. Small by default so the suite stays quick; set
+# INGEST_TEST_PARTS=1000000 to check the memory budget at catalog scale.
+RSS_TEST_PARTS = int(os.getenv("INGEST_TEST_PARTS", "20000"))
+
+
+def test_incremental_array_parse_matches_json_load(tmp_path):
+    path = tmp_path / "catalog.json"
+    write_catalog(generate(500, seed=5), path)
+    expected = json.loads(path.read_text())
+
+    # A tiny read size splits elements (and multi-byte characters) across reads.
+    with open(path, "rb") as f:
+        assert list(iter_json_array(f, read_size=7)) == expected
+    assert list(iter_records(path)) == expected
+
+    pretty = json.dumps([{"a": "é", "b": [1, 2]}, {"c": None}], indent=2).encode()
+    assert list(iter_json_array(io.BytesIO(pretty), read_size=3)) == json.loads(pretty)
+    assert list(iter_json_array(io.BytesIO(b" [ ] "))) == []
+
+
+def test_truncated_or_non_array_json_is_rejected():
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.BytesIO(b'[{"id": "PS1"}, {"id": ')))
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.BytesIO(b'{"id": "PS1"}')))
+
+
+def test_one_pass_feeds_registry_and_metadata_in_order(tmp_path):
+    catalog = tmp_path / "catalog.jsonl"
+    write_catalog(generate(1_000, seed=2), catalog)
+    meta = tmp_path / "meta.json"
+
+    builder, writer, batches = RegistryBuilder(), MetadataWriter(meta), []
+    count = ingest(catalog, [builder, writer, lambda b: batches.append(len(b))], batch_size=128)
+    writer.close()
+
+    records = list(iter_records(catalog))
+    assert count == 1_000 and max(batches) == 128 and sum(batches) == 1_000
+    assert json.loads(meta.read_bytes()) == records
+    assert not meta.with_name("meta.json.tmp").exists()
+    assert builder.build().part_numbers == build_registry(records).part_numbers
+
+
+_BUILD_SCRIPT = textwrap.dedent(
+    """
+    import resource, sys, zlib
+    import numpy as np
+    from data.catalog_registry import RegistryBuilder
+    from vectorstore.build_index import build
+
+    DIM = 16
+
+    def embed_batch(texts):
+        # Cheap deterministic stand-in for the sentence-transformer.
+        seeds = [zlib.crc32(t.encode()) for t in texts]
+        return np.stack([np.random.default_rng(s).random(DIM, dtype=np.float32) for s in seeds])
+
+    registry = RegistryBuilder()
+    count = build(*sys.argv[1:7], embed_batch=embed_batch, sinks=[registry])
+    # VmHWM is this process's own high-water mark; ru_maxrss would also
+    # count the (possibly large) pytest process it was forked from.
+    try:
+        with open("/proc/self/status") as f:
+            peak_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+    except OSError:
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(count, len(registry.part_numbers), peak_kb)
+    """
+)
+
+
+def test_streaming_build_peak_rss(tmp_path):
+    catalog = tmp_path / "catalog.jsonl"
+    write_catalog(generate(RSS_TEST_PARTS, seed=42, num_models=50_000, symptom_vocab=2_000), catalog)
+    out_index, out_meta = tmp_path / "index.faiss", tmp_path / "meta.json"
+
+    result = subprocess.run(
+        [
+            sys.executable, "-c", _BUILD_SCRIPT, str(catalog), str(out_index), str(out_meta),
+            str(tmp_path / "shards"), str(tmp_path / "symptoms.npz"), str(tmp_path / "duplicates.npz"),
+        ],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "TQDM_DISABLE": "1"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    count, unique_ids, peak_kb = map(int, result.stdout.split()[-3:])
+    catalog_mb = catalog.stat().st_size / 2**20
+    peak_mb = peak_kb / 1024
+
+    print(f"\n[INGEST] {count} parts, catalog {catalog_mb:.0f} MB, build peak RSS {peak_mb:.0f} MB")
+
+    assert count == unique_ids == RSS_TEST_PARTS
+    # A sharded build writes the shards and no flat index.
+    assert (tmp_path / "shards").is_dir() and out_meta.exists() and not out_index.exists()
+    # The vectors (16 floats per part, held once) and the registry id set
+    # grow with the catalog; the records themselves must not be held.
+    assert peak_mb < max(300, catalog_mb / 3)
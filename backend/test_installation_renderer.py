@@ -0,0 +1,84 @@
+import asyncio
+import os
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+from agents import agent as agent_module
+from agents.agent import AgentController
+from observability.metrics import installation_answers_total
+from utils.installation_renderer import render_installation
+
+PART = {
+    "id": "PS40308276",
+    "name": "Refrigerator Ice Maker Assembly",
+    "category": "Refrigerator",
+    "installation_metadata": {
+        "difficulty": "Medium",
+        "time_required": "30-60 minutes",
+        "tools_needed": ["Phillips screwdriver", "Nut driver"],
+    },
+    "installation_guide_markdown": (
+        "Unplug refrigerator → Remove ice bin → Disconnect harness → "
+        "unscrew ice maker → Swap in replacement → Test cycle."
+    ),
+}
+
+
+def test_renders_safety_metadata_and_numbered_steps():
+    answer = render_installation(PART)
+
+    assert answer.text.startswith("Safety first: unplug the refrigerator")
+    assert "Installing Refrigerator Ice Maker Assembly (PS40308276)." in answer.text
+    assert "Difficulty: Medium. Time: 30-60 minutes. Tools: Phillips screwdriver, Nut driver." in answer.text
+    assert "1. Unplug refrigerator.\n2. Remove ice bin." in answer.text
+    assert answer.steps == [
+        "Unplug refrigerator.",
+        "Remove ice bin.",
+        "Disconnect harness.",
+        "Unscrew ice maker.",
+        "Swap in replacement.",
+        "Test cycle.",
+    ]
+
+
+def test_dishwasher_safety_and_missing_metadata():
+    answer = render_installation({
+        "id": "PS1",
+        "category": "Dishwasher Latches",
+        "installation_guide_markdown": "Open door → Install new latch",
+    })
+
+    assert answer.text.startswith("Safety first: turn off power to the dishwasher")
+    assert "Installing Dishwasher Latches" not in answer.text
+    assert answer.steps == ["Open door.", "Install new latch."]
+
+
+def test_missing_guide_falls_back():
+    assert render_installation({"id": "PS1", "installation_guide_markdown": ""}) is None
+    assert render_installation({"id": "PS1", "installation_guide_markdown": " → "}) is None
+    assert render_installation({"id": "PS1"}) is None
+
+
+def _answers(path):
+    return installation_answers_total.labels(path)._value.get()
+
+
+def test_installation_turn_skips_the_llm(monkeypatch):
+    llm_calls = []
+
+    def fake_search(query, top_k=5, snapshot=None, **filters):
+        return [p for p in snapshot.metadata if p["id"] == query.upper()][:top_k]
+
+    monkeypatch.setattr(agent_module, "semantic_search", fake_search)
+    monkeypatch.setattr(agent_module, "deepseek_chat", lambda *a, **k: llm_calls.append(a) or "")
+    before = _answers("template")
+
+    response = asyncio.run(
+        AgentController().handle_chat("How do I install PS40308276?", session_id="fast-path")
+    )
+
+    assert llm_calls == []
+    assert _answers("template") - before == 1
+    assert response["intent"] == "installation"
+    assert response["tool_used"] == "FAISS + Template"
+    assert response["steps"][0] == "Unplug refrigerator."
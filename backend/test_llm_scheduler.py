@@ -0,0 +1,222 @@
+import asyncio
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+import pytest
+
+from agents import agent as agent_module
+from agents.agent import AgentController
+from models import llm, llm_scheduler
+from models.llm_scheduler import LLMDeadlineExceeded, LLMScheduler, LLMSchedulerConfig, request_client
+
+SERVICE_S = 0.02  # stub LLM latency
+
+
+def _stub_llm(service_s=SERVICE_S):
+    time.sleep(service_s)
+    return "ok"
+
+
+def _p99(samples):
+    return sorted(samples)[max(0, int(len(samples) * 0.99) - 1)]
+
+
+def _simulate(submit):
+    """
+    A bulk client floods 200 long recommendation prompts; meanwhile 10
+    interactive users each ask 5 short installation questions.
+    Returns the interactive latencies.
+    """
+    interactive = []
+    lock = threading.Lock()
+
+    def bulk(i):
+        submit(_stub_llm, "product_recommendation", 2000, "bulk-importer", f"bulk-{i}")
+
+    def user(u):
+        for _ in range(5):
+            start = time.perf_counter()
+            submit(_stub_llm, "installation", 100, f"user-{u}", f"session-{u}")
+            with lock:
+                interactive.append(time.perf_counter() - start)
+            time.sleep(SERVICE_S)
+
+    with ThreadPoolExecutor(max_workers=220) as pool:
+        flood = [pool.submit(bulk, i) for i in range(200)]
+        time.sleep(0.05)  # the flood is already queued when users arrive
+        users = [pool.submit(user, u) for u in range(10)]
+        for f in users + flood:
+            f.result()
+
+    return interactive
+
+
+def test_interactive_p99_stays_bounded_under_a_bulk_flood():
+    scheduler = LLMScheduler(LLMSchedulerConfig(max_concurrency=4))
+
+    def fair(fn, flow, cost, client, session):
+        return scheduler.submit(fn, flow=flow, cost=cost, client=client, session=session)
+
+    fifo_gate = threading.Semaphore(4)
+
+    def fifo(fn, flow, cost, client, session):
+        with fifo_gate:
+            return fn()
+
+    fair_latency = _simulate(fair)
+    fifo_latency = _simulate(fifo)
+
+    # With 4 slots an interactive call waits for about one call to finish
+    # (plus thread wake-ups); behind the FIFO flood it waits for most of
+    # 200 / 4 calls.
+    assert _p99(fair_latency) < 10 * SERVICE_S
+    assert _p99(fifo_latency) > 3 * _p99(fair_latency)
+    assert statistics.mean(fair_latency) < 4 * SERVICE_S
+    assert scheduler.running() == 0 and scheduler.waiting() == 0
+
+
+def test_clients_share_capacity_by_weight():
+    scheduler = LLMScheduler(
+        LLMSchedulerConfig(max_concurrency=1, client_weights={"heavy": 3.0})
+    )
+    order = []
+    gate = threading.Event()
+
+    def blocker():
+        gate.wait()
+
+    with ThreadPoolExecutor(max_workers=41) as pool:
+        pool.submit(scheduler.submit, blocker, "installation", 1, "x", "x")
+        time.sleep(0.02)
+        futures = [
+            pool.submit(scheduler.submit, lambda c=c: order.append(c), "installation", 1, c, c)
+            for c in ["heavy"] * 20 + ["light"] * 20
+        ]
+        time.sleep(0.05)
+        gate.set()
+        for f in futures:
+            f.result()
+
+    # While both are backlogged, "heavy" gets about three calls per "light" one.
+    first = order[:20]
+    assert 14 <= first.count("heavy") <= 16
+
+
+def test_earliest_deadline_first_within_a_session():
+    scheduler = LLMScheduler(LLMSchedulerConfig(max_concurrency=1))
+    order = []
+    gate = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        pool.submit(scheduler.submit, gate.wait, "installation", 1, "c", "s")
+        time.sleep(0.02)
+        later = pool.submit(scheduler.submit, lambda: order.append("installation"), "installation", 1, "c", "s")
+        time.sleep(0.02)
+        sooner = pool.submit(
+            scheduler.submit, lambda: order.append("intent_classification"), "intent_classification", 1, "c", "s"
+        )
+        time.sleep(0.02)
+        gate.set()
+        later.result(), sooner.result()
+
+    assert order == ["intent_classification", "installation"]
+
+
+def test_calls_waiting_past_their_deadline_are_abandoned(monkeypatch):
+    monkeypatch.setitem(llm_scheduler.FLOW_DEADLINE_S, "installation", 0.05)
+    scheduler = LLMScheduler(LLMSchedulerConfig(max_concurrency=1))
+    gate = threading.Event()
+    ran = []
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        holder = pool.submit(scheduler.submit, gate.wait, "product_recommendation", 1, "c", "s")
+        time.sleep(0.02)
+        waiting = pool.submit(scheduler.submit, lambda: ran.append(1), "installation", 1, "c", "s")
+        with pytest.raises(LLMDeadlineExceeded):
+            waiting.result(timeout=2)
+        gate.set()
+        holder.result()
+
+    assert ran == []
+    assert scheduler.running() == 0 and scheduler.waiting() == 0
+
+
+def test_virtual_time_never_moves_backwards():
+    scheduler = LLMScheduler(LLMSchedulerConfig(max_concurrency=1))
+    holder = scheduler._enqueue("product_recommendation", "h", "s", 1, None)
+    # A long high-priority call finishes far ahead in virtual time; the
+    # short low-priority one queued with it is served after it.
+    long = scheduler._enqueue("installation", "a", "s", 50, None)
+    short = scheduler._enqueue("product_recommendation", "b", "s", 1, None)
+
+    seen = []
+    for ticket, client in ((holder, "h"), (long, "a"), (short, "b")):
+        scheduler._finish(ticket, client, "s")
+        seen.append(scheduler._virtual_time)
+
+    assert short.granted and seen == sorted(seen)
+    assert seen[-1] == seen[1]
+
+
+def test_expired_calls_give_back_their_finish_tag():
+    scheduler = LLMScheduler(LLMSchedulerConfig(max_concurrency=1))
+    holder = scheduler._enqueue("product_recommendation", "h", "s", 1, None)
+    waiting = scheduler._enqueue("installation", "c", "s", 10, None)
+    expired = scheduler._enqueue("installation", "c", "s", 10, deadline=0.0)
+    queue = scheduler._queues[(0, "c", "s")]
+    waiting_tag, expired_tag = queue.tags
+
+    with pytest.raises(LLMDeadlineExceeded):
+        scheduler._wait_for_slot(expired)
+    scheduler._finish(expired, "c", "s")
+
+    # The next call takes the expired one's place instead of queueing behind it.
+    retry = scheduler._enqueue("installation", "c", "s", 10, None)
+    assert list(queue.tags) == [waiting_tag, expired_tag]
+    for ticket in (holder, waiting, retry):
+        scheduler._finish(ticket, ticket.key[1], "s")
+
+
+def test_priority_turn_overtakes_a_bulk_flood_through_handle_chat(monkeypatch):
+    # More bulk turns than asyncio's default executor has threads: flows must
+    # still reach the scheduler, which then serves the interactive turn first.
+    scheduler = LLMScheduler(LLMSchedulerConfig(max_concurrency=2))
+    served = []
+
+    class SlowLLM:
+        def answer(self, flow, system_prompt, user_prompt):
+            time.sleep(SERVICE_S)
+            served.append(flow)
+            return "Try these parts."
+
+    monkeypatch.setattr(llm, "scheduler", scheduler)
+    monkeypatch.setattr(llm, "stub", SlowLLM())
+    monkeypatch.setattr(agent_module, "semantic_search", lambda query, top_k=5, snapshot=None, **f: snapshot.metadata[:2])
+    controller = AgentController()
+
+    async def turn(client, message, session):
+        request_client.set(client)
+        await controller.handle_chat(message, session_id=session)
+
+    async def run():
+        flood = [
+            asyncio.create_task(turn("bulk-importer", f"whirlpool dishwasher rack part {i}", f"bulk-{i}"))
+            for i in range(60)
+        ]
+        for _ in range(100):  # let the flood queue up
+            if scheduler.waiting() >= 40:
+                break
+            await asyncio.sleep(0.01)
+        await turn("user", "I don't know my model, my whirlpool dishwasher is not draining", "user-1")
+        remaining = sum(not t.done() for t in flood)
+        await asyncio.gather(*flood)
+        return remaining
+
+    assert asyncio.run(run()) >= 30
+    assert served.count("brand_symptom_guidance") == 1
+    assert served.index("brand_symptom_guidance") < 10
@@ -0,0 +1,48 @@
+import os
+from types import SimpleNamespace
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+from models.llm import record_usage
+from observability.metrics import (
+    llm_tokens_total,
+    llm_estimated_cost_usd_total,
+    llm_latency_per_output_token_seconds,
+)
+
+
+def _tokens(flow, kind):
+    return llm_tokens_total.labels(flow, kind)._value.get()
+
+
+def test_deepseek_cache_fields_are_split_by_outcome():
+    usage = SimpleNamespace(
+        prompt_tokens=1000,
+        completion_tokens=200,
+        prompt_cache_hit_tokens=600,
+        prompt_cache_miss_tokens=400,
+    )
+    cost_before = llm_estimated_cost_usd_total.labels("t_installation")._value.get()
+
+    assert record_usage("t_installation", usage, latency_s=4.0) == "partial"
+
+    assert _tokens("t_installation", "prompt_cache_hit") == 600
+    assert _tokens("t_installation", "prompt_cache_miss") == 400
+    assert _tokens("t_installation", "completion") == 200
+    assert llm_estimated_cost_usd_total.labels("t_installation")._value.get() > cost_before
+
+    # 4s over 200 output tokens = 20ms/token.
+    assert llm_latency_per_output_token_seconds.labels("t_installation")._sum.get() == 0.02
+
+
+def test_openai_style_cached_tokens_and_missing_usage():
+    usage = SimpleNamespace(
+        prompt_tokens=300,
+        completion_tokens=50,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=0),
+    )
+    assert record_usage("t_rag", usage, latency_s=1.0) == "miss"
+    assert _tokens("t_rag", "prompt_cache_miss") == 300
+
+    assert record_usage("t_rag", SimpleNamespace(prompt_tokens=10, completion_tokens=5), 1.0) == "unknown"
+    assert record_usage("t_rag", None, 1.0) == "unknown"
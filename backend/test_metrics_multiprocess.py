@@ -0,0 +1,130 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+import httpx
+from prometheus_client import CollectorRegistry, multiprocess
+from prometheus_client.parser import text_string_to_metric_families
+
+from observability.multiprocess import reset_dir
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+_WORKER_SCRIPT = textwrap.dedent(
+    """
+    import sys
+    from observability.metrics import admission_inflight, deepseek_calls_total, request_latency_seconds
+    from observability.multiprocess import mark_worker_dead
+
+    calls, exits = int(sys.argv[1]), sys.argv[2] == "exit"
+    for _ in range(calls):
+        deepseek_calls_total.inc()
+        request_latency_seconds.observe(0.3)
+    admission_inflight.set(2)
+    if exits:
+        mark_worker_dead()
+    print("done", flush=True)
+    if not exits:
+        sys.stdin.read()  # stay alive until the test closes stdin
+    """
+)
+
+
+def _samples(text_or_registry):
+    if isinstance(text_or_registry, str):
+        families = text_string_to_metric_families(text_or_registry)
+    else:
+        families = text_or_registry.collect()
+    return {
+        (s.name, tuple(sorted(s.labels.items()))): s.value
+        for family in families for s in family.samples
+    }
+
+
+def test_counters_sum_over_workers_and_stopped_workers_leave_live_gauges(tmp_path):
+    directory = reset_dir(tmp_path / "metrics")
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(directory)}
+
+    def worker(calls, mode):
+        return subprocess.Popen(
+            [sys.executable, "-c", _WORKER_SCRIPT, str(calls), mode],
+            cwd=BACKEND_DIR, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+
+    workers = [worker(3, "stay"), worker(5, "stay"), worker(7, "exit"), worker(11, "stay")]
+    try:
+        for w in workers:
+            assert w.stdout.readline().strip() == "done"
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=str(directory))
+        samples = _samples(registry)
+    finally:
+        for w in workers:
+            w.stdin.close()
+            w.wait(timeout=30)
+
+    # Counters and histograms keep every worker's counts, stopped or not.
+    assert samples[("deepseek_calls_total", ())] == 26
+    assert samples[("request_latency_seconds_count", ())] == 26
+    assert samples[("request_latency_seconds_bucket", (("le", "0.5"),))] == 26
+    # livesum gauge: only the three running workers.
+    assert samples[("admission_inflight", ())] == 6
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_metrics_endpoint_aggregates_uvicorn_workers(tmp_path):
+    directory = tmp_path / "metrics"
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "observability.multiprocess", "--workers", "3", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR,
+        env={
+            **os.environ,
+            "PROMETHEUS_MULTIPROC_DIR": str(directory),
+            "DEEPSEEK_API_KEY": "test-key",
+            "TRACING_EXPORTER": "none",
+        },
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 120
+        while True:
+            try:
+                httpx.get(f"{base}/health", timeout=2)
+                break
+            except httpx.TransportError:
+                assert time.monotonic() < deadline, "server did not start"
+                assert server.poll() is None, "server exited"
+                time.sleep(0.5)
+
+        # Fresh connections, so the requests spread over the workers.
+        for _ in range(40):
+            assert httpx.get(f"{base}/health", timeout=5).status_code == 200
+
+        # Whichever worker answers, a scrape reports all of them.
+        for _ in range(3):
+            samples = _samples(httpx.get(f"{base}/metrics", timeout=5).text)
+            health = {k: v for k, v in samples.items() if k[0] == "http_requests_total" and ("handler", "/health") in k[1]}
+            assert sum(health.values()) == 41
+
+        pids = {p.name.split("_")[-1] for p in directory.glob("*.db")}
+        assert len(pids) >= 2
+    finally:
+        server.send_signal(signal.SIGINT)
+        server.wait(timeout=60)
+
+    # Workers marked themselves dead on shutdown: no live gauge files remain.
+    assert not list(directory.glob("gauge_live*.db"))
@@ -0,0 +1,94 @@
+import asyncio
+import itertools
+import os
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+import agents.agent as agent_module
+from agents.agent import AgentController
+from data.catalog_registry import build_registry
+from data.catalog_snapshot import get_snapshot
+from data.model_trie import ModelTrie
+
+
+def _trie():
+    models = ["WDT780SAEM1", "WDT780SAEM2", "WDT780PAEM1", "KDTM354ESS3"]
+    parts = {"PS1": [0, 1], "PS2": [1], "PS3": [2], "PS4": [3], "PS5": [0]}
+    ends = list(itertools.accumulate(len(ids) for ids in parts.values()))
+    return ModelTrie(models, list(parts), [i for ids in parts.values() for i in ids], ends)
+
+
+def test_family_resolves_partial_and_unlisted_revision_model_numbers():
+    trie = _trie()
+    assert trie.size == 4
+
+    exact = trie.family("wdt780saem1")
+    assert exact.exact and exact.models == ("WDT780SAEM1",)
+
+    # Base family, partial family and an unknown revision all resolve.
+    assert trie.family("WDT780SAEM").models == ("WDT780SAEM1", "WDT780SAEM2")
+    assert trie.family("WDT780").models == ("WDT780PAEM1", "WDT780SAEM1", "WDT780SAEM2")
+    unlisted = trie.family("WDT780SAEM7")
+    assert not unlisted.exact and unlisted.prefix == "WDT780SAEM"
+    assert trie.family("KDTM354DSS2").models == ("KDTM354ESS3",)
+
+    # Too short a shared prefix, or too much left over, is no family.
+    assert trie.family("WDT78") is None
+    assert trie.family("WDT780SAEMXXXXX") is None
+    assert trie.family("PS11752778") is None
+
+
+def test_family_parts_unions_the_members_parts():
+    trie = _trie()
+    assert trie.family_parts("WDT780SAEM1") == ["PS1", "PS5"]
+    assert sorted(trie.family_parts("WDT780SAEM")) == ["PS1", "PS2", "PS5"]
+    assert sorted(trie.family_parts("WDT780")) == ["PS1", "PS2", "PS3", "PS5"]
+    assert trie.family_parts("WDT7") == []
+
+
+def test_registry_builds_the_trie_from_compatible_models():
+    registry = build_registry([
+        {"id": "ps1", "compatible_models": ["lfss2612te"]},
+        {"id": "PS2", "compatible_models": ["LFSS2612TF", "WDT780SAEM1"]},
+    ])
+    assert registry.model_trie.family("LFSS2612T").models == ("LFSS2612TE", "LFSS2612TF")
+    assert sorted(registry.model_trie.family_parts("LFSS2612")) == ["PS1", "PS2"]
+
+
+def _ask(monkeypatch, message):
+    part = next(p for p in get_snapshot().metadata if "WDT780SAEM1" in p["compatible_models"])
+    monkeypatch.setattr(agent_module, "semantic_search", lambda q, top_k=5, snapshot=None, **kw: [part])
+    response = asyncio.run(AgentController().handle_chat(message.format(part=part["id"]), session_id=None))
+    return part, response
+
+
+def test_compatibility_reports_family_match_for_an_unverified_revision(monkeypatch):
+    part, response = _ask(monkeypatch, "Is part {part} compatible with my WDT780SAEM?")
+
+    assert response["intent"] == "compatibility_family"
+    assert response["entities"]["model_number"] == "WDT780SAEM"
+    assert response["entities"]["model_family"] == ["WDT780SAEM1"]
+    assert "WDT780SAEM model family" in response["answer"] and "not verified" in response["answer"]
+
+    _, exact = _ask(monkeypatch, "Is part {part} compatible with my WDT780SAEM1?")
+    assert exact["intent"] == "compatibility_yes"
+
+
+def test_one_edit_typos_inside_a_model_number_are_corrected_not_families():
+    registry = get_snapshot().registry
+    assert agent_module._extract_model("does it fit adb1500axw", registry) == "ADB1500AWW"
+    assert agent_module._extract_model("does it fit wdt780saem2", registry) == "WDT780SAEM1"
+    # Two edits off is an unlisted revision of the family.
+    assert agent_module._extract_model("does it fit wdt780saem22", registry) == "WDT780SAEM22"
+
+
+def test_rag_answers_list_the_family_parts_first(monkeypatch):
+    snapshot = get_snapshot()
+    listed = next(p for p in snapshot.metadata if "WDT780SAEM1" in p["compatible_models"])
+    other = next(p for p in snapshot.metadata if not any(m.startswith("WDT780SAEM") for m in p["compatible_models"]))
+    monkeypatch.setattr(agent_module, "semantic_search", lambda q, top_k=5, snapshot=None, **kw: [other, listed])
+    monkeypatch.setattr(agent_module, "deepseek_chat", lambda *args, **kwargs: "Try these parts.")
+
+    response = asyncio.run(AgentController().handle_chat("my WDT780SAEM dishwasher is leaking", session_id=None))
+    assert response["intent"] == "product_recommendation"
+    assert response["tool_output"] == [listed, other]
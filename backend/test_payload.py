@@ -0,0 +1,99 @@
+import asyncio
+import dataclasses
+import json
+import os
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+import httpx
+
+import agents.agent as agent_module
+from data import catalog_snapshot
+from data.catalog_snapshot import get_snapshot
+from utils.payload import CARD_FIELDS, card_view, encode_cards, encode_chat_response
+
+PART = get_snapshot().metadata[0]
+
+
+def _response(parts):
+    return {
+        "session_id": "s1",
+        "intent": "product_recommendation",
+        "entities": {"brand": "Whirlpool"},
+        "tool_used": "FAISS + DeepSeek",
+        "tool_output": parts,
+        "answer": "Try the ice maker.",
+    }
+
+
+def test_full_view_matches_plain_json_with_response_defaults():
+    body = json.loads(encode_chat_response(_response([PART])))
+    assert body == {**_response([PART]), "steps": [], "degraded": False}
+
+
+def test_card_view_uses_pre_encoded_cards_and_drops_heavy_fields():
+    parts = get_snapshot().metadata[:4]
+    cards = encode_cards(parts)
+    sentinel = {parts[0]["id"]: b'{"id":"from-cache"}'}
+
+    body = json.loads(encode_chat_response(_response(parts), view="card", cards={**cards, **sentinel}))
+
+    assert body["tool_output"][0] == {"id": "from-cache"}
+    assert body["tool_output"][1:] == [card_view(p) for p in parts[1:]]
+    for card in body["tool_output"][1:]:
+        assert set(card) <= set(CARD_FIELDS) | {"installation_metadata"}
+        assert "description" not in card and "compatible_models" not in card
+    assert body["answer"] == "Try the ice maker." and body["steps"] == []
+
+    full = encode_chat_response(_response(parts))
+    slim = encode_chat_response(_response(parts), view="card", cards=cards)
+    assert len(slim) < len(full) / 2
+
+
+def test_card_without_cache_entry_is_encoded_on_the_spot():
+    body = json.loads(encode_chat_response(_response([PART]), view="card", cards={}))
+    assert body["tool_output"] == [card_view(PART)]
+    assert body["tool_output"][0]["installation_metadata"] == {
+        "difficulty": PART["installation_metadata"]["difficulty"]
+    }
+
+
+def test_fields_projection_and_non_list_tool_output():
+    body = json.loads(encode_chat_response(_response([PART]), fields=["id", "price", "missing"]))
+    assert body["tool_output"] == [{"id": PART["id"], "price": PART["price"]}]
+
+    body = json.loads(encode_chat_response(_response(None), view="card"))
+    assert body["tool_output"] is None
+
+
+def test_snapshot_precomputes_cards():
+    snapshot = get_snapshot()
+    assert set(snapshot.cards) == {p["id"] for p in snapshot.metadata}
+    assert json.loads(snapshot.cards[PART["id"]]) == card_view(PART)
+
+
+def test_cards_come_from_the_snapshot_the_turn_was_answered_from(monkeypatch):
+    import app as app_module
+
+    answered_from = get_snapshot()
+    parts = answered_from.metadata[:2]
+    reloaded = dataclasses.replace(answered_from, version="reloaded", cards={p["id"]: b'{"reloaded":true}' for p in parts})
+
+    def llm(*args, **kwargs):
+        # A reload lands after the parts were retrieved, before encoding.
+        monkeypatch.setattr(catalog_snapshot, "_current", reloaded)
+        return "Try these parts."
+
+    monkeypatch.setattr(agent_module, "semantic_search", lambda query, top_k=5, snapshot=None, **f: parts)
+    monkeypatch.setattr(agent_module, "deepseek_chat", llm)
+    monkeypatch.setattr(app_module, "traffic_recorder", None)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/chat", json={"message": "my whirlpool dishwasher is leaking water", "view": "card"})
+
+    response = asyncio.run(run())
+    assert get_snapshot() is reloaded
+    assert response.json()["tool_output"] == [card_view(p) for p in parts]
+    assert "_cards" not in response.json()
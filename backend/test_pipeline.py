@@ -0,0 +1,156 @@
+import asyncio
+import os
+import time
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+import agents.agent as agent_module
+import agents.router as router_module
+from agents import pipeline
+from agents.agent import AgentController
+from agents.pipeline import Stage, StageGraph, StageTimeout
+from data.catalog_snapshot import get_snapshot
+from observability.metrics import pipeline_stage_failures_total
+from tools import troubleshoot
+
+
+def _sleep(seconds, value=None):
+    def fn(results):
+        time.sleep(seconds)
+        return value
+    return fn
+
+
+def _run(graph, inputs=None, **kwargs):
+    return asyncio.run(graph.run(inputs, **kwargs))
+
+
+def test_independent_stages_overlap_and_dependents_see_their_results():
+    graph = StageGraph("test", [
+        Stage("a", _sleep(0.1, 1)),
+        Stage("b", _sleep(0.1, 2)),
+        Stage("sum", lambda r: r["a"] + r["b"] + r["base"], deps=("a", "b")),
+    ])
+
+    started = time.perf_counter()
+    results = _run(graph, {"base": 10})
+    concurrent = time.perf_counter() - started
+
+    started = time.perf_counter()
+    assert _run(graph, {"base": 10}, concurrent=False)["sum"] == results["sum"] == 13
+    sequential = time.perf_counter() - started
+
+    assert concurrent < 0.17 < sequential
+
+
+def test_graph_rejects_unknown_dependencies_and_cycles():
+    with pytest.raises(ValueError):
+        StageGraph("bad", [Stage("a", _sleep(0), deps=("missing",))])
+    with pytest.raises(ValueError):
+        StageGraph("bad", [Stage("a", _sleep(0), deps=("b",)), Stage("b", _sleep(0), deps=("a",))])
+
+
+def test_stage_timeouts_fail_required_stages_and_default_optional_ones():
+    timeouts = pipeline_stage_failures_total.labels("timeouts", "slow", "timeout")
+    before = timeouts._value.get()
+
+    optional = StageGraph("timeouts", [
+        Stage("slow", _sleep(0.3, "late"), timeout_s=0.05, optional=True, default="fallback"),
+    ])
+    async def timed():
+        # Timed inside the loop: asyncio.run itself waits for the abandoned thread.
+        started = time.perf_counter()
+        results = await optional.run()
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(timed())
+    assert results["slow"] == "fallback" and elapsed < 0.2
+
+    required = StageGraph("timeouts", [Stage("slow", _sleep(0.3), timeout_s=0.05)])
+    with pytest.raises(StageTimeout):
+        _run(required)
+    assert timeouts._value.get() == before + 2
+
+
+def test_each_stage_gets_a_span_under_the_pipeline_span(monkeypatch):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(pipeline, "tracer", provider.get_tracer("test"))
+
+    async def on_loop(results):
+        return "loop"
+
+    _run(StageGraph("traced", [
+        Stage("thread", _sleep(0.01)),
+        Stage("loop", on_loop, deps=("thread",)),
+    ]))
+
+    spans = {s.name: s for s in exporter.get_finished_spans()}
+    root = spans["pipeline.traced"]
+    assert {"stage.thread", "stage.loop"} <= spans.keys()
+    assert spans["stage.thread"].parent.span_id == root.context.span_id
+    assert spans["stage.loop"].parent.span_id == root.context.span_id
+
+
+def _sleep_intent(seconds, intent):
+    def classify(query):
+        time.sleep(seconds)
+        return intent
+    return classify
+
+
+def test_tool_router_overlaps_classification_with_retrieval(monkeypatch):
+    search_calls = []
+    hits = [{"part": {"part_number": "PS1", "name": "Ice maker"}, "score": 0.9}]
+
+    def slow_search(query, top_k=5, **kwargs):
+        search_calls.append(query)
+        time.sleep(0.1)
+        return hits
+
+    monkeypatch.setattr(router_module, "classify_intent", _sleep_intent(0.1, "troubleshooting"))
+    monkeypatch.setattr(router_module, "search_hits", slow_search)
+    monkeypatch.setattr(troubleshoot, "search_hits", slow_search)
+    monkeypatch.setattr(troubleshoot, "_load_parts", lambda: [
+        {"part_number": "PS1", "name": "Ice maker", "symptoms": ["ice maker not working"]},
+    ])
+
+    started = time.perf_counter()
+    result = asyncio.run(router_module.ToolRouter().handle("My ice maker not working"))
+    elapsed = time.perf_counter() - started
+
+    assert result["intent"] == "troubleshooting" and result["tool"] == "troubleshooting"
+    matches = result["output"]["matches"]
+    assert matches["symptom_matches"][0]["part_number"] == "PS1"
+    assert matches["semantic_matches"][0]["score"] == 0.9
+    # One speculative search, reused by the tool.
+    assert search_calls == ["My ice maker not working"]
+    assert elapsed < 0.17
+
+
+def test_rag_turn_reuses_the_speculative_search(monkeypatch):
+    parts = get_snapshot().metadata[:2]
+    searches = []
+
+    def fake_search(query, top_k=5, snapshot=None, **filters):
+        searches.append((query, filters))
+        return parts
+
+    monkeypatch.setattr(agent_module, "semantic_search", fake_search)
+    monkeypatch.setattr(agent_module, "deepseek_chat", lambda *a, **k: "Try the water inlet valve.")
+
+    response = asyncio.run(
+        AgentController().handle_chat("My refrigerator ice maker is leaking", session_id="speculative")
+    )
+
+    assert response["intent"] == "product_recommendation"
+    assert response["tool_output"] == parts
+    assert len(searches) == 1
+    assert searches[0][0] == "My refrigerator ice maker is leaking"
+    assert searches[0][1]["appliance"] == "refrigerator"
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from data import catalog_registry, catalog_snapshot, registry_snapshot
+from data.catalog_registry import build_registry, compile_registry, read_saved_registry
+
+CATALOG = [
+    {"id": "PS1", "brand": "Whirlpool", "compatible_models": ["WDT780SAEM1", "WDT780SAEM2"], "symptoms_vector": ["Leaking"]},
+    {"id": "PS2", "brand": "GE", "compatible_models": ["WDT780PAEM1"], "symptoms_vector": ["Noisy", "leaking"]},
+    {"id": "ps3", "brand": "KitchenAid", "compatible_models": ["KDTM354ESS3", "WDT780SAEM1"]},
+]
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps(CATALOG))
+    return path
+
+
+def test_compiled_registry_matches_the_parsed_one(catalog, tmp_path):
+    out = tmp_path / "registry.bin"
+    built = compile_registry(catalog, out)
+    loaded = read_saved_registry(out, catalog_registry.hash_file(catalog).hexdigest())
+
+    for kind in ("brands", "part_numbers", "models", "symptoms"):
+        assert getattr(loaded, kind) == getattr(built, kind)
+    assert loaded.model_index.lookup("WDT780SAEM") == built.model_index.lookup("WDT780SAEM")
+    assert loaded.part_index.lookup("PS4") == built.part_index.lookup("PS4")
+    assert loaded.model_trie.family("WDT780SAEM7") == built.model_trie.family("WDT780SAEM7")
+    assert loaded.model_trie.family_parts("WDT780SAEM1") == ["PS1", "PS3"]
+    assert sorted(loaded.model_trie.family_parts("WDT780")) == ["PS1", "PS2", "PS3"]
+    # Lookup arrays are mapped from the file, not copied.
+    assert not loaded.model_index._keys.flags.writeable
+
+
+def test_stale_or_unreadable_snapshots_are_ignored(catalog, tmp_path, monkeypatch):
+    out = tmp_path / "registry.bin"
+    compile_registry(catalog, out)
+    sha = catalog_registry.hash_file(catalog).hexdigest()
+
+    assert read_saved_registry(out, "0" * 64) is None
+    assert read_saved_registry(tmp_path / "missing.bin", sha) is None
+    monkeypatch.setattr(registry_snapshot, "FORMAT_VERSION", registry_snapshot.FORMAT_VERSION + 1)
+    assert read_saved_registry(out, sha) is None
+    monkeypatch.undo()
+
+    out.write_bytes(out.read_bytes()[:100])
+    assert read_saved_registry(out, sha) is None
+    with pytest.raises(ValueError):
+        registry_snapshot.pack_strings(["two\nlines"])
+    assert registry_snapshot.unpack_strings(registry_snapshot.pack_strings(["", "a"])) == ["", "a"]
+
+
+def test_snapshot_load_skips_parsing_while_the_catalog_is_unchanged(catalog, tmp_path, monkeypatch):
+    out = tmp_path / "registry.bin"
+    compile_registry(catalog, out)
+    paths = [tmp_path / name for name in ("index.faiss", "meta.json", "shards", "symptoms.npz", "duplicates.npz")]
+
+    def parse(records):
+        parsed.append(1)
+        return build_registry(records)
+
+    parsed = []
+    monkeypatch.setattr(catalog_registry, "build_registry", parse)
+    first = catalog_snapshot.load_snapshot(catalog, *paths, registry_path=out)
+    assert not parsed and first.registry.models == {"WDT780SAEM1", "WDT780SAEM2", "WDT780PAEM1", "KDTM354ESS3"}
+
+    # An edited catalog no longer matches the compiled registry.
+    catalog.write_text(json.dumps(CATALOG[:1]))
+    second = catalog_snapshot.load_snapshot(catalog, *paths, registry_path=out)
+    assert parsed and second.registry.part_numbers == {"PS1"}
+    assert second.version != first.version
+
+
+def test_load_catalog_registry_replaces_the_known_sets(catalog, tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog_registry, "CATALOG_PATH", catalog)
+    monkeypatch.setattr(catalog_registry, "REGISTRY_PATH", tmp_path / "registry.bin")
+    catalog_registry.KNOWN_MODELS.add("STALE1")
+
+    registry = catalog_registry.load_catalog_registry()
+    assert catalog_registry.KNOWN_MODELS == set(registry.models)
+    assert catalog_registry.KNOWN_PART_NUMBERS == {"PS1", "PS2", "PS3"}
+    assert catalog_registry.KNOWN_SYMPTOMS == {"leaking", "noisy"}
@@ -0,0 +1,103 @@
+import random
+import re
+
+from utils.response_formatter import StreamingFormatter, clean_llm_text, format_llm_answer
+
+
+def legacy_clean_llm_text(text: str) -> str:
+    """The original six-pass implementation, kept as the parity reference."""
+    if not text:
+        return ""
+
+    text = re.sub(r"\*\*(.*?)\*\*", r"\1", text)
+    text = re.sub(r"\*(.*?)\*", r"\1", text)
+    text = re.sub(r"^#+\s*", "", text, flags=re.MULTILINE)
+    text = re.sub(r"---+", "", text)
+    text = re.sub(r"^\s*[-•]\s*", "", text, flags=re.MULTILINE)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+CORPUS = [
+    "",
+    "Plain answer with no formatting at all.",
+    (
+        "**Safety warning:** Unplug the refrigerator and shut off the water supply.\n\n"
+        "### Installation Steps\n\n"
+        "1. **Unplug refrigerator** and remove the ice bin.\n"
+        "2. Disconnect the wiring harness.\n"
+        "3. Unscrew the ice maker (Phillips screwdriver).\n"
+        "4. Swap in the replacement and test a cycle.\n\n"
+        "---\n\n"
+        "- Difficulty: Medium\n"
+        "- Time required: 30-60 minutes\n\n\n\n"
+        "If it still fails, *inspect the water inlet valve*."
+    ),
+    (
+        "## Recommended Parts\n\n"
+        "• Dishwasher Drain Pump (PS11752778) – $54.20\n"
+        "• Door Latch Assembly – $32.10\n\n"
+        "Based on your symptoms, the **drain pump** is the most likely cause."
+    ),
+    "# \n\n   \nTitle after blank header\n#\n- item straight after header",
+    "  - indented bullet\n\t• tab bullet\n-\n\nbullet with nothing after it",
+    "Line one\n\n\n\n\nLine two after many blanks\r\n\r\nCRLF line",
+    "Nested ***bold italic*** and **unclosed bold and *half italic",
+    "Price range 10-20 --- not a rule---but removed anyway ----",
+    "\n\n   Leading and trailing whitespace   \n\n\n",
+    "Steps:\n1) Remove the rack\n2) Unscrew the pump\n3) Install the new pump",
+]
+
+
+def _chunked(text: str, rnd: random.Random) -> str:
+    formatter = StreamingFormatter()
+    out, pos = [], 0
+    while pos < len(text):
+        size = rnd.randint(1, 12)
+        out.append(formatter.feed(text[pos:pos + size]))
+        pos += size
+    out.append(formatter.finish())
+    return "".join(out)
+
+
+def test_corpus_parity():
+    for text in CORPUS:
+        assert clean_llm_text(text) == legacy_clean_llm_text(text), repr(text)
+
+
+def test_streaming_parity():
+    rnd = random.Random(7)
+    for text in CORPUS:
+        for _ in range(20):
+            assert _chunked(text, rnd) == legacy_clean_llm_text(text), repr(text)
+
+
+def test_randomized_markup_parity():
+    tokens = ["*", "**", "#", "##", "-", "--", "---", "•", " ", "\t", "\n", "\n\n", "\r", "a", "1. ", "x y"]
+    rnd = random.Random(1)
+    for _ in range(20000):
+        text = "".join(rnd.choice(tokens) for _ in range(rnd.randint(0, 16)))
+        expected = legacy_clean_llm_text(text)
+        assert clean_llm_text(text) == expected, repr(text)
+        assert _chunked(text, rnd) == expected, repr(text)
+
+
+def test_numbered_steps_are_extracted():
+    answer = format_llm_answer(CORPUS[2])
+    assert answer.steps == [
+        "Unplug refrigerator and remove the ice bin.",
+        "Disconnect the wiring harness.",
+        "Unscrew the ice maker (Phillips screwdriver).",
+        "Swap in the replacement and test a cycle.",
+    ]
+    assert format_llm_answer(CORPUS[-1]).steps == [
+        "Remove the rack", "Unscrew the pump", "Install the new pump",
+    ]
+
+
+def test_streaming_result_matches_one_shot():
+    formatter = StreamingFormatter()
+    for line in CORPUS[2].splitlines(keepends=True):
+        formatter.feed(line)
+    formatter.finish()
+    assert formatter.result() == format_llm_answer(CORPUS[2])
@@ -0,0 +1,91 @@
+import asyncio
+import os
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+import numpy as np
+import pytest
+
+import agents.agent as agent_module
+from agents.agent import AgentController
+from data.catalog_snapshot import get_snapshot
+from tools.search_part import search_part
+from vectorstore import search as search_module
+from vectorstore.search import RetrievalConfig, adaptive_cutoff, search_hits
+
+
+def _hits(*scores):
+    return [{"part": {"id": f"P{i}"}, "score": s} for i, s in enumerate(scores)]
+
+
+def test_adaptive_cutoff_keeps_close_runners_up_only():
+    config = RetrievalConfig(min_score=0.3, relative_gap=0.15)
+
+    # A clear match comes back alone.
+    assert [h["score"] for h in adaptive_cutoff(_hits(0.82, 0.55, 0.5), config)] == [0.82]
+    # An ambiguous query keeps the hits within 15% of the best.
+    assert [h["score"] for h in adaptive_cutoff(_hits(0.6, 0.56, 0.52, 0.4), config)] == [0.6, 0.56, 0.52]
+    # Weak hits never pass the minimum score; nothing relevant means nothing.
+    assert [h["score"] for h in adaptive_cutoff(_hits(0.33, 0.31, 0.29), config)] == [0.33, 0.31]
+    assert adaptive_cutoff(_hits(0.25, 0.2), config) == []
+    assert adaptive_cutoff([], config) == []
+
+
+def _stored_vector(snapshot, row):
+    return snapshot.index.reconstruct(row).reshape(1, -1)
+
+
+def _unrelated_vector(snapshot):
+    # Orthogonal to the whole catalog (cosine 0 with every part).
+    vectors = snapshot.index.reconstruct_n(0, snapshot.index.ntotal)
+    rng = np.random.default_rng(0)
+    q = rng.standard_normal(vectors.shape[1]).astype("float32")
+    basis, _ = np.linalg.qr(vectors.T)
+    q -= basis @ (basis.T @ q)
+    return (q / np.linalg.norm(q)).reshape(1, -1)
+
+
+@pytest.fixture
+def snapshot():
+    snapshot = get_snapshot()
+    if snapshot.index is None:
+        pytest.skip("needs vectorstore/index.faiss (INDEX_SHARDS=0 python -m vectorstore.build_index)")
+    return snapshot
+
+
+def test_search_hits_carry_cosine_scores(monkeypatch, snapshot):
+    monkeypatch.setattr(search_module, "_embed_query", lambda text: _stored_vector(snapshot, 7))
+
+    full = search_hits("query", top_k=5, snapshot=snapshot, adaptive=False)
+    assert len(full) == 5
+    assert full[0]["part"] is snapshot.metadata[7] and full[0]["score"] == pytest.approx(1.0, abs=1e-3)
+    assert all(0 <= h["score"] <= 1 for h in full)
+    assert [h["score"] for h in full] == sorted((h["score"] for h in full), reverse=True)
+
+    adaptive = search_hits("query", top_k=5, snapshot=snapshot)
+    assert adaptive == [h for h in full if h["score"] >= 0.85]
+
+    monkeypatch.setattr(search_module, "_embed_query", lambda text: _unrelated_vector(snapshot))
+    assert search_hits("query", snapshot=snapshot) == []
+
+
+def test_search_part_reports_hit_scores(snapshot):
+    hits = [{"part": snapshot.metadata[0], "score": 0.71}, {"part": snapshot.metadata[1], "score": 0.64}]
+    result = search_part("ice maker", hits=hits)
+
+    assert result["mode"] == "semantic"
+    assert [m["score"] for m in result["matches"]] == [0.71, 0.64]
+    assert result["matches"][0]["part_number"] == snapshot.metadata[0]["part_number"]
+
+
+def test_rag_turn_without_a_relevant_part_skips_the_llm(monkeypatch, snapshot):
+    llm_calls = []
+    monkeypatch.setattr(search_module, "_embed_query", lambda text: _unrelated_vector(snapshot))
+    monkeypatch.setattr(agent_module, "deepseek_chat", lambda *a, **k: llm_calls.append(a) or "answer")
+
+    response = asyncio.run(
+        AgentController().handle_chat("my refrigerator makes a strange humming noise", session_id="gate")
+    )
+
+    assert response["intent"] == "generic_guidance"
+    assert response["tool_output"] == [] and llm_calls == []
@@ -0,0 +1,139 @@
+import asyncio
+import os
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+import pytest
+
+from agents import agent as agent_module
+from agents.agent import AgentController
+from data.catalog_snapshot import get_snapshot
+from memory.session_store import get_session
+from observability.metrics import retrieval_reuse_total
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    calls = []
+
+    def fake_search(query, top_k=5, snapshot=None, **filters):
+        calls.append(query)
+        return snapshot.metadata[:2]
+
+    monkeypatch.setattr(agent_module, "semantic_search", fake_search)
+    monkeypatch.setattr(agent_module, "deepseek_chat", lambda *args, **kwargs: "Try these parts.")
+    return calls
+
+
+def _outcomes():
+    return {o: retrieval_reuse_total.labels(o)._value.get() for o in ("reused", "resolved", "searched")}
+
+
+def _chat(controller, query, session_id):
+    return asyncio.run(controller.handle_chat(query, session_id=session_id))
+
+
+def test_follow_ups_reuse_the_last_turns_parts(searches):
+    controller = AgentController()
+    first, second = get_snapshot().metadata[:2]
+    before = _outcomes()
+
+    answer = _chat(controller, "my whirlpool dishwasher is leaking", "reuse-1")
+    assert answer["tool_output"] == [first, second]
+    assert get_session("reuse-1")["retrieval"].parts == (first, second)
+    searched = len(searches)
+
+    # Same entities, pointing back: the stored parts, no new search.
+    answer = _chat(controller, "which of these is cheapest for my dishwasher?", "reuse-1")
+    assert answer["intent"] == "product_recommendation"
+    assert answer["tool_output"] == [first, second]
+
+    # "it" is the best part from the last answer.
+    answer = _chat(controller, "how do I install it in my dishwasher?", "reuse-1")
+    assert answer["intent"] == "installation"
+    assert answer["tool_output"] == [first]
+
+    model = first["compatible_models"][0]
+    answer = _chat(controller, f"is it compatible with {model}?", "reuse-1")
+    assert answer["intent"] == "compatibility_yes"
+    assert answer["entities"]["part_number"] == first["part_number"]
+    assert len(searches) == searched
+
+    after = _outcomes()
+    assert after["reused"] - before["reused"] == 1
+    assert after["resolved"] - before["resolved"] == 2
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "what is the weather like in this city?",
+        "what's the capital of france? tell me about it",
+        "I also need a new door gasket, what do you recommend for that?",
+        "tell me more about those",
+        # Pointing back does not cover an appliance we do not support.
+        "which of these fits my washer?",
+    ],
+)
+def test_loose_or_off_topic_references_stay_out_of_scope(searches, query):
+    controller = AgentController()
+    _chat(controller, "my whirlpool dishwasher is leaking", "reuse-scope")
+
+    answer = _chat(controller, query, "reuse-scope")
+    assert answer["intent"] == "out_of_scope"
+    assert answer["tool_output"] == []
+
+
+def test_bare_follow_ups_are_in_scope_when_there_are_parts_to_point_at(searches):
+    controller = AgentController()
+    first, second = get_snapshot().metadata[:2]
+    _chat(controller, "my whirlpool dishwasher is leaking", "reuse-bare")
+    searched = len(searches)
+
+    answer = _chat(controller, "which of these is cheapest?", "reuse-bare")
+    assert answer["intent"] == "product_recommendation"
+    assert answer["tool_output"] == [first, second]
+
+    answer = _chat(controller, "how do I install it?", "reuse-bare")
+    assert answer["intent"] == "installation"
+    assert answer["tool_output"] == [first]
+    assert len(searches) == searched
+
+    # Without parts to point at, the same message is out of scope.
+    answer = _chat(controller, "how do I install it?", "reuse-bare-new")
+    assert answer["intent"] == "out_of_scope"
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        # A demonstrative before a noun is not a pronoun.
+        "how do I replace the spray arm on this dishwasher?",
+        # Another kind of part than the last answer's.
+        "I also need a new door gasket for my dishwasher, can I install it myself?",
+        # A symptom other than the one the parts were found for.
+        "which of these fixes a drain error?",
+        "is that why my dishwasher shows a drain error?",
+    ],
+)
+def test_new_questions_search_again(searches, query):
+    controller = AgentController()
+    _chat(controller, "my whirlpool dishwasher is leaking", "reuse-new")
+    before = _outcomes()
+
+    searched = len(searches)
+    answer = _chat(controller, query, "reuse-new")
+    assert answer["intent"] != "installation"
+    assert len(searches) > searched
+    assert _outcomes()["searched"] - before["searched"] == 1
+
+
+def test_other_sessions_have_nothing_to_point_back_at(searches):
+    controller = AgentController()
+    _chat(controller, "my whirlpool dishwasher is leaking", "reuse-2")
+
+    searched = len(searches)
+    answer = _chat(controller, "how do I install it in my dishwasher?", "reuse-3")
+    assert answer["intent"] != "installation"
+    _chat(controller, "which of these fits my dishwasher?", "reuse-3")
+    assert len(searches) > searched
@@ -0,0 +1,90 @@
+import json
+
+import faiss
+import numpy as np
+import pytest
+
+from data import catalog_snapshot
+from vectorstore.shards import ShardBuilder, load_shards, shard_appliance
+
+DIM = 8
+
+CATEGORIES = ["Dishwasher Pumps", "Refrigerator Ice Makers", "Dishwasher", "Refrigerator Door Shelves", "Dryer"]
+BRANDS = ["Whirlpool", "GE", "Frigidaire", "KitchenAid"]
+
+
+def _catalog(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    items = [
+        {"id": f"PS{i}", "category": CATEGORIES[i % len(CATEGORIES)], "brand": BRANDS[(i // 5) % len(BRANDS)]}
+        for i in range(n)
+    ]
+    return items, rng.random((n, DIM), dtype=np.float32)
+
+
+def _build(directory, items, vectors, batch=64):
+    builder = ShardBuilder()
+    for start in range(0, len(items), batch):
+        builder.add(items[start:start + batch], vectors[start:start + batch], first_row=start)
+    return builder.write(directory)
+
+
+@pytest.fixture(params=[0, 2], ids=["in_process", "worker_processes"])
+def sharded(request, tmp_path):
+    items, vectors = _catalog()
+    _build(tmp_path, items, vectors)
+    index = load_shards(tmp_path, workers=request.param)
+    yield index, items, vectors
+    index.close()
+
+
+def test_scatter_gather_matches_the_monolithic_index(sharded):
+    index, items, vectors = sharded
+    flat = faiss.IndexFlatL2(DIM)
+    flat.add(vectors)
+
+    assert index.ntotal == len(items)
+    for q in np.random.default_rng(1).random((20, 1, DIM), dtype=np.float32):
+        _, expected = flat.search(q, 5)
+        _, got = index.search(q, 5)
+        assert got.tolist() == expected.tolist()
+
+
+def test_known_appliance_and_brand_query_only_their_shards(sharded):
+    index, items, _ = sharded
+    q = np.random.default_rng(2).random((1, DIM), dtype=np.float32)
+
+    _, rows = index.search(q, 10, appliance="dishwasher")
+    assert {shard_appliance(items[r]["category"]) for r in rows[0]} == {"dishwasher"}
+
+    _, rows = index.search(q, 10, appliance="refrigerator", brand="GE")
+    assert all(items[r]["brand"] == "GE" and "Refrigerator" in items[r]["category"] for r in rows[0])
+
+    # A brand with no shard widens to the appliance rather than returning nothing.
+    _, rows = index.search(q, 10, appliance="refrigerator", brand="Bosch")
+    assert len(rows[0]) == 10
+    assert {shard_appliance(items[r]["category"]) for r in rows[0]} == {"refrigerator"}
+
+
+def test_rebuild_keeps_the_previous_build_and_prunes_older_ones(tmp_path):
+    items, vectors = _catalog(50)
+    builds = [_build(tmp_path, items, vectors) for _ in range(3)]
+
+    assert sorted(p.name for p in tmp_path.iterdir() if p.is_dir()) == sorted(builds[1:])
+    assert json.loads((tmp_path / "manifest.json").read_text())["build_id"] == builds[-1]
+
+
+def test_snapshot_serves_shards_instead_of_the_flat_index(tmp_path, monkeypatch):
+    items, vectors = _catalog(40)
+    (tmp_path / "catalog.json").write_text(json.dumps(items))
+    (tmp_path / "meta.json").write_text(json.dumps(items))
+    load = lambda: catalog_snapshot.load_snapshot(  # noqa: E731
+        tmp_path / "catalog.json", tmp_path / "index.faiss", tmp_path / "meta.json", tmp_path / "shards"
+    )
+
+    _build(tmp_path / "shards", items, vectors)
+    first = load()
+    assert first.index is None and first.shards.ntotal == 40 and len(first.metadata) == 40
+
+    _build(tmp_path / "shards", items, vectors)
+    assert load().version != first.version
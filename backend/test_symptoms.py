@@ -0,0 +1,90 @@
+import json
+import os
+import re
+import zlib
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+import numpy as np
+import pytest
+
+from data import catalog_snapshot
+from tools import troubleshoot
+from vectorstore import search as search_module
+from vectorstore.build_index import build
+from vectorstore.symptoms import SymptomIndex
+
+DIM = 64
+
+
+def _bag_of_words(texts):
+    # Deterministic stand-in for the sentence-transformer: shared words make
+    # texts similar, so "stopped working" is close to "not working".
+    matrix = np.zeros((len(texts), DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in re.findall(r"[a-z]+", text.lower()):
+            matrix[row, zlib.crc32(word.encode()) % DIM] += 1
+    return matrix
+
+
+def _part(pid, name, rating, symptoms, category="Refrigerator Ice Makers"):
+    return {
+        "id": pid, "part_number": pid, "name": name, "brand": "Whirlpool", "category": category,
+        "rating": rating, "symptoms_vector": symptoms, "troubleshooting_tips": f"Check the {name.lower()}.",
+    }
+
+
+CATALOG = [
+    _part("PS1", "Ice Maker Assembly", 4.2, ["ice maker not working", "no ice production"]),
+    _part("PS2", "Water Inlet Valve", 4.8, ["ice maker not working", "water dispenser not working"]),
+    _part("PS3", "Drain Pump", 4.5, ["dishwasher not draining", "standing water in tub"], category="Dishwasher"),
+    _part("PS4", "Door Gasket", 3.9, ["Door Not Sealing"]),
+]
+
+
+@pytest.fixture
+def built(tmp_path):
+    (tmp_path / "catalog.json").write_text(json.dumps(CATALOG))
+    paths = {name: tmp_path / name for name in ("index.faiss", "meta.json", "symptoms.npz", "duplicates.npz")}
+    build(
+        tmp_path / "catalog.json", paths["index.faiss"], paths["meta.json"], None, paths["symptoms.npz"],
+        paths["duplicates.npz"], embed_batch=_bag_of_words,
+    )
+    return tmp_path, paths
+
+
+def test_build_writes_the_symptom_vocabulary_with_rating_ordered_postings(built):
+    _, paths = built
+    index = SymptomIndex.load(paths["symptoms.npz"])
+
+    # Distinct, lowercased vocabulary; each symptom embedded once.
+    assert index.symptoms == sorted({s.lower() for p in CATALOG for s in p["symptoms_vector"]})
+    shared = index.symptoms.index("ice maker not working")
+    assert index.posting(shared).tolist() == [1, 0]  # PS2 (4.8) before PS1 (4.2)
+
+    matches = index.match(_bag_of_words(["my ice maker stopped working"]))
+    assert [m["row"] for m in matches[:2]] == [1, 0]
+    assert matches[0]["symptom"] == "ice maker not working" and 0.55 <= matches[0]["score"] <= 1
+    assert all(m["row"] != 2 for m in matches)
+
+    assert [m["row"] for m in index.match(_bag_of_words(["door not sealing"]), limit=1)] == [3]
+    assert index.match(_bag_of_words(["humming sound from the compressor"])) == []
+
+
+def test_troubleshoot_uses_the_symptom_index_instead_of_scanning(built, monkeypatch):
+    tmp_path, paths = built
+    snapshot = catalog_snapshot.load_snapshot(
+        tmp_path / "catalog.json", paths["index.faiss"], paths["meta.json"], tmp_path / "no-shards", paths["symptoms.npz"],
+    )
+    monkeypatch.setattr(catalog_snapshot, "_current", snapshot)
+    monkeypatch.setattr(search_module, "_embed_query", lambda text: _bag_of_words([text]))
+    monkeypatch.setattr(troubleshoot, "_load_parts", lambda: pytest.fail("parts.json scanned"))
+    monkeypatch.setattr(troubleshoot, "search_hits", lambda *a, **k: pytest.fail("semantic search run"))
+
+    result = troubleshoot.troubleshoot_issue("Dishwasher not draining after the cycle")
+
+    matches = result["matches"]["symptom_matches"]
+    assert matches[0]["part_number"] == "PS3"
+    assert matches[0]["matched_symptom"] == "dishwasher not draining"
+    assert matches[0]["troubleshooting_texts"] == ["Check the drain pump."]
+    assert result["matches"]["semantic_matches"] == []
@@ -0,0 +1,91 @@
+import time
+
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from observability.tracing import TracingConfig, build_tracer_provider
+
+
+def _provider(**overrides):
+    exporter = InMemorySpanExporter()
+    config = TracingConfig(exporter="otlp", **overrides)
+    return build_tracer_provider(config, exporter=exporter), exporter
+
+
+def _request(tracer, fail=False, sleep=0.0):
+    with tracer.start_as_current_span("agent.handle_chat") as root:
+        with tracer.start_as_current_span("vectorstore.semantic_search"):
+            time.sleep(sleep)
+        if fail:
+            root.record_exception(RuntimeError("deepseek timeout"))
+
+
+def test_exporter_can_be_switched_off():
+    assert build_tracer_provider(TracingConfig(exporter="none")) is None
+    assert build_tracer_provider(TracingConfig(head_sample_ratio=0)) is None
+
+
+def test_tail_sampling_keeps_errors_and_slow_traces_only():
+    provider, exporter = _provider(tail_sample_ratio=0.0, slow_threshold_ms=50)
+    tracer = provider.get_tracer("test")
+
+    for _ in range(20):
+        _request(tracer)
+    _request(tracer, fail=True)
+    _request(tracer, sleep=0.06)
+    provider.force_flush()
+
+    spans = exporter.get_finished_spans()
+    # Two kept traces, each with a root and a child span.
+    assert len(spans) == 4
+    assert len({s.context.trace_id for s in spans}) == 2
+
+
+def test_tail_sampling_ratio_applies_to_healthy_traces():
+    provider, exporter = _provider(tail_sample_ratio=0.25)
+    tracer = provider.get_tracer("test")
+
+    for _ in range(2000):
+        _request(tracer)
+    provider.force_flush()
+
+    kept = len({s.context.trace_id for s in exporter.get_finished_spans()})
+    assert 350 < kept < 650
+
+
+def test_head_and_tail_ratios_multiply():
+    # The tail decision must not reuse the trace-id bits the head sampler tested.
+    provider, exporter = _provider(head_sample_ratio=0.5, tail_sample_ratio=0.5)
+    tracer = provider.get_tracer("test")
+
+    for _ in range(4000):
+        _request(tracer)
+    provider.force_flush()
+
+    kept = len({s.context.trace_id for s in exporter.get_finished_spans()})
+    assert 800 < kept < 1200
+
+
+def test_long_attributes_are_truncated():
+    provider, exporter = _provider(max_attribute_length=16)
+    tracer = provider.get_tracer("test")
+
+    with tracer.start_as_current_span("router.installation") as span:
+        span.set_attribute("query", "x" * 500)
+    provider.force_flush()
+
+    assert exporter.get_finished_spans()[0].attributes["query"] == "x" * 16
+
+
+def test_attribute_count_is_capped_from_the_environment(monkeypatch):
+    monkeypatch.setenv("TRACING_MAX_ATTRIBUTES", "2")
+    config = TracingConfig.from_env()
+    provider, exporter = _provider(max_attributes=config.max_attributes)
+    tracer = provider.get_tracer("test")
+
+    with tracer.start_as_current_span("agent.handle_chat") as span:
+        for i in range(5):
+            span.set_attribute(f"a{i}", i)
+    provider.force_flush()
+
+    assert config.max_attributes == 2
+    assert len(exporter.get_finished_spans()[0].attributes) == 2
@@ -0,0 +1,159 @@
+import asyncio
+import os
+import threading
+from types import SimpleNamespace
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+os.environ.setdefault("TRACING_EXPORTER", "none")
+
+import httpx
+import pytest
+
+import agents.agent as agent_module
+import app as app_module
+from data.catalog_snapshot import get_snapshot
+from models import llm
+from models.circuit_breaker import CircuitBreaker
+from observability.replay import replay
+from observability.traffic import LLMStub, TrafficConfig, TrafficRecorder, anonymize_session, anonymize_text, read_log
+
+
+def test_anonymization_scrubs_contact_details_but_keeps_part_and_model_numbers():
+    text = "Call 555-867-5309 or mail jo.doe@example.com about PS11752778 for my WDT780SAEM1 at 12 Oak Street"
+    scrubbed = anonymize_text(text)
+
+    assert "555" not in scrubbed and "example.com" not in scrubbed and "Oak" not in scrubbed
+    assert "<phone>" in scrubbed and "<email>" in scrubbed and "<address>" in scrubbed
+    assert "PS11752778" in scrubbed and "WDT780SAEM1" in scrubbed
+
+    salt = b"salt"
+    assert anonymize_session("abc", salt) == anonymize_session("abc", salt) != anonymize_session("abd", salt)
+    assert anonymize_session("abc", salt) != "abc"
+
+
+def test_capture_requires_a_shared_salt(tmp_path):
+    with pytest.raises(RuntimeError, match="TRAFFIC_CAPTURE_SALT"):
+        TrafficRecorder(TrafficConfig(path=str(tmp_path / "traffic.jsonl")))
+
+
+def test_workers_appending_to_one_log_never_interleave(tmp_path):
+    log = tmp_path / "traffic.jsonl"
+    # One recorder per worker, each with its own fd and lock; lines well
+    # past the 8 KiB stdio buffer.
+    recorders = [TrafficRecorder(TrafficConfig(path=str(log), salt="shared")) for _ in range(4)]
+    calls = [{"f": "rag", "a": "x" * 2_000}] * 10
+
+    def write(recorder):
+        for _ in range(50):
+            recorder.record(calls, 0.0, "my dishwasher is leaking", "abc", "full", 200, 0.1)
+
+    threads = [threading.Thread(target=write, args=(r,)) for r in recorders]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for recorder in recorders:
+        recorder.close()
+
+    records = list(read_log(log))
+    assert len(records) == 200
+    assert len({r["s"] for r in records}) == 1
+
+
+def test_llm_stub_matches_by_prompt_then_by_replayed_request():
+    records = [{"id": "r1", "llm": [
+        {"f": "rag", "k": "0" * 16, "ms": 5.0, "a": "first"},
+        {"f": "rag", "k": "1" * 16, "ms": 5.0, "a": "second"},
+    ]}]
+    stub = LLMStub(records, replay_latency=False)
+
+    token = llm_replay_id("run1:r1")
+    try:
+        assert stub.answer("rag", "sys", "changed prompt") == "first"
+        assert stub.answer("rag", "sys", "changed again") == "second"
+        assert stub.answer("rag", "sys", "one too many") == LLMStub.FALLBACK
+    finally:
+        token()
+
+    token = llm_replay_id("run2:r1")  # a new replay run starts over
+    try:
+        assert stub.answer("rag", "sys", "changed prompt") == "first"
+    finally:
+        token()
+    assert stub.hits == {"prompt": 0, "request": 3, "fallback": 1}
+
+
+def llm_replay_id(value):
+    from observability.traffic import replay_id
+
+    token = replay_id.set(value)
+    return lambda: replay_id.reset(token)
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    parts = get_snapshot().metadata[:3]
+    llm_calls = []
+
+    def create(**kwargs):
+        llm_calls.append(kwargs)
+        return SimpleNamespace(
+            usage=None,
+            choices=[SimpleNamespace(message=SimpleNamespace(content=f"Try {parts[0]['name']} first."))],
+        )
+
+    monkeypatch.setattr(agent_module, "semantic_search", lambda q, top_k=5, snapshot=None, **kw: parts)
+    monkeypatch.setattr(llm, "client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+    monkeypatch.setattr(llm, "breaker", CircuitBreaker())
+    return llm_calls
+
+
+def _post_turns(turns):
+    async def run():
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            session_id = None
+            for message in turns:
+                body = (await client.post("/chat", json={"message": message, "session_id": session_id})).json()
+                session_id = body["session_id"]
+    asyncio.run(run())
+
+
+def _replay(records):
+    async def run():
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await replay(records, client, speed=0)
+    return asyncio.run(run())
+
+
+def test_capture_then_replay_with_stubbed_llm(tmp_path, monkeypatch, backend):
+    log = tmp_path / "traffic.jsonl"
+    recorder = TrafficRecorder(TrafficConfig(path=str(log), salt="test"))
+    monkeypatch.setattr(app_module, "traffic_recorder", recorder)
+
+    _post_turns([
+        "My refrigerator ice maker is leaking, reach me at jo@example.com",
+        "My dishwasher is not draining",
+    ])
+    recorder.close()
+
+    records = list(read_log(log))
+    assert len(records) == 2 and len(backend) == 2
+    assert records[0]["s"] == records[1]["s"] is not None
+    assert "<email>" in records[0]["m"] and "example.com" not in log.read_text()
+    assert all(r["st"] == 200 and len(r["llm"]) == 1 for r in records)
+
+    # Replay: the LLM is served from the log and DeepSeek is never called.
+    monkeypatch.setattr(app_module, "traffic_recorder", None)
+    monkeypatch.setattr(llm, "stub", LLMStub(records, replay_latency=False))
+    report = _replay(records)
+
+    assert len(backend) == 2
+    assert report.summary()["statuses"] == {200: 2}
+    assert report.compared == 2 and report.diffs == []
+    assert report.latency_ms()["max"] > 0
+
+    # A changed answer shows up as a diff.
+    records[1] = {**records[1], "answer": "Something else entirely."}
+    assert len(_replay(records).diffs) == 1
@@ -0,0 +1,85 @@
+import os
+
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+os.environ.setdefault("TRACING_EXPORTER", "none")
+
+import orjson
+import pytest
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import agents.agent as agent_module
+import app as app_module
+from agents.chat_socket import ChatSocketConfig, answer_chunks
+from data.catalog_snapshot import get_snapshot
+from memory.session_store import get_session
+
+ANSWER = "The drain pump is the usual cause.\n1. Unplug the dishwasher.\n2. Replace the pump."
+
+
+@pytest.fixture
+def client(monkeypatch):
+    part = next(p for p in get_snapshot().metadata if "WDT780SAEM1" in p["compatible_models"])
+    monkeypatch.setattr(agent_module, "semantic_search", lambda q, top_k=5, snapshot=None, **kw: [part])
+    monkeypatch.setattr(agent_module, "deepseek_chat", lambda system_prompt, user_prompt, flow=None: ANSWER)
+    monkeypatch.setattr(app_module.chat_sockets, "config", ChatSocketConfig(answer_chunk_chars=40))
+    return TestClient(app_module.app)
+
+
+def _receive_turn(ws):
+    turn = orjson.loads(ws.receive_text())
+    text = ""
+    while (frame := orjson.loads(ws.receive_text()))["type"] == "answer":
+        text += frame["text"]
+    assert frame == {"type": "done"}
+    return turn, text
+
+
+def test_turns_stream_over_one_connection_bound_session(client):
+    with client.websocket_connect("/ws/chat?session_id=ws-bound") as ws:
+        assert orjson.loads(ws.receive_text()) == {"type": "session", "session_id": "ws-bound"}
+
+        ws.send_text(orjson.dumps({"message": "My WDT780SAEM1 dishwasher is leaking", "view": "card"}).decode())
+        turn, text = _receive_turn(ws)
+        assert turn["type"] == "turn" and turn["session_id"] == "ws-bound"
+        assert turn["entities"]["model_number"] == "WDT780SAEM1"
+        assert "description" not in turn["tool_output"][0]  # card view
+        assert text == ANSWER and "answer" not in turn
+
+        # The model number carries over from the connection's session.
+        ws.send_text('{"message": "the dishwasher still leaks"}')
+        turn, _ = _receive_turn(ws)
+        assert turn["entities"]["model_number"] == "WDT780SAEM1"
+        assert "description" in turn["tool_output"][0]
+
+    assert get_session("ws-bound")["model_number"] == "WDT780SAEM1"
+    assert list(answer_chunks(ANSWER, 40)) == [
+        "The drain pump is the usual cause.\n",
+        "1. Unplug the dishwasher.\n",
+        "2. Replace the pump.",
+    ]
+
+
+def test_bad_frames_get_errors_and_connections_over_the_cap_are_refused(client, monkeypatch):
+    monkeypatch.setattr(app_module.chat_sockets, "config", ChatSocketConfig(max_connections=1))
+
+    with client.websocket_connect("/ws/chat") as ws:
+        session_id = orjson.loads(ws.receive_text())["session_id"]
+        assert session_id
+
+        ws.send_text("not json")
+        assert orjson.loads(ws.receive_text()) == {"type": "error", "status": 400, "detail": "Frames must be JSON."}
+        ws.send_text('{"message": "hi", "view": "wide"}')
+        assert orjson.loads(ws.receive_text())["status"] == 400
+
+        with client.websocket_connect("/ws/chat") as refused:
+            with pytest.raises(WebSocketDisconnect) as closed:
+                refused.receive_text()
+        assert closed.value.code == 1013
+
+        # The first connection is still served.
+        ws.send_text('{"message": "my dishwasher is leaking"}')
+        turn, _ = _receive_turn(ws)
+        assert turn["session_id"] == session_id
+
+    assert app_module.chat_sockets.open_connections() == 0
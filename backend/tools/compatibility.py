@@ -2,6 +2,8 @@ import os
 import json
 from typing import Any, Dict, Optional
 
+from data.catalog_snapshot import get_snapshot
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, "data")
 PARTS_PATH = os.path.join(DATA_DIR, "parts.json")
@@ -29,6 +31,7 @@ def check_compatibility(
           "model_number": ...,
           "compatible": bool | None,
           "reason": str,
+          "family_models": [...],  # when only other revisions of the model are listed
           "part": {...}  # when found
         }
     """
@@ -81,6 +84,22 @@ def check_compatibility(
 
     is_compatible = mn in comp_models
 
+    if not is_compatible:
+        family = get_snapshot().registry.model_trie.family(mn)
+        listed = [m for m in family.models if m in comp_models] if family and not family.exact else []
+        if listed:
+            return {
+                "part_number": pn,
+                "model_number": mn,
+                "compatible": None,
+                "reason": (
+                    f"Part {pn} is listed as compatible with the {family.prefix} model family "
+                    f"({', '.join(listed[:3])}); revision {mn} is unverified."
+                ),
+                "family_models": listed,
+                "part": part,
+            }
+
     if is_compatible:
         reason = f"Part {pn} is listed as compatible with model {mn}."
     else:
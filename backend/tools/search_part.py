@@ -2,9 +2,9 @@
 
 import os
 import json
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
-from vectorstore.search import semantic_search
+from vectorstore.search import search_hits
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, "data")  # backend/data
@@ -16,15 +16,15 @@ def _load_parts():
         return json.load(f)
 
 
-def search_part(query: str) -> Dict[str, Any]:
+def search_part(query: str, hits: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
     """
     Hybrid product lookup:
-      1) Try semantic FAISS search
+      1) Try semantic FAISS search (or reuse `hits` from a search already made)
       2) Fallback to simple JSON scan by name / part_number
     """
     # 1. Semantic search
     try:
-        hits = semantic_search(query, top_k=3)
+        hits = search_hits(query, top_k=3) if hits is None else hits[:3]
         if hits:
             return {
                 "mode": "semantic",
@@ -2,9 +2,9 @@
 
 import os
 import json
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from vectorstore.search import semantic_search
+from vectorstore.search import search_hits, search_symptoms
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, "data")
@@ -16,18 +16,39 @@ def _load_parts():
         return json.load(f)
 
 
-def troubleshoot_issue(description: str) -> Dict[str, Any]:
+def _troubleshooting_texts(part: Dict[str, Any]) -> List[str]:
+    # Catalog records carry one `troubleshooting_tips` string.
+    if "troubleshooting_texts" in part:
+        return part["troubleshooting_texts"]
+    return [part["troubleshooting_tips"]] if part.get("troubleshooting_tips") else []
+
+
+def match_symptoms(description: str) -> List[Dict[str, Any]]:
     """
-    Given a free-text problem description (e.g. "ice maker not working"),
-    return a list of candidate parts + troubleshooting info.
-    Uses a combination of symptom matching + semantic search.
+    Parts whose listed symptoms match the description: the nearest symptoms
+    in the catalog's symptom index, ranked by similarity and part rating.
+    Without a symptom index (not built yet), parts.json is scanned for
+    symptoms contained in the description or containing it.
     """
+    matches = search_symptoms(description)
+    if matches is not None:
+        return [
+            {
+                "part_number": m["part"].get("part_number"),
+                "name": m["part"].get("name"),
+                "category": m["part"].get("category"),
+                "matched_symptom": m["symptom"],
+                "score": m["score"],
+                "troubleshooting_texts": _troubleshooting_texts(m["part"]),
+            }
+            for m in matches
+        ]
+
     desc = description.lower()
     parts = _load_parts()
 
     direct_hits: List[Dict[str, Any]] = []
 
-    # 1) Symptom matching
     for p in parts:
         for symptom in p.get("symptoms", []):
             if symptom.lower() in desc or desc in symptom.lower():
@@ -42,10 +63,15 @@ def troubleshoot_issue(description: str) -> Dict[str, Any]:
                 )
                 break
 
-    # 2) Semantic search as backup
+    return direct_hits
+
+
+def semantic_matches(description: str, hits: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Semantic search hits for the description; `hits` reuses a search already made."""
     semantic_hits: List[Dict[str, Any]] = []
     try:
-        hits = semantic_search(description, top_k=5)
+        if hits is None:
+            hits = search_hits(description, top_k=5)
         for h in hits:
             p = h["part"]
             semantic_hits.append(
@@ -54,12 +80,35 @@ def troubleshoot_issue(description: str) -> Dict[str, Any]:
                     "name": p.get("name"),
                     "category": p.get("category"),
                     "score": h["score"],
-                    "troubleshooting_texts": p.get("troubleshooting_texts", []),
+                    "troubleshooting_texts": _troubleshooting_texts(p),
                 }
             )
     except Exception as e:
         print(f"[TOOLS/troubleshoot] Semantic search failed: {e}")
 
+    return semantic_hits
+
+
+def troubleshoot_issue(
+    description: str,
+    hits: Optional[List[Dict[str, Any]]] = None,
+    symptom_matches: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Given a free-text problem description (e.g. "ice maker not working"),
+    return a list of candidate parts + troubleshooting info.
+    Uses a combination of symptom matching + semantic search.
+
+    `hits` / `symptom_matches` take results computed ahead of time (the
+    ToolRouter pipeline runs both lookups concurrently).
+    """
+    # 1) Symptom matching
+    direct_hits = match_symptoms(description) if symptom_matches is None else symptom_matches
+
+    # 2) Semantic search as backup: only when the symptom lookup found
+    #    nothing, unless its hits are already at hand
+    semantic_hits = semantic_matches(description, hits) if hits is not None or not direct_hits else []
+
     if not direct_hits and not semantic_hits:
         return {
             "matches": [],
@@ -73,4 +122,3 @@ def troubleshoot_issue(description: str) -> Dict[str, Any]:
         },
         "message": "OK",
     }
-
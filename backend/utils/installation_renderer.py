@@ -0,0 +1,66 @@
+from typing import Any, Dict, Optional
+
+from utils.response_formatter import FormattedAnswer, format_llm_answer
+
+_STEP_SEPARATOR = "→"
+
+_SAFETY = {
+    "dishwasher": (
+        "Safety first: turn off power to the dishwasher at the breaker and "
+        "shut off the water supply before you start."
+    ),
+    "refrigerator": (
+        "Safety first: unplug the refrigerator and shut off its water supply "
+        "(if connected) before you start."
+    ),
+}
+_SAFETY_DEFAULT = "Safety first: disconnect power and water to the appliance before you start."
+
+
+def _safety_line(category: str) -> str:
+    category = category.lower()
+    for appliance, line in _SAFETY.items():
+        if appliance in category:
+            return line
+    return _SAFETY_DEFAULT
+
+
+def _sentence(step: str) -> str:
+    step = step.strip().rstrip(".")
+    return step[:1].upper() + step[1:] + "."
+
+
+def render_installation(part: Dict[str, Any]) -> Optional[FormattedAnswer]:
+    """
+    Build the installation answer straight from the catalog record.
+
+    `installation_guide_markdown` is a "→"-delimited step list and
+    `installation_metadata` holds difficulty, time and tools. Returns None
+    when the record has no usable steps, so the caller can fall back to the LLM.
+    """
+    guide = part.get("installation_guide_markdown") or ""
+    steps = [s for s in (s.strip() for s in guide.split(_STEP_SEPARATOR)) if s]
+    if not steps:
+        return None
+
+    meta = part.get("installation_metadata") or {}
+    name = part.get("name") or "this part"
+    part_id = part.get("id") or part.get("part_number")
+
+    lines = [_safety_line(part.get("category", "")), ""]
+
+    title = f"Installing {name}" + (f" ({part_id})" if part_id else "")
+    details = []
+    if meta.get("difficulty"):
+        details.append(f"Difficulty: {meta['difficulty']}")
+    if meta.get("time_required"):
+        details.append(f"Time: {meta['time_required']}")
+    if meta.get("tools_needed"):
+        details.append(f"Tools: {', '.join(meta['tools_needed'])}")
+    lines.append(title + (". " + ". ".join(details) + "." if details else "."))
+    lines.append("")
+
+    lines.extend(f"{i}. {_sentence(step)}" for i, step in enumerate(steps, start=1))
+
+    # Same cleanup and step extraction as LLM answers, so both paths look alike.
+    return format_llm_answer("\n".join(lines))
@@ -0,0 +1,99 @@
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import orjson
+
+# What the frontend ProductCard renders; everything else in a part record
+# (description, compatible models, install guide, ...) stays server-side.
+CARD_FIELDS = (
+    "id",
+    "part_number",
+    "name",
+    "brand",
+    "category",
+    "price",
+    "currency",
+    "in_stock",
+    "rating",
+    "review_count",
+    "image_url",
+)
+
+VIEWS = ("full", "card")
+
+# Private response key: the pre-encoded cards of the snapshot the turn was
+# answered from. Never serialized.
+CARDS_KEY = "_cards"
+
+# Keys every /chat response carries, as ChatResponse declares them.
+_RESPONSE_DEFAULTS = {"steps": [], "degraded": False}
+
+
+def card_view(part: Mapping[str, Any]) -> Dict[str, Any]:
+    card = {k: part[k] for k in CARD_FIELDS if k in part}
+    difficulty = (part.get("installation_metadata") or {}).get("difficulty")
+    if difficulty:
+        card["installation_metadata"] = {"difficulty": difficulty}
+    return card
+
+
+def encode_cards(parts: Iterable[Mapping[str, Any]]) -> Dict[str, bytes]:
+    """Pre-encoded card JSON per part id, built once per catalog snapshot."""
+    return {p["id"]: orjson.dumps(card_view(p)) for p in parts if p.get("id")}
+
+
+def project(part: Mapping[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    return {k: part[k] for k in fields if k in part}
+
+
+def _encode_item(
+    item: Any,
+    view: str,
+    fields: Optional[List[str]],
+    cards: Mapping[str, bytes],
+) -> bytes:
+    if not isinstance(item, Mapping):
+        return orjson.dumps(item)
+    if fields:
+        return orjson.dumps(project(item, fields))
+    if view == "card":
+        cached = cards.get(item.get("id"))
+        # Parts missing from the active snapshot (e.g. just after a reload)
+        # are encoded on the spot.
+        if cached is not None:
+            return cached
+        return orjson.dumps(card_view(item))
+    return orjson.dumps(item)
+
+
+def encode_chat_response(
+    response: Dict[str, Any],
+    view: str = "full",
+    fields: Optional[List[str]] = None,
+    cards: Optional[Mapping[str, bytes]] = None,
+) -> bytes:
+    """
+    Serialize a handle_chat response with orjson.
+
+    `view="card"` replaces each tool_output part with its pre-encoded card;
+    `fields` projects each part to the given keys instead. The pre-encoded
+    bytes are spliced into the body rather than decoded and re-encoded.
+    Cards pinned in the response (CARDS_KEY) take precedence over `cards`, so
+    they come from the catalog version the parts were retrieved from.
+    """
+    body = dict(response)
+    cards = body.pop(CARDS_KEY, None) or cards
+    for key, default in _RESPONSE_DEFAULTS.items():
+        body.setdefault(key, default)
+    tool_output = body.pop("tool_output", None)
+
+    if view == "full" and not fields:
+        body["tool_output"] = tool_output
+        return orjson.dumps(body)
+
+    head = orjson.dumps(body)
+    if not isinstance(tool_output, list):
+        return head[:-1] + b',"tool_output":' + orjson.dumps(tool_output) + b"}"
+
+    cards = cards or {}
+    items = b",".join(_encode_item(p, view, fields, cards) for p in tool_output)
+    return head[:-1] + b',"tool_output":[' + items + b"]}"
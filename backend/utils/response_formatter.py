@@ -1,25 +1,231 @@
 import re
+from operator import methodcaller
+from dataclasses import dataclass, field
+from typing import List
 
-def clean_llm_text(text: str) -> str:
-    """Remove markdown, bullets, headers, and excess formatting."""
-    if not text:
-        return ""
+# Emphasis and horizontal rules never span lines, so emphasis is stripped from
+# whole blocks of complete lines and rules only from lines that contain one.
+# Headers, bullets and blank-line collapsing can span lines and are handled by
+# the line state machine in StreamingFormatter; lines that cannot trigger any
+# of them (the common case) are passed through in bulk.
+_BOLD = re.compile(r"\*\*(.*?)\*\*")
+_ITALIC = re.compile(r"\*(.*?)\*")
+_GROUP_1 = methodcaller("group", 1)  # C-level replacement, avoids template expansion
+_RULE = re.compile(r"---+")
+_BLANK_RUN = re.compile(r"\n{3,}")
+_STEP = re.compile(r"^(\d+)[.)]\s+(.+)$", re.MULTILINE)
+
+_BULLETS = ("-", "•")
+_LINE_MARKERS = "#-•"  # plus leading whitespace; see StreamingFormatter._block
+
+
+@dataclass
+class FormattedAnswer:
+    text: str
+    steps: List[str] = field(default_factory=list)
+
+
+class StreamingFormatter:
+    """
+    Single-pass, incremental version of the markdown cleanup in clean_llm_text.
+
+    Feed LLM output in arbitrary chunks; each call returns the cleaned text
+    that is final so far. Whitespace that may still be removed (a blank line
+    before a bullet, trailing whitespace) is held back until the next chunk
+    or finish().
+    """
+
+    def __init__(self):
+        self._partial = ""
+        self._header_eating = False   # inside the whitespace run after "#"
+        self._bullet_eating = False   # inside the whitespace run after "-"/"•"
+        self._blank_lines: List[str] = []  # may still be swallowed by a bullet
+        self._started = False
+        self._held_ws = ""
+        self._out: List[str] = []
+        self._emitted: List[str] = []
+
+    def feed(self, chunk: str) -> str:
+        if not chunk:
+            return ""
+
+        data = self._partial + chunk
+        cut = data.rfind("\n") + 1
+        self._partial = data[cut:]
+        if cut:
+            self._block(data[:cut])
+
+        return self._drain()
+
+    def finish(self) -> str:
+        if self._partial:
+            self._block(self._partial)
+            self._partial = ""
+
+        self._flush_blank_lines()
+
+        # Whatever whitespace is still held back is trailing and gets stripped.
+        self._held_ws = ""
+        return self._drain()
+
+    def result(self) -> FormattedAnswer:
+        return _structure("".join(self._emitted))
+
+    # -- line pipeline --
+
+    def _block(self, text: str):
+        if "*" in text:
+            text = _ITALIC.sub(_GROUP_1, _BOLD.sub(_GROUP_1, text))
+
+        lines = text.split("\n")
+        last = lines.pop()
+        check_rules = "---" in text
+
+        plain: List[str] = []
+        for line in lines:
+            first = line[:1]
+            if (
+                first
+                and first not in _LINE_MARKERS
+                and not first.isspace()
+                and not (check_rules and "---" in line)
+            ):
+                plain.append(line)
+                continue
+
+            if plain:
+                self._plain("\n".join(plain) + "\n")
+                plain = []
+
+            if not line:
+                # Blank line: swallowed by a pending "#"/"-" run, or held until
+                # we know whether a bullet follows it.
+                if not (self._header_eating or self._bullet_eating):
+                    self._blank_lines.append("\n")
+                continue
 
-    # Remove markdown bold/italic
-    text = re.sub(r"\*\*(.*?)\*\*", r"\1", text)
-    text = re.sub(r"\*(.*?)\*", r"\1", text)
+            self._line(line + "\n")
 
-    # Remove headers
-    text = re.sub(r"^#+\s*", "", text, flags=re.MULTILINE)
+        if plain:
+            self._plain("\n".join(plain) + "\n")
+        if last:
+            self._line(last)
 
-    # Remove horizontal rules
-    text = re.sub(r"---+", "", text)
+    def _plain(self, text: str):
+        # Lines starting with ordinary text end any pending whitespace run
+        # without matching a header or bullet.
+        self._header_eating = False
+        self._bullet_eating = False
+        self._flush_blank_lines()
+        self._emit(text)
 
-    # Remove bullet formatting
-    text = re.sub(r"^\s*[-•]\s*", "", text, flags=re.MULTILINE)
+    def _line(self, line: str):
+        line = self._strip_header(line)
+        if not line:
+            return
+
+        if "---" in line:
+            line = _RULE.sub("", line)
+            if not line:
+                return
+
+        self._strip_bullet(line)
+
+    def _strip_header(self, line: str) -> str:
+        if self._header_eating:
+            rest = line.lstrip()
+            if not rest:
+                return ""
+            self._header_eating = False
+            if len(rest) != len(line):
+                # Resumed mid-line, so this is no longer a line start.
+                return rest
+
+        if line.startswith("#"):
+            rest = line.lstrip("#").lstrip()
+            if not rest:
+                self._header_eating = True
+            return rest
+
+        return line
+
+    def _strip_bullet(self, line: str):
+        if self._bullet_eating:
+            rest = line.lstrip()
+            if not rest:
+                return
+            self._bullet_eating = False
+            if len(rest) != len(line):
+                self._emit(rest)
+                return
+
+        rest = line.lstrip()
+        if not rest:
+            self._blank_lines.append(line)
+            return
+
+        if rest[0] in _BULLETS:
+            # The bullet marker also swallows the blank lines in front of it.
+            self._blank_lines.clear()
+            rest = rest[1:].lstrip()
+            if not rest:
+                self._bullet_eating = True
+                return
+            self._emit(rest)
+            return
+
+        self._flush_blank_lines()
+        self._emit(line)
+
+    def _flush_blank_lines(self):
+        if self._blank_lines:
+            self._emit("".join(self._blank_lines))
+            self._blank_lines.clear()
+
+    def _emit(self, text: str):
+        core = text.rstrip()
+        if not core:
+            if self._started:
+                self._held_ws += text
+            return
+
+        tail = text[len(core):]
+        if self._started:
+            core = self._held_ws + core
+        else:
+            core = core.lstrip()
+            self._started = True
+
+        if "\n\n\n" in core:
+            core = _BLANK_RUN.sub("\n\n", core)
+
+        self._out.append(core)
+        self._held_ws = tail
+
+    def _drain(self) -> str:
+        text = "".join(self._out)
+        self._out.clear()
+        if text:
+            self._emitted.append(text)
+        return text
+
+
+def _structure(text: str) -> FormattedAnswer:
+    return FormattedAnswer(
+        text=text,
+        steps=[m.group(2).strip() for m in _STEP.finditer(text)],
+    )
+
+
+def clean_llm_text(text: str) -> str:
+    """Remove markdown, bullets, headers, and excess formatting."""
+    if not text:
+        return ""
 
-    # Normalize line spacing
-    text = re.sub(r"\n{3,}", "\n\n", text)
+    formatter = StreamingFormatter()
+    return formatter.feed(text) + formatter.finish()
 
-    return text.strip()
 
+def format_llm_answer(text: str) -> FormattedAnswer:
+    """clean_llm_text plus the numbered steps, for clients that render them as a list."""
+    return _structure(clean_llm_text(text))
@@ -0,0 +1,52 @@
+from typing import Any, Dict, List
+
+_STEP_SEPARATOR = "→"
+_MAX_SYMPTOMS = 3
+_MAX_STEPS = 3
+
+
+def _part_summary(part: Dict[str, Any]) -> str:
+    name = part.get("name") or "Part"
+    part_id = part.get("id") or part.get("part_number")
+    lines = [f"{name} ({part_id})" if part_id else name]
+
+    details = []
+    if part.get("price") is not None:
+        details.append(f"${part['price']:.2f}")
+    if "in_stock" in part:
+        details.append("in stock" if part["in_stock"] else "out of stock")
+    if details:
+        lines[0] += ": " + ", ".join(details) + "."
+
+    symptoms = part.get("symptoms_vector") or []
+    if symptoms:
+        lines.append("Fixes: " + ", ".join(symptoms[:_MAX_SYMPTOMS]) + ".")
+
+    steps = [
+        s.strip().rstrip(".")
+        for s in (part.get("installation_guide_markdown") or "").split(_STEP_SEPARATOR)
+        if s.strip()
+    ]
+    if steps:
+        more = ", ..." if len(steps) > _MAX_STEPS else ""
+        lines.append("Install: " + ", ".join(steps[:_MAX_STEPS]) + more + ".")
+
+    return "\n".join(lines)
+
+
+def render_retrieval_answer(parts: List[Dict[str, Any]]) -> str:
+    """
+    Deterministic answer from retrieved parts, used when the LLM cannot
+    answer within the request's latency budget.
+    """
+    if not parts:
+        return (
+            "I can't generate a detailed answer right now. "
+            "Please try again in a moment."
+        )
+
+    summaries = "\n\n".join(_part_summary(p) for p in parts)
+    return (
+        "I can't generate a detailed answer right now, but these catalog parts "
+        f"match your request:\n\n{summaries}"
+    )
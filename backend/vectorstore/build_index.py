@@ -1,22 +1,53 @@
+# Run from backend/: python -m vectorstore.build_index
+
 import json
 import os
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
 import faiss
 import numpy as np
 from tqdm import tqdm
-from sentence_transformers import SentenceTransformer
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+from data.catalog_registry import CATALOG_PATH, REGISTRY_PATH, RegistryBuilder, hash_file, save_registry
+from data.catalog_snapshot import BUILD_MANIFEST, write_atomic
+from data.ingest import MetadataWriter, ingest
+from vectorstore.dedup import MIN_COSINE, DuplicateGrouper
+from vectorstore.shards import ShardBuilder, shard_key
+from vectorstore.symptoms import SymptomIndexBuilder
 
-DATA_PATH = os.path.join(
-    os.path.dirname(__file__), "..", "data", "full_catalog.json"
-)
+DATA_PATH = CATALOG_PATH  # JSON array or JSONL; set CATALOG_PATH to override
+BATCH_SIZE = int(os.getenv("INDEX_BATCH_SIZE", "256"))
+# "0" builds one flat index.faiss instead of per-(appliance, brand) shards.
+SHARDED = os.getenv("INDEX_SHARDS", "1") != "0"
 
 OUT_INDEX = os.path.join(os.path.dirname(__file__), "index.faiss")
 OUT_META = os.path.join(os.path.dirname(__file__), "parts_metadata.json")
+OUT_SHARDS = os.path.join(os.path.dirname(__file__), "shards")
+OUT_SYMPTOMS = os.path.join(os.path.dirname(__file__), "symptoms.npz")
+OUT_DUPLICATES = os.path.join(os.path.dirname(__file__), "duplicates.npz")
+
+
+_model = None
+
+
+def _get_model():
+    # Loaded on first use so the streaming pipeline can be driven (and
+    # tested) with another embedder.
+    global _model
+    if _model is None:
+        from sentence_transformers import SentenceTransformer
+
+        _model = SentenceTransformer("all-MiniLM-L6-v2")
+    return _model
 
 
 def embed_text(text: str):
-    return model.encode(text).tolist()
+    return _get_model().encode(text).tolist()
+
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    return _get_model().encode(texts, batch_size=64)
 
 
 def combine_fields(item):
@@ -34,37 +65,130 @@ def combine_fields(item):
     return " ".join(fields)
 
 
-def main():
-    with open(DATA_PATH, "r") as f:
-        parts = json.load(f)
-
-    print(f"[INDEX] Loaded {len(parts)} parts")
-
-    embeddings = []
-    metadata = []
-
-    for item in tqdm(parts, desc="Embedding"):
-        text = combine_fields(item)
-        vec = embed_text(text)
-        embeddings.append(vec)
-        metadata.append(item)
+def build(
+    catalog_path=DATA_PATH,
+    out_index=OUT_INDEX,
+    out_meta=OUT_META,
+    out_shards=OUT_SHARDS,
+    out_symptoms=OUT_SYMPTOMS,
+    out_duplicates=OUT_DUPLICATES,
+    embed_batch: Optional[Callable[[List[str]], np.ndarray]] = None,
+    batch_size: int = BATCH_SIZE,
+    sinks: Sequence[Callable[[List[dict]], None]] = (),
+) -> int:
+    """
+    Embed and index the catalog in one streaming pass.
+
+    Records are read, embedded, added to the index and appended to the
+    metadata file one batch at a time, so apart from the index itself memory
+    does not grow with the catalog. `embed_batch` maps a list of texts to a
+    float32 matrix (defaults to the sentence-transformer model). Extra
+    `sinks` (e.g. a RegistryBuilder) see the same batches in the same pass.
+
+    The vectors go into per-(appliance, brand) shards under `out_shards`
+    (see vectorstore/shards.py), or, when it is None, into one flat index at
+    `out_index`. Only one of the two is built, so the vectors are held once.
+    The symptom vocabulary is embedded once at the end and saved with its
+    symptom -> parts posting lists to `out_symptoms` (vectorstore/symptoms.py).
+
+    Near-duplicate parts (vectorstore/dedup.py) are collapsed as they
+    arrive: only one representative vector per group goes into the index
+    and shards, and the group -> members table is saved to `out_duplicates`.
+    Every part is still written to the metadata; index ids are its rows.
+    Pass None (or DEDUP_MIN_COSINE=1) to index every vector.
+
+    Each output is replaced atomically on its own. A manifest of all of them
+    (BUILD_MANIFEST, next to `out_meta`) is written last, so a reload during
+    the build refuses to pair the new index with the old metadata.
+    """
+    embed_batch = embed_batch or embed_texts
+    index = None
+    rows_seen = 0
+    shards = ShardBuilder() if out_shards else None
+    duplicates = DuplicateGrouper() if out_duplicates else None
+    symptoms = SymptomIndexBuilder() if out_symptoms else None
+    metadata = MetadataWriter(out_meta)
+    progress = tqdm(desc="Embedding", unit=" parts")
+
+    def add_batch(batch):
+        nonlocal index, rows_seen
+        matrix = np.ascontiguousarray(embed_batch([combine_fields(item) for item in batch]), dtype="float32")
+        rows = np.arange(rows_seen, rows_seen + len(batch), dtype=np.int64)
+        rows_seen += len(batch)
+        if shards is None and index is None:
+            # Ids are metadata rows, which differ from index positions once
+            # duplicates are left out.
+            index = faiss.IndexIDMap(faiss.IndexFlatL2(matrix.shape[1]))
+
+        progress.update(len(batch))
+        if duplicates is not None and MIN_COSINE < 1:
+            # Near-duplicates share category and brand, hence a shard.
+            keys = [shard_key(item) for item in batch] if shards is not None else [None] * len(batch)
+            keep = duplicates.assign(keys, matrix, rows)
+            if not keep.all():
+                batch = [item for item, k in zip(batch, keep) if k]
+                matrix, rows = np.ascontiguousarray(matrix[keep]), rows[keep]
+
+        if shards is not None:
+            shards.add(batch, matrix, rows=rows)
+        else:
+            index.add_with_ids(matrix, rows)
+
+    try:
+        count = ingest(catalog_path, [add_batch, metadata, *([symptoms] if symptoms else []), *sinks], batch_size)
+        if rows_seen == 0:
+            raise RuntimeError(f"Catalog is empty: {catalog_path}")
+    except BaseException:
+        metadata.abort()
+        raise
+    finally:
+        progress.close()
+
+    # index + metadata (atomic replace, so a running backend can hot-reload
+    # via POST /admin/reload-catalog without ever reading a half-written file)
+    outputs = {"metadata": out_meta}
+    manifest = {}
+    if shards is not None:
+        manifest["shards"] = shards.write(out_shards)
+    else:
+        # faiss writes straight to the file, skipping two in-memory copies.
+        tmp_index = f"{out_index}.tmp-{os.getpid()}"
+        faiss.write_index(index, tmp_index)
+        os.replace(tmp_index, out_index)
+        outputs["index"] = out_index
+    # Saved; free the vectors before the symptom write allocates its own.
+    index = shards = None
+    if symptoms is not None:
+        symptoms.write(out_symptoms, embed_batch)
+        outputs["symptoms"] = out_symptoms
+    if duplicates is not None:
+        duplicates.write(out_duplicates)
+        outputs["duplicates"] = out_duplicates
+    metadata.close()
+
+    # An empty symptom vocabulary writes no file.
+    manifest.update({name: hash_file(path).hexdigest() for name, path in outputs.items() if os.path.exists(path)})
+    write_atomic(str(Path(out_meta).with_name(BUILD_MANIFEST)), json.dumps(manifest, sort_keys=True).encode())
+    return count
 
-   
-    matrix = np.array(embeddings).astype("float32")
 
-    #  FAISS index
-    dim = matrix.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(matrix)
-
-    # index + metadata
-    faiss.write_index(index, OUT_INDEX)
-
-    with open(OUT_META, "w") as f:
-        json.dump(metadata, f, indent=2)
-
-    print(f"[INDEX] Saved FAISS index → {OUT_INDEX}")
+def main():
+    # The registry is compiled from the same pass (data/catalog_registry.py);
+    # hashed first, so a catalog replaced mid-build never matches it.
+    catalog_sha256 = hash_file(DATA_PATH).hexdigest()
+    registry = RegistryBuilder(model_parts=True)
+    count = build(out_shards=OUT_SHARDS if SHARDED else None, sinks=[registry])
+    save_registry(registry.build(), catalog_sha256)
+
+    print(f"[INDEX] Indexed {count} parts")
+    if SHARDED:
+        print(f"[INDEX] Saved shards → {OUT_SHARDS}")
+    else:
+        print(f"[INDEX] Saved FAISS index → {OUT_INDEX}")
+    print(f"[INDEX] Saved symptom index → {OUT_SYMPTOMS}")
+    print(f"[INDEX] Saved duplicate groups → {OUT_DUPLICATES}")
     print(f"[INDEX] Saved metadata → {OUT_META}")
+    print(f"[INDEX] Saved compiled registry → {REGISTRY_PATH}")
 
 
 if __name__ == "__main__":
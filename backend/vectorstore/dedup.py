@@ -0,0 +1,168 @@
+import os
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+# Parts whose embeddings are at least this similar (cosine) share one
+# indexed vector; 1 disables collapsing.
+MIN_COSINE = float(os.getenv("DEDUP_MIN_COSINE", "0.98"))
+
+# Representatives per key a new vector is compared with: the most recently
+# indexed ones. Bounds the build at O(parts x window) instead of growing with
+# the index; clones further apart than this in the catalog stay separate.
+WINDOW = int(os.getenv("DEDUP_WINDOW", "4096"))
+
+
+# BUILD
+
+class DuplicateGrouper:
+    """
+    Collapses near-duplicate vectors during a streaming index build.
+
+    A vector within `min_cosine` of one of the last `window` representatives
+    with its key, or of a new one earlier in its batch, joins that
+    representative's group instead of being indexed. Only vectors with the
+    same key (the shard key, when the build is sharded) are compared.
+    Distances are squared L2 over unit-length embeddings, i.e. 2 - 2·cos.
+    """
+
+    def __init__(self, min_cosine: float = MIN_COSINE, window: int = WINDOW):
+        self.max_distance = 2.0 * (1.0 - min_cosine)
+        self.window = window
+        # Parallel: collapsed row -> the representative row it was folded into.
+        self._members = array("q")
+        self._reps = array("q")
+        # key -> ring buffers of its latest representatives (vectors, rows)
+        # and how many were ever added.
+        self._recent: Dict[Hashable, List[Any]] = {}
+
+    @property
+    def collapsed(self) -> int:
+        return len(self._members)
+
+    @staticmethod
+    def _by_key(keys: Sequence[Hashable]) -> Dict[Hashable, np.ndarray]:
+        groups: Dict[Hashable, List[int]] = {}
+        for offset, key in enumerate(keys):
+            groups.setdefault(key, []).append(offset)
+        return {key: np.asarray(offsets, dtype=np.int64) for key, offsets in groups.items()}
+
+    def _nearest(self, groups: Dict[Hashable, np.ndarray], matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Each vector's closest recent representative: distance and row (inf / -1 if none)."""
+        distances = np.full(len(matrix), np.inf, dtype=np.float32)
+        nearest = np.full(len(matrix), -1, dtype=np.int64)
+        for key, offsets in groups.items():
+            recent = self._recent.get(key)
+            if recent is None:
+                continue
+            n = min(recent[2], self.window)
+            vectors, sub = recent[0][:n], matrix[offsets]
+            d = (
+                np.einsum("ij,ij->i", sub, sub)[:, None]
+                + np.einsum("ij,ij->i", vectors, vectors)[None, :]
+                - 2.0 * (sub @ vectors.T)
+            )
+            best = d.argmin(axis=1)
+            distances[offsets] = d[np.arange(len(offsets)), best]
+            nearest[offsets] = recent[1][best]
+        return distances, nearest
+
+    def _remember(self, groups: Dict[Hashable, np.ndarray], matrix: np.ndarray, rows: np.ndarray, keep: np.ndarray):
+        for key, offsets in groups.items():
+            offsets = offsets[keep[offsets]][-self.window:]
+            recent = self._recent.get(key)
+            if recent is None:
+                recent = self._recent[key] = [
+                    np.empty((self.window, matrix.shape[1]), dtype=np.float32),
+                    np.empty(self.window, dtype=np.int64),
+                    0,
+                ]
+            slots = (recent[2] + np.arange(len(offsets))) % self.window
+            recent[0][slots] = matrix[offsets]
+            recent[1][slots] = rows[offsets]
+            recent[2] += len(offsets)
+
+    def assign(self, keys: Sequence[Hashable], matrix: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """
+        Group one batch of vectors (global `rows`) against the recent
+        representatives. Records the duplicates and returns the mask of
+        vectors to index.
+        """
+        groups = self._by_key(keys)
+        distances, nearest = self._nearest(groups, matrix)
+        reps = np.where(distances <= self.max_distance, nearest, -1)
+
+        # New representatives may still duplicate one another.
+        new = np.flatnonzero(reps < 0)
+        if len(new) > 1:
+            sub = matrix[new]
+            sq = np.einsum("ij,ij->i", sub, sub)
+            close = (sq[:, None] + sq[None, :] - 2.0 * (sub @ sub.T)) <= self.max_distance
+            codes: Dict[Hashable, int] = {}
+            key_ids = np.array([codes.setdefault(keys[i], len(codes)) for i in new])
+            close &= key_ids[:, None] == key_ids[None, :]
+            close &= np.tri(len(new), k=-1, dtype=bool)  # earlier in the batch only
+            for a in np.flatnonzero(close.any(axis=1)):
+                for b in np.flatnonzero(close[a]):
+                    if reps[new[b]] < 0:  # b is still a representative
+                        reps[new[a]] = rows[new[b]]
+                        break
+
+        dup = np.flatnonzero(reps >= 0)
+        self._members.frombytes(rows[dup].astype(np.int64).tobytes())
+        self._reps.frombytes(reps[dup].astype(np.int64).tobytes())
+        self._remember(groups, matrix, rows, reps < 0)
+        return reps < 0
+
+    def write(self, path) -> int:
+        """
+        Save the group -> members table to one .npz file, replaced
+        atomically. Returns the number of collapsed rows.
+        """
+        members = np.frombuffer(self._members, dtype=np.int64)
+        reps = np.frombuffer(self._reps, dtype=np.int64)
+        order = np.argsort(reps, kind="stable")
+        groups, counts = np.unique(reps[order], return_counts=True)
+        offsets = np.zeros(len(groups) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        path = Path(path)
+        tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}.npz")
+        np.savez(tmp, groups=groups, offsets=offsets, members=members[order])
+        os.replace(tmp, path)
+        return len(members)
+
+
+# SERVE
+
+class DuplicateGroups:
+    """
+    The parts collapsed into each indexed representative (rows of
+    parts_metadata.json), for expanding search hits on request.
+    """
+
+    def __init__(self, groups: np.ndarray, offsets: np.ndarray, members: np.ndarray):
+        self._groups = groups
+        self._offsets = offsets
+        self._members = members
+
+    @classmethod
+    def load(cls, source) -> "DuplicateGroups":
+        """`source` is a path or file object of a DuplicateGrouper.write file."""
+        with np.load(source) as data:
+            return cls(data["groups"], data["offsets"], data["members"])
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def members(self, row: int) -> np.ndarray:
+        """Rows folded into representative `row`, in catalog order."""
+        i = int(np.searchsorted(self._groups, row))
+        if i == len(self._groups) or self._groups[i] != row:
+            return self._members[:0]
+        return self._members[self._offsets[i]:self._offsets[i + 1]]
+
+    def expand(self, row: int, metadata: Sequence[Mapping[str, Any]]) -> List[Mapping[str, Any]]:
+        return [metadata[int(r)] for r in self.members(row)]
@@ -0,0 +1,74 @@
+# Run from backend/ after build_index: python -m vectorstore.materialize_answers
+#
+# Pre-generates per-part answers into the answer store (data/answer_store.py).
+# Each answer is committed as soon as it arrives, so an interrupted run resumes
+# where it stopped; parts whose record is unchanged since their stored answer
+# are skipped, so a rebuild only pays for parts whose data changed.
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List
+
+from agents.agent import generate_installation_answer
+from data.answer_store import ANSWER_STORE_PATH, AnswerStore, part_digest
+from data.catalog_snapshot import load_snapshot
+from utils.response_formatter import FormattedAnswer
+
+# Flows whose answer depends only on the part record.
+GENERATORS: Dict[str, Callable[[Dict[str, Any]], FormattedAnswer]] = {
+    "installation": generate_installation_answer,
+}
+
+
+def materialize(
+    store: AnswerStore,
+    flow: str,
+    parts: List[Dict[str, Any]],
+    concurrency: int = 4,
+) -> Dict[str, int]:
+    generate = GENERATORS[flow]
+    stored = store.digests(flow)
+    todo = [p for p in parts if p.get("id") and stored.get(p["id"]) != part_digest(p)]
+
+    print(f"[ANSWERS] {flow}: {len(parts) - len(todo)} up to date, {len(todo)} to generate")
+
+    generated = failed = 0
+    # The pool size bounds the number of concurrent LLM requests.
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(generate, part): part for part in todo}
+        for future in as_completed(futures):
+            part = futures[future]
+            try:
+                store.put(flow, part, future.result())
+                generated += 1
+            except Exception as e:
+                # Left out of the store, so the next run retries it.
+                failed += 1
+                print(f"[ANSWERS] {flow}: {part['id']} failed: {e}")
+
+    pruned = store.prune(flow, (p["id"] for p in parts if p.get("id")))
+    return {"generated": generated, "failed": failed, "pruned": pruned, "skipped": len(parts) - len(todo)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate per-part answers into the answer store.")
+    parser.add_argument("--flow", action="append", choices=sorted(GENERATORS), help="default: all flows")
+    parser.add_argument("--concurrency", type=int, default=4, help="max concurrent LLM requests")
+    parser.add_argument("--store", default=str(ANSWER_STORE_PATH))
+    args = parser.parse_args()
+
+    snapshot = load_snapshot()
+    store = AnswerStore(args.store)
+    print(f"[ANSWERS] Catalog {snapshot.version}: {len(snapshot.metadata)} parts → {args.store}")
+
+    for flow in args.flow or sorted(GENERATORS):
+        start = time.perf_counter()
+        stats = materialize(store, flow, snapshot.metadata, args.concurrency)
+        print(f"[ANSWERS] {flow}: {stats} in {time.perf_counter() - start:.1f}s")
+
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
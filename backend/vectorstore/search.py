@@ -1,76 +1,198 @@
 import os
-import json
-from typing import List, Dict, Any
+import threading
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional
 
-import faiss
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
+from data.catalog_snapshot import CatalogSnapshot, get_snapshot
+
 # --- Observability ---
 from opentelemetry import trace
-from observability.metrics import vector_search_total, errors_total
+from observability.metrics import (
+    vector_search_total,
+    vector_search_gated_total,
+    vector_search_results,
+    errors_total,
+)
 
 tracer = trace.get_tracer(__name__)
 
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-
-INDEX_PATH = os.path.join(BASE_DIR, "vectorstore", "index.faiss")
-META_PATH = os.path.join(BASE_DIR, "vectorstore", "parts_metadata.json")
-
-_index = None
-_metadata = None
-_model = SentenceTransformer("all-MiniLM-L6-v2")
-
-
-def _load_index() -> bool:
-    global _index, _metadata
-
-    if _index is not None and _metadata is not None:
-        return True
+_model = None
+_model_lock = threading.Lock()
 
-    if not os.path.exists(INDEX_PATH) or not os.path.exists(META_PATH):
-        print("[VECTOR] Index or metadata missing.")
-        return False
 
-    _index = faiss.read_index(INDEX_PATH)
+def _get_model() -> SentenceTransformer:
+    # The encoder is independent of the catalog version, so it is created once
+    # and shared by every snapshot.
+    global _model
 
-    with open(META_PATH, "r") as f:
-        _metadata = json.load(f)
-
-    print(f"[VECTOR] Loaded index with {len(_metadata)} parts.")
-    return True
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = SentenceTransformer("all-MiniLM-L6-v2")
+    return _model
 
 
 def _embed_query(text: str) -> np.ndarray:
-    vec = _model.encode([text])
+    vec = _get_model().encode([text])
     return np.array(vec).astype("float32")
 
 
-def semantic_search(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+@dataclass(frozen=True)
+class RetrievalConfig:
+    """
+    Adaptive retrieval depth, read from the environment by `from_env`.
+    Scores are cosine similarities in [0, 1].
+
+    min_score     RETRIEVAL_MIN_SCORE     hits below this are dropped; if none is left
+                                          the caller answers without the LLM
+    relative_gap  RETRIEVAL_RELATIVE_GAP  hits more than this fraction below the best
+                                          hit are dropped
+    """
+
+    min_score: float = 0.3
+    relative_gap: float = 0.15
+
+    @classmethod
+    def from_env(cls) -> "RetrievalConfig":
+        return cls(
+            min_score=float(os.getenv("RETRIEVAL_MIN_SCORE", cls.min_score)),
+            relative_gap=float(os.getenv("RETRIEVAL_RELATIVE_GAP", cls.relative_gap)),
+        )
+
+
+RETRIEVAL = RetrievalConfig.from_env()
+
+
+def _score(distance: float) -> float:
+    # The encoder's embeddings are unit length, so the squared L2 distance
+    # FAISS reports is 2 - 2·cos.
+    return round(min(1.0, max(0.0, 1.0 - float(distance) / 2.0)), 4)
+
+
+def adaptive_cutoff(hits: List[Dict[str, Any]], config: Optional[RetrievalConfig] = None) -> List[Dict[str, Any]]:
+    """
+    Best-first `hits` that clear the minimum score and are within
+    `relative_gap` of the best one: a clear match comes back alone, an
+    ambiguous query keeps its close runners-up.
+    """
+    config = config or RETRIEVAL
+    if not hits or hits[0]["score"] < config.min_score:
+        return []
+    floor = max(config.min_score, hits[0]["score"] * (1.0 - config.relative_gap))
+    return [h for h in hits if h["score"] >= floor]
+
+
+def search_hits(
+    query: str,
+    top_k: int = 5,
+    snapshot: Optional[CatalogSnapshot] = None,
+    appliance: Optional[str] = None,
+    brand: Optional[str] = None,
+    adaptive: bool = True,
+    expand: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Up to `top_k` catalog hits for `query`, best first, as
+    {"part": ..., "score": ...}.
+
+    With `adaptive`, hits are cut by `adaptive_cutoff` (RETRIEVAL_*), so
+    fewer than `top_k` hits, or none, may come back.
+
+    With a sharded index, a known `appliance` / `brand` restricts the search
+    to the matching shards; otherwise all shards are searched and merged.
+    The monolithic index ignores both.
+
+    Near-duplicate parts were collapsed at build time (vectorstore/dedup.py),
+    so the hits are distinct parts. With `expand`, each hit also lists the
+    parts collapsed into it under "members".
+    """
     vector_search_total.inc()
 
     with tracer.start_as_current_span("vectorstore.semantic_search") as span:
         try:
             span.set_attribute("query_length", len(query))
 
-            if not _load_index():
+            # Callers that already hold a snapshot pass it in so the whole
+            # request is served from one catalog version.
+            snapshot = snapshot or get_snapshot()
+            span.set_attribute("catalog_version", snapshot.version)
+
+            if snapshot.index is None and snapshot.shards is None:
                 return []
 
+            metadata = snapshot.metadata
             q_vec = _embed_query(query)
-            distances, indices = _index.search(q_vec, top_k)
+            if snapshot.shards is not None:
+                span.set_attribute("appliance", appliance or "")
+                distances, indices = snapshot.shards.search(q_vec, top_k, appliance=appliance, brand=brand)
+            else:
+                distances, indices = snapshot.index.search(q_vec, top_k)
 
-            results = []
+            hits = []
             for dist, idx in zip(distances[0], indices[0]):
-                if idx < 0 or idx >= len(_metadata):
+                if idx < 0 or idx >= len(metadata):
                     continue
 
-                part = _metadata[int(idx)]
-                results.append(part)
+                hit = {"part": metadata[int(idx)], "score": _score(dist)}
+                if expand:
+                    hit["members"] = snapshot.duplicates.expand(int(idx), metadata) if snapshot.duplicates else []
+                hits.append(hit)
+
+            if hits:
+                span.set_attribute("top_score", hits[0]["score"])
+            if adaptive:
+                kept = adaptive_cutoff(hits)
+                if hits and not kept:
+                    vector_search_gated_total.inc()
+                vector_search_results.observe(len(kept))
+                hits = kept
 
-            span.set_attribute("results_count", len(results))
-            return results
+            span.set_attribute("results_count", len(hits))
+            return hits
 
         except Exception as e:
             errors_total.labels("vectorstore").inc()
             span.record_exception(e)
             raise
+
+
+def semantic_search(
+    query: str,
+    top_k: int = 5,
+    snapshot: Optional[CatalogSnapshot] = None,
+    appliance: Optional[str] = None,
+    brand: Optional[str] = None,
+    adaptive: bool = True,
+    expand: bool = False,
+) -> List[Dict[str, Any]]:
+    """The parts of `search_hits`, without scores; with `expand`, each followed by its members."""
+    parts = []
+    for hit in search_hits(query, top_k, snapshot, appliance, brand, adaptive, expand):
+        parts.append(hit["part"])
+        parts.extend(hit.get("members", ()))
+    return parts
+
+
+def search_symptoms(
+    description: str,
+    snapshot: Optional[CatalogSnapshot] = None,
+    limit: int = 10,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Parts listing a catalog symptom close to `description`, best first, as
+    {"part", "symptom", "score"}. None when the snapshot has no symptom index.
+    """
+    snapshot = snapshot or get_snapshot()
+    if snapshot.symptoms is None:
+        return None
+
+    with tracer.start_as_current_span("vectorstore.search_symptoms") as span:
+        matches = snapshot.symptoms.match(_embed_query(description), limit=limit)
+        span.set_attribute("results_count", len(matches))
+        return [
+            {"part": snapshot.metadata[m["row"]], "symptom": m["symptom"], "score": m["score"]}
+            for m in matches
+        ]
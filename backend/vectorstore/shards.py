@@ -0,0 +1,347 @@
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import uuid
+import weakref
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+from observability.metrics import vector_shard_searches_total
+
+MANIFEST = "manifest.json"
+
+# 0 keeps every shard in the serving process; N > 0 spreads the shards over N
+# local worker processes, so the index can outgrow one process's memory.
+SHARD_WORKERS = int(os.getenv("VECTOR_SHARD_WORKERS", "0"))
+
+_APPLIANCE_WORDS = (
+    ("dishwasher", ("dishwasher", "dish washer")),
+    ("refrigerator", ("refrigerator", "fridge", "freezer", "ice maker", "icemaker")),
+)
+
+
+def shard_appliance(category: str) -> str:
+    """Map a catalog category ("Refrigerator Ice Makers") to its appliance."""
+    category = (category or "").lower()
+    for appliance, words in _APPLIANCE_WORDS:
+        if any(w in category for w in words):
+            return appliance
+    return "other"
+
+
+def shard_key(item: Mapping[str, Any]) -> Tuple[str, str]:
+    return shard_appliance(item.get("category", "")), (item.get("brand") or "unknown").lower()
+
+
+# BUILD
+
+class ShardBuilder:
+    """
+    Splits the rows of a streaming index build into one flat index per
+    (appliance, brand). Each shard keeps the global row numbers of its
+    vectors, so hits map back into parts_metadata.json.
+    """
+
+    def __init__(self):
+        # key -> (index, global row of each of its vectors)
+        self._shards: Dict[Tuple[str, str], Tuple[faiss.Index, array]] = {}
+
+    @staticmethod
+    def _groups(items: Sequence[Mapping[str, Any]]) -> Dict[Tuple[str, str], np.ndarray]:
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        for offset, item in enumerate(items):
+            groups.setdefault(shard_key(item), []).append(offset)
+        return {key: np.asarray(offsets, dtype=np.int64) for key, offsets in groups.items()}
+
+    def add(
+        self,
+        items: Sequence[Mapping[str, Any]],
+        matrix: np.ndarray,
+        first_row: int = 0,
+        rows: Optional[np.ndarray] = None,
+    ):
+        """
+        Add `matrix`'s vectors to their items' shards. Their global rows are
+        `rows`, or consecutive from `first_row`.
+        """
+        if rows is None:
+            rows = np.arange(first_row, first_row + len(items), dtype=np.int64)
+        for key, offsets in self._groups(items).items():
+            shard = self._shards.get(key)
+            if shard is None:
+                shard = self._shards[key] = (faiss.IndexFlatL2(matrix.shape[1]), array("q"))
+            shard[0].add(np.ascontiguousarray(matrix[offsets]))
+            shard[1].frombytes(rows[offsets].astype(np.int64).tobytes())
+
+    def write(self, directory: Path) -> str:
+        """
+        Write the shards under a fresh build directory, then point the
+        manifest at it. Returns the build id.
+
+        The manifest is replaced atomically and the previous build is kept,
+        so a snapshot loading concurrently sees one complete build or the other.
+        """
+        directory = Path(directory)
+        build_id = uuid.uuid4().hex[:12]
+        build_dir = directory / build_id
+        build_dir.mkdir(parents=True)
+
+        entries = []
+        for n, ((appliance, brand), (index, ids)) in enumerate(sorted(self._shards.items())):
+            name = f"shard-{n:04d}"
+            faiss.write_index(index, str(build_dir / f"{name}.faiss"))
+            np.save(build_dir / f"{name}.ids.npy", np.frombuffer(ids, dtype=np.int64))
+            entries.append({
+                "appliance": appliance,
+                "brand": brand,
+                "count": index.ntotal,
+                "index": f"{build_id}/{name}.faiss",
+                "ids": f"{build_id}/{name}.ids.npy",
+            })
+
+        previous = _read_manifest(directory)
+        tmp = directory / f"{MANIFEST}.tmp-{os.getpid()}"
+        tmp.write_text(json.dumps({"build_id": build_id, "shards": entries}, indent=2))
+        os.replace(tmp, directory / MANIFEST)
+
+        keep = {build_id, previous.get("build_id") if previous else None}
+        for child in directory.iterdir():
+            if child.is_dir() and child.name not in keep:
+                shutil.rmtree(child, ignore_errors=True)
+        return build_id
+
+
+# SERVE
+
+@dataclass(frozen=True)
+class Shard:
+    appliance: str
+    brand: str
+    count: int
+    index_path: Path
+    ids_path: Path
+
+
+def _read_manifest(directory: Path) -> Optional[Dict[str, Any]]:
+    path = Path(directory) / MANIFEST
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def _load_shard(index_path: str, ids_path: str) -> Tuple[faiss.Index, np.ndarray]:
+    return faiss.read_index(index_path), np.load(ids_path)
+
+
+def _search_loaded(
+    loaded: Sequence[Tuple[faiss.Index, np.ndarray]], q_vec: np.ndarray, top_k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    results = []
+    for index, ids in loaded:
+        distances, rows = index.search(q_vec, min(top_k, index.ntotal))
+        found = rows[0] >= 0
+        results.append((distances[0][found], ids[rows[0][found]]))
+    return _merge(results, top_k)
+
+
+def _merge(results: Sequence[Tuple[np.ndarray, np.ndarray]], top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Global top-k by distance across per-shard results."""
+    if not results:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+    distances = np.concatenate([d for d, _ in results])
+    ids = np.concatenate([i for _, i in results])
+    order = np.argsort(distances, kind="stable")[:top_k]
+    return distances[order], ids[order]
+
+
+class _LocalHost:
+    """Shards loaded into this process."""
+
+    def __init__(self, shards: Sequence[Shard]):
+        self._loaded = [_load_shard(str(s.index_path), str(s.ids_path)) for s in shards]
+
+    def search(self, positions: Sequence[int], q_vec: np.ndarray, top_k: int):
+        return _search_loaded([self._loaded[p] for p in positions], q_vec, top_k)
+
+    def close(self):
+        pass
+
+
+def _worker_main(conn, paths: List[Tuple[str, str]]):
+    try:
+        loaded = [_load_shard(index_path, ids_path) for index_path, ids_path in paths]
+    except Exception as e:
+        conn.send(("error", repr(e)))
+        return
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:  # the serving process went away
+            return
+        if request is None:
+            return
+        positions, q_vec, top_k = request
+        conn.send(_search_loaded([loaded[p] for p in positions], q_vec, top_k))
+
+
+class _WorkerHost:
+    """Shards loaded into a local worker process, queried over a pipe."""
+
+    def __init__(self, ctx, shards: Sequence[Shard]):
+        self._conn, child = ctx.Pipe()
+        self._process = ctx.Process(
+            target=_worker_main,
+            args=(child, [(str(s.index_path), str(s.ids_path)) for s in shards]),
+            name="vector-shard-worker",
+        )
+        self._process.start()
+        child.close()
+        self._lock = threading.Lock()
+
+        status, detail = self._conn.recv()
+        if status != "ready":
+            self.close()
+            raise RuntimeError(f"Shard worker failed to load: {detail}")
+
+    def search(self, positions: Sequence[int], q_vec: np.ndarray, top_k: int):
+        with self._lock:
+            self._conn.send((list(positions), q_vec, top_k))
+            return self._conn.recv()
+
+    def close(self):
+        try:
+            self._conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._conn.close()
+
+
+def _close_hosts(hosts, executor):
+    executor.shutdown(wait=False)
+    for host in hosts:
+        host.close()
+
+
+class ShardedIndex:
+    """
+    Per-(appliance, brand) FAISS shards of one index build.
+
+    `search` narrows to the shards of a known appliance (and brand), and
+    otherwise scatters the query over the shards on a thread pool (FAISS
+    releases the GIL) and merges the top-k by distance. Worker processes,
+    when used, are stopped once the index is no longer referenced.
+    """
+
+    def __init__(self, build_id: str, shards: Sequence[Shard], workers: int = 0):
+        self.build_id = build_id
+        self.shards = list(shards)
+        self.ntotal = sum(s.count for s in self.shards)
+
+        # shard position -> (host, position within that host)
+        self._placement: List[Tuple[Any, int]] = [None] * len(self.shards)
+        if workers > 0:
+            ctx = multiprocessing.get_context("spawn")
+            self._hosts = []
+            for group in _balance(self.shards, workers):
+                host = _WorkerHost(ctx, [self.shards[p] for p in group])
+                self._hosts.append(host)
+                for local, p in enumerate(group):
+                    self._placement[p] = (host, local)
+        else:
+            # One host per shard, so a scatter searches every shard in parallel.
+            self._hosts = [_LocalHost([s]) for s in self.shards]
+            self._placement = [(host, 0) for host in self._hosts]
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, min(len(self._hosts), 8)),
+            thread_name_prefix="shard-search",
+        )
+        self._finalizer = weakref.finalize(self, _close_hosts, self._hosts, self._executor)
+
+    def close(self):
+        self._finalizer()
+
+    def select(self, appliance: Optional[str] = None, brand: Optional[str] = None) -> List[int]:
+        """Shards to query, widening the filter until something matches."""
+        brand = brand.lower() if brand else None
+        for a, b in ((appliance, brand), (appliance, None), (None, None)):
+            chosen = [
+                p for p, s in enumerate(self.shards)
+                if (a is None or s.appliance == a) and (b is None or s.brand == b)
+            ]
+            if chosen:
+                return chosen
+        return []
+
+    def search(
+        self,
+        q_vec: np.ndarray,
+        top_k: int,
+        appliance: Optional[str] = None,
+        brand: Optional[str] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """FAISS-shaped (1, k) distances and global row numbers."""
+        positions = self.select(appliance, brand)
+        vector_shard_searches_total.labels(
+            "targeted" if len(positions) < len(self.shards) else "scatter"
+        ).inc()
+
+        by_host: Dict[int, Tuple[Any, List[int]]] = {}
+        for p in positions:
+            host, local = self._placement[p]
+            by_host.setdefault(id(host), (host, []))[1].append(local)
+
+        calls = list(by_host.values())
+        if len(calls) == 1:
+            host, local = calls[0]
+            results = [host.search(local, q_vec, top_k)]
+        else:
+            futures = [self._executor.submit(host.search, local, q_vec, top_k) for host, local in calls]
+            results = [f.result() for f in futures]
+
+        distances, ids = _merge(results, top_k)
+        return distances[np.newaxis, :], ids[np.newaxis, :]
+
+
+def _balance(shards: Sequence[Shard], workers: int) -> List[List[int]]:
+    """Greedy largest-first packing of shard positions into `workers` groups."""
+    groups: List[List[int]] = [[] for _ in range(min(workers, len(shards)))]
+    loads = [0] * len(groups)
+    for p in sorted(range(len(shards)), key=lambda p: -shards[p].count):
+        target = loads.index(min(loads))
+        groups[target].append(p)
+        loads[target] += shards[p].count
+    return [g for g in groups if g]
+
+
+def load_shards(directory: Path, workers: int = SHARD_WORKERS) -> Optional[ShardedIndex]:
+    """The sharded index described by `directory`'s manifest, or None if there is none."""
+    directory = Path(directory)
+    manifest = _read_manifest(directory)
+    if manifest is None:
+        return None
+
+    shards = [
+        Shard(
+            appliance=entry["appliance"],
+            brand=entry["brand"],
+            count=entry["count"],
+            index_path=directory / entry["index"],
+            ids_path=directory / entry["ids"],
+        )
+        for entry in manifest["shards"]
+    ]
+    return ShardedIndex(manifest["build_id"], shards, workers=workers)
@@ -0,0 +1,130 @@
+import os
+from array import array
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping
+
+import faiss
+import numpy as np
+
+# A symptom must be at least this similar to the description to count.
+MIN_SCORE = float(os.getenv("SYMPTOM_MIN_SCORE", "0.55"))
+# Nearest symptoms looked up per description.
+TOP_SYMPTOMS = int(os.getenv("SYMPTOM_TOP_K", "5"))
+
+
+# BUILD
+
+class SymptomIndexBuilder:
+    """
+    Ingest sink (data/ingest.py) that collects the distinct symptom
+    vocabulary and, per symptom, the metadata rows of the parts listing it.
+    Rows are counted in ingest order, which is parts_metadata.json order.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, array] = {}
+        self._ratings = array("f")
+
+    def __call__(self, batch: Iterable[Mapping[str, Any]]):
+        self.add(batch)
+
+    def add(self, batch: Iterable[Mapping[str, Any]]):
+        for item in batch:
+            row = len(self._ratings)
+            self._ratings.append(float(item.get("rating") or 0.0))
+            for symptom in {s.lower() for s in item.get("symptoms_vector", [])}:
+                self._postings.setdefault(symptom, array("i")).append(row)
+
+    def write(self, path, embed_batch: Callable[[List[str]], np.ndarray]) -> int:
+        """
+        Embed the vocabulary once and save it with its posting lists (best
+        rated part first) to one .npz file, replaced atomically. Returns the
+        number of symptoms.
+        """
+        symptoms = sorted(self._postings)
+        if not symptoms:
+            return 0
+
+        vectors = np.ascontiguousarray(embed_batch(symptoms), dtype="float32")
+        faiss.normalize_L2(vectors)
+
+        ratings = np.frombuffer(self._ratings, dtype=np.float32)
+        offsets = np.zeros(len(symptoms) + 1, dtype=np.int64)
+        np.cumsum([len(self._postings[s]) for s in symptoms], out=offsets[1:])
+        # Filled in place, each posting list released once copied, so the
+        # rows are held once rather than twice.
+        rows = np.empty(offsets[-1], dtype=np.int32)
+        for i, symptom in enumerate(symptoms):
+            posting = np.frombuffer(self._postings.pop(symptom), dtype=np.int32)
+            rows[offsets[i]:offsets[i + 1]] = posting[np.argsort(-ratings[posting], kind="stable")]
+
+        path = Path(path)
+        tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}.npz")
+        np.savez(
+            tmp,
+            symptoms=np.array(symptoms),
+            vectors=vectors,
+            offsets=offsets,
+            rows=rows,
+            ratings=ratings,
+        )
+        os.replace(tmp, path)
+        return len(symptoms)
+
+
+# SERVE
+
+class SymptomIndex:
+    """
+    Nearest-symptom lookup over the catalog's symptom vocabulary, with a
+    symptom -> parts posting list. Scores are cosine similarities.
+    """
+
+    def __init__(self, symptoms, vectors, offsets, rows, ratings):
+        self.symptoms = [str(s) for s in symptoms]
+        self._offsets = offsets
+        self._rows = rows
+        self._ratings = ratings
+        self._index = faiss.IndexFlatIP(vectors.shape[1])
+        self._index.add(vectors)
+
+    @classmethod
+    def load(cls, source) -> "SymptomIndex":
+        """`source` is a path or file object of a SymptomIndexBuilder.write file."""
+        with np.load(source) as data:
+            return cls(data["symptoms"], data["vectors"], data["offsets"], data["rows"], data["ratings"])
+
+    def posting(self, i: int) -> np.ndarray:
+        return self._rows[self._offsets[i]:self._offsets[i + 1]]
+
+    def match(
+        self,
+        q_vec: np.ndarray,
+        top_symptoms: int = TOP_SYMPTOMS,
+        min_score: float = MIN_SCORE,
+        limit: int = 10,
+    ) -> List[Dict[str, Any]]:
+        """
+        Parts listing one of the symptoms nearest to `q_vec`, as
+        {"row", "symptom", "score"}. A part takes the score of its best
+        matching symptom; ties go to the better rated part.
+        """
+        q_vec = np.ascontiguousarray(q_vec, dtype="float32").reshape(1, -1).copy()
+        faiss.normalize_L2(q_vec)
+        scores, ids = self._index.search(q_vec, min(top_symptoms, self._index.ntotal))
+
+        # Symptoms arrive best first and each posting list is sorted by
+        # rating, so the merge can stop as soon as `limit` parts are found.
+        best: Dict[int, Dict[str, Any]] = {}
+        for score, i in zip(scores[0], ids[0]):
+            if i < 0 or score < min_score or len(best) >= limit:
+                break
+            score = round(float(score), 4)
+            for row in self.posting(int(i)):
+                row = int(row)
+                if row not in best:
+                    best[row] = {"row": row, "symptom": self.symptoms[i], "score": score}
+                    if len(best) >= limit:
+                        break
+
+        return sorted(best.values(), key=lambda m: (-m["score"], -float(self._ratings[m["row"]])))
@@ -1,7 +1,10 @@
-import { useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import MessageBubble from "./MessageBubble";
 import ProductCard from "./ProductCard";
 
+const API_URL = "http://localhost:8000";
+const WS_URL = "ws://localhost:8000/ws/chat";
+
 export default function ChatWindow() {
   const [input, setInput] = useState("");
   const [messages, setMessages] = useState([
@@ -14,6 +17,37 @@ export default function ChatWindow() {
 
   const [products, setProducts] = useState([]);
   const [sessionId, setSessionId] = useState(null);
+  const socketRef = useRef(null);
+
+  // One socket per conversation; answers arrive as a "turn" frame
+  // followed by "answer" text frames. POST /chat is the fallback.
+  useEffect(() => {
+    const ws = new WebSocket(WS_URL);
+
+    ws.onmessage = (event) => {
+      const frame = JSON.parse(event.data);
+
+      if (frame.type === "session") {
+        setSessionId(frame.session_id);
+      } else if (frame.type === "turn") {
+        setMessages((prev) => [
+          ...prev,
+          { role: "bot", content: "", steps: frame.steps || [] }
+        ]);
+        setProducts(Array.isArray(frame.tool_output) ? frame.tool_output : []);
+      } else if (frame.type === "answer") {
+        setMessages((prev) => {
+          const last = prev[prev.length - 1];
+          return [...prev.slice(0, -1), { ...last, content: last.content + frame.text }];
+        });
+      } else if (frame.type === "error") {
+        setMessages((prev) => [...prev, { role: "bot", content: `⚠️ ${frame.detail}` }]);
+      }
+    };
+
+    socketRef.current = ws;
+    return () => ws.close();
+  }, []);
 
   const sendMessage = async () => {
     if (!input.trim()) return;
@@ -23,13 +57,20 @@ export default function ChatWindow() {
     setMessages((prev) => [...prev, { role: "user", content: userMessage }]);
     setInput("");
 
+    const ws = socketRef.current;
+    if (ws && ws.readyState === WebSocket.OPEN) {
+      ws.send(JSON.stringify({ message: userMessage, view: "card" }));
+      return;
+    }
+
     try {
-      const res = await fetch("http://localhost:8000/chat", {
+      const res = await fetch(`${API_URL}/chat`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
           message: userMessage,
-          session_id: sessionId 
+          session_id: sessionId,
+          view: "card"
         })
       });
 
@@ -41,7 +82,11 @@ export default function ChatWindow() {
 
       setMessages((prev) => [
         ...prev,
-        { role: "bot", content: data.answer || "No response generated." }
+        {
+          role: "bot",
+          content: data.answer || "No response generated.",
+          steps: data.steps || []
+        }
       ]);
 
       if (Array.isArray(data.tool_output) && data.tool_output.length > 0) {
@@ -86,7 +131,12 @@ export default function ChatWindow() {
       {/* ✅ CHAT MESSAGES */}
       <div className="messages-scroll">
         {messages.map((msg, i) => (
-          <MessageBubble key={i} role={msg.role} content={msg.content} />
+          <MessageBubble
+            key={i}
+            role={msg.role}
+            content={msg.content}
+            steps={msg.steps}
+          />
         ))}
       </div>
 
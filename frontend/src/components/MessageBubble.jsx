@@ -1,7 +1,22 @@
-export default function MessageBubble({ role, content }) {
+const STEP_LINE = /^\d+[.)]\s+/;
+
+export default function MessageBubble({ role, content, steps = [] }) {
+  // Numbered steps come pre-parsed from the backend; render them as a real
+  // list and show the rest of the answer as plain text above it.
+  const text = steps.length
+    ? content.split("\n").filter((line) => !STEP_LINE.test(line)).join("\n").trim()
+    : content;
+
   return (
     <div className={`chat-message ${role === "user" ? "chat-user" : "chat-bot"}`}>
-      {content}
+      {text}
+      {steps.length > 0 && (
+        <ol className="chat-steps">
+          {steps.map((step, i) => (
+            <li key={i}>{step}</li>
+          ))}
+        </ol>
+      )}
     </div>
   );
 }